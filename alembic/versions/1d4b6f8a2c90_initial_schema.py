@@ -0,0 +1,168 @@
+"""初始表结构
+
+Revision ID: 1d4b6f8a2c90
+Revises:
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "1d4b6f8a2c90"
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# 按外键依赖的顺序创建，逆序删除
+TABLES = [
+    "users",
+    "user_following",
+    "knowledge_bases",
+    "user_liked_knowledge_bases",
+    "tags",
+    "knowledge_base_tags",
+    "papers",
+    "paper_tags",
+    "user_likes_papers",
+    "messages",
+]
+
+
+def upgrade() -> None:
+    # 由 create_all 建立的数据库（引入迁移之前的部署）已经包含这些表，之后的迁移在其上升级
+    if sa.inspect(op.get_bind()).has_table("users"):
+        return
+
+    op.create_table(
+        "users",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("username", sa.String(), nullable=True),
+        sa.Column("email", sa.String(), nullable=True),
+        sa.Column("hashed_password", sa.String(), nullable=False),
+        sa.Column("avatar", sa.String(), nullable=True),
+        sa.Column("location", sa.String(), nullable=True),
+        sa.Column("experience", sa.String(), nullable=True),
+        sa.Column("gender", sa.String(), nullable=True),
+        sa.Column("age", sa.Integer(), nullable=True),
+        sa.Column("school", sa.String(), nullable=True),
+        sa.Column("is_active", sa.Boolean(), nullable=True),
+        sa.Column("is_superuser", sa.Boolean(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_users_id", "users", ["id"])
+    op.create_index("ix_users_username", "users", ["username"], unique=True)
+    op.create_index("ix_users_email", "users", ["email"], unique=True)
+
+    op.create_table(
+        "user_following",
+        sa.Column("follower_id", sa.Integer(), nullable=False),
+        sa.Column("followed_id", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["follower_id"], ["users.id"]),
+        sa.ForeignKeyConstraint(["followed_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("follower_id", "followed_id"),
+    )
+
+    op.create_table(
+        "knowledge_bases",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("title", sa.String(), nullable=True),
+        sa.Column("description", sa.String(), nullable=True),
+        sa.Column("user_id", sa.Integer(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("stars_count", sa.Integer(), nullable=True),
+        sa.Column("forks_count", sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_knowledge_bases_id", "knowledge_bases", ["id"])
+    op.create_index("ix_knowledge_bases_title", "knowledge_bases", ["title"])
+
+    op.create_table(
+        "user_liked_knowledge_bases",
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("knowledge_base_id", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+        sa.ForeignKeyConstraint(["knowledge_base_id"], ["knowledge_bases.id"]),
+        sa.PrimaryKeyConstraint("user_id", "knowledge_base_id"),
+    )
+
+    op.create_table(
+        "tags",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("name", sa.String(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_tags_id", "tags", ["id"])
+    op.create_index("ix_tags_name", "tags", ["name"], unique=True)
+
+    op.create_table(
+        "knowledge_base_tags",
+        sa.Column("knowledge_base_id", sa.Integer(), nullable=False),
+        sa.Column("tag_id", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["knowledge_base_id"], ["knowledge_bases.id"]),
+        sa.ForeignKeyConstraint(["tag_id"], ["tags.id"]),
+        sa.PrimaryKeyConstraint("knowledge_base_id", "tag_id"),
+    )
+
+    op.create_table(
+        "papers",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("title", sa.String(), nullable=True),
+        sa.Column("authors", sa.String(), nullable=True),
+        sa.Column("abstract", sa.Text(), nullable=True),
+        sa.Column("publish_date", sa.String(), nullable=True),
+        sa.Column("doi", sa.String(), nullable=True),
+        sa.Column("url", sa.String(), nullable=True),
+        sa.Column("knowledge_base_id", sa.Integer(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(["knowledge_base_id"], ["knowledge_bases.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_papers_id", "papers", ["id"])
+    op.create_index("ix_papers_title", "papers", ["title"])
+
+    op.create_table(
+        "paper_tags",
+        sa.Column("paper_id", sa.Integer(), nullable=False),
+        sa.Column("tag_id", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["paper_id"], ["papers.id"]),
+        sa.ForeignKeyConstraint(["tag_id"], ["tags.id"]),
+        sa.PrimaryKeyConstraint("paper_id", "tag_id"),
+    )
+
+    op.create_table(
+        "user_likes_papers",
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("paper_id", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+        sa.ForeignKeyConstraint(["paper_id"], ["papers.id"]),
+        sa.PrimaryKeyConstraint("user_id", "paper_id"),
+    )
+
+    # pair_key和复合索引由 3f1a9c2e7b10 添加
+    op.create_table(
+        "messages",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("sender_id", sa.Integer(), nullable=True),
+        sa.Column("receiver_id", sa.Integer(), nullable=True),
+        sa.Column("content", sa.Text(), nullable=True),
+        sa.Column("is_read", sa.Boolean(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.ForeignKeyConstraint(["sender_id"], ["users.id"]),
+        sa.ForeignKeyConstraint(["receiver_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_messages_id", "messages", ["id"])
+
+
+def downgrade() -> None:
+    for table in reversed(TABLES):
+        op.drop_table(table)
@@ -0,0 +1,70 @@
+"""为消息添加会话规范键和复合索引
+
+Revision ID: 3f1a9c2e7b10
+Revises: 1d4b6f8a2c90
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "3f1a9c2e7b10"
+down_revision: Union[str, None] = "1d4b6f8a2c90"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# 回填时每批更新的消息ID跨度，避免长事务锁住整张表
+BACKFILL_BATCH_SIZE = 10000
+
+# 与 app.models.message.make_pair_key 保持一致
+PAIR_KEY_EXPR = (
+    "CASE WHEN sender_id < receiver_id "
+    "THEN sender_id * 4294967296 + receiver_id "
+    "ELSE receiver_id * 4294967296 + sender_id END"
+)
+
+INDEXES = {
+    "ix_messages_pair_key_created_at": ["pair_key", "created_at", "id"],
+    "ix_messages_receiver_id_is_read": ["receiver_id", "is_read"],
+}
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    columns = {column["name"] for column in sa.inspect(bind).get_columns("messages")}
+    # 由 create_all 新建的数据库已经包含该列
+    if "pair_key" not in columns:
+        op.add_column("messages", sa.Column("pair_key", sa.BigInteger(), nullable=True))
+
+    with op.get_context().autocommit_block():
+        max_id = bind.execute(sa.text("SELECT MAX(id) FROM messages")).scalar() or 0
+        for start in range(0, max_id + 1, BACKFILL_BATCH_SIZE):
+            bind.execute(
+                sa.text(
+                    f"UPDATE messages SET pair_key = {PAIR_KEY_EXPR} "
+                    "WHERE pair_key IS NULL AND id >= :start AND id < :end"
+                ),
+                {"start": start, "end": start + BACKFILL_BATCH_SIZE},
+            )
+
+    with op.batch_alter_table("messages") as batch_op:
+        batch_op.alter_column("pair_key", existing_type=sa.BigInteger(), nullable=False)
+
+    existing = {index["name"] for index in sa.inspect(bind).get_indexes("messages")}
+    with op.get_context().autocommit_block():
+        for name, index_columns in INDEXES.items():
+            if name not in existing:
+                op.create_index(
+                    name, "messages", index_columns, postgresql_concurrently=True
+                )
+
+
+def downgrade() -> None:
+    for name in INDEXES:
+        op.drop_index(name, table_name="messages")
+    with op.batch_alter_table("messages") as batch_op:
+        batch_op.drop_column("pair_key")
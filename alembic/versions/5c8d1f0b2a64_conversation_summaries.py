@@ -0,0 +1,86 @@
+"""新增会话汇总表和未读计数表，并从messages回填
+
+Revision ID: 5c8d1f0b2a64
+Revises: 3f1a9c2e7b10
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.orm import Session
+
+from app.crud.crud_message import message
+
+
+# revision identifiers, used by Alembic.
+revision: str = "5c8d1f0b2a64"
+down_revision: Union[str, None] = "3f1a9c2e7b10"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _create_conversations(bind) -> bool:
+    if sa.inspect(bind).has_table("conversations"):
+        return False
+    op.create_table(
+        "conversations",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("user_low_id", sa.Integer(), nullable=False),
+        sa.Column("user_high_id", sa.Integer(), nullable=False),
+        sa.Column("last_message_id", sa.Integer(), nullable=True),
+        sa.Column("last_activity_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("unread_low", sa.Integer(), nullable=False),
+        sa.Column("unread_high", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["user_low_id"], ["users.id"]),
+        sa.ForeignKeyConstraint(["user_high_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("user_low_id", "user_high_id", name="uq_conversations_pair"),
+    )
+    op.create_index("ix_conversations_id", "conversations", ["id"])
+    op.create_index(
+        "ix_conversations_low_activity", "conversations", ["user_low_id", "last_activity_at", "id"]
+    )
+    op.create_index(
+        "ix_conversations_high_activity", "conversations", ["user_high_id", "last_activity_at", "id"]
+    )
+    return True
+
+
+def _create_unread_counters(bind) -> bool:
+    if sa.inspect(bind).has_table("unread_counters"):
+        return False
+    op.create_table(
+        "unread_counters",
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("unread_count", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("user_id"),
+    )
+    return True
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    conversations_created = _create_conversations(bind)
+    unread_counters_created = _create_unread_counters(bind)
+
+    # 与 reconcile_db.py 使用同一套重建逻辑；由 create_all 新建的表已由写入路径维护，不再回填
+    # 会话加入迁移所在的事务，其中的commit不会提交外层事务，由迁移统一提交
+    db = Session(bind=bind)
+    try:
+        if conversations_created:
+            message.rebuild_conversations(db)
+        if unread_counters_created:
+            message.rebuild_unread_counters(db)
+    finally:
+        db.close()
+
+
+def downgrade() -> None:
+    op.drop_table("unread_counters")
+    op.drop_index("ix_conversations_high_activity", table_name="conversations")
+    op.drop_index("ix_conversations_low_activity", table_name="conversations")
+    op.drop_index("ix_conversations_id", table_name="conversations")
+    op.drop_table("conversations")
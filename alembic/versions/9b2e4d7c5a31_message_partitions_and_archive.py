@@ -0,0 +1,170 @@
+"""messages按月分区，新增归档段索引表
+
+Revision ID: 9b2e4d7c5a31
+Revises: 5c8d1f0b2a64
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from datetime import datetime, timezone
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "9b2e4d7c5a31"
+down_revision: Union[str, None] = "5c8d1f0b2a64"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# 迁移时提前创建的月分区数，之后由 archive_messages.py 定期补齐
+MONTHS_AHEAD = 3
+
+INDEXES = {
+    "ix_messages_id": ["id"],
+    "ix_messages_pair_key_created_at": ["pair_key", "created_at", "id"],
+    "ix_messages_receiver_id_is_read": ["receiver_id", "is_read"],
+}
+
+
+def _month_start(moment: datetime, months: int = 0) -> datetime:
+    index = moment.year * 12 + moment.month - 1 + months
+    return datetime(index // 12, index % 12 + 1, 1, tzinfo=timezone.utc)
+
+
+def _is_partitioned(bind) -> bool:
+    return bool(
+        bind.execute(
+            sa.text(
+                "SELECT 1 FROM pg_partitioned_table p "
+                "JOIN pg_class c ON c.oid = p.partrelid "
+                "WHERE c.relname = 'messages' AND pg_table_is_visible(c.oid)"
+            )
+        ).scalar()
+    )
+
+
+def _create_segments_table(bind) -> None:
+    if sa.inspect(bind).has_table("message_archive_segments"):
+        return
+    op.create_table(
+        "message_archive_segments",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("pair_key", sa.BigInteger(), nullable=False),
+        sa.Column("path", sa.String(), nullable=False),
+        sa.Column("offset", sa.BigInteger(), nullable=False),
+        sa.Column("length", sa.Integer(), nullable=False),
+        sa.Column("message_count", sa.Integer(), nullable=False),
+        sa.Column("first_created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("first_id", sa.Integer(), nullable=False),
+        sa.Column("last_created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("last_id", sa.Integer(), nullable=False),
+        sa.Column("archived_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_message_archive_segments_id", "message_archive_segments", ["id"])
+    op.create_index(
+        "ix_message_archive_segments_pair_key_last",
+        "message_archive_segments",
+        ["pair_key", "last_created_at", "last_id"],
+    )
+
+
+def _partition_messages(bind) -> None:
+    """
+    将现有messages表原样挂为分区表的历史分区（不复制数据），
+    之后的消息写入按月分区；历史分区随归档逐步清空
+    """
+    sequence = bind.execute(sa.text("SELECT pg_get_serial_sequence('messages', 'id')")).scalar()
+    boundary = _month_start(datetime.now(timezone.utc), 1)
+
+    # 分区表的主键必须包含分区键，无法再被外键引用
+    op.execute("ALTER TABLE conversations DROP CONSTRAINT IF EXISTS conversations_last_message_id_fkey")
+
+    op.execute("ALTER TABLE messages RENAME TO messages_legacy")
+    for index in sa.inspect(bind).get_indexes("messages_legacy"):
+        if index["name"].startswith("ix_messages_"):
+            op.execute(
+                f"ALTER INDEX {index['name']} "
+                f"RENAME TO {index['name'].replace('ix_messages_', 'ix_messages_legacy_', 1)}"
+            )
+    op.execute("UPDATE messages_legacy SET created_at = TIMESTAMPTZ 'epoch' WHERE created_at IS NULL")
+    op.execute("ALTER TABLE messages_legacy ALTER COLUMN created_at SET NOT NULL")
+    op.execute("ALTER TABLE messages_legacy DROP CONSTRAINT messages_pkey")
+    op.execute("ALTER TABLE messages_legacy ADD CONSTRAINT messages_legacy_pkey PRIMARY KEY (id, created_at)")
+    # 预先校验范围约束，挂载分区时无需再次扫描整张表
+    op.execute(
+        f"ALTER TABLE messages_legacy ADD CONSTRAINT messages_legacy_range "
+        f"CHECK (created_at < '{boundary.isoformat()}')"
+    )
+
+    op.execute(
+        f"""
+        CREATE TABLE messages (
+            id INTEGER NOT NULL DEFAULT nextval('{sequence}'),
+            sender_id INTEGER REFERENCES users (id),
+            receiver_id INTEGER REFERENCES users (id),
+            pair_key BIGINT NOT NULL,
+            content TEXT,
+            is_read BOOLEAN,
+            created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
+            CONSTRAINT messages_pkey PRIMARY KEY (id, created_at)
+        ) PARTITION BY RANGE (created_at)
+        """
+    )
+    op.execute(f"ALTER SEQUENCE {sequence} OWNED BY messages.id")
+    for name, columns in INDEXES.items():
+        op.create_index(name, "messages", columns)
+
+    op.execute(
+        f"ALTER TABLE messages ATTACH PARTITION messages_legacy "
+        f"FOR VALUES FROM (MINVALUE) TO ('{boundary.isoformat()}')"
+    )
+    op.execute("ALTER TABLE messages_legacy DROP CONSTRAINT messages_legacy_range")
+
+    for months in range(MONTHS_AHEAD):
+        start, end = _month_start(boundary, months), _month_start(boundary, months + 1)
+        op.execute(
+            f"CREATE TABLE messages_y{start.year:04d}m{start.month:02d} PARTITION OF messages "
+            f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+        )
+    # 兜底分区：定期任务未及时创建分区时，写入不会失败
+    op.execute("CREATE TABLE messages_default PARTITION OF messages DEFAULT")
+
+
+def _unpartition_messages(bind) -> None:
+    """
+    将分区表复制回普通表（需要停机窗口，数据量大时耗时较长）
+    """
+    sequence = bind.execute(sa.text("SELECT pg_get_serial_sequence('messages', 'id')")).scalar()
+    op.execute("CREATE TABLE messages_plain (LIKE messages INCLUDING DEFAULTS)")
+    op.execute("INSERT INTO messages_plain SELECT * FROM messages")
+    op.execute(f"ALTER SEQUENCE {sequence} OWNED BY messages_plain.id")
+    op.execute("DROP TABLE messages CASCADE")
+    op.execute("ALTER TABLE messages_plain RENAME TO messages")
+    op.execute("ALTER TABLE messages ADD CONSTRAINT messages_pkey PRIMARY KEY (id)")
+    op.execute("ALTER TABLE messages ADD FOREIGN KEY (sender_id) REFERENCES users (id)")
+    op.execute("ALTER TABLE messages ADD FOREIGN KEY (receiver_id) REFERENCES users (id)")
+    for name, columns in INDEXES.items():
+        op.create_index(name, "messages", columns)
+    op.execute(
+        "ALTER TABLE conversations ADD CONSTRAINT conversations_last_message_id_fkey "
+        "FOREIGN KEY (last_message_id) REFERENCES messages (id)"
+    )
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    _create_segments_table(bind)
+    if bind.dialect.name == "postgresql" and not _is_partitioned(bind):
+        _partition_messages(bind)
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name == "postgresql" and _is_partitioned(bind):
+        _unpartition_messages(bind)
+    op.drop_index("ix_message_archive_segments_pair_key_last", table_name="message_archive_segments")
+    op.drop_index("ix_message_archive_segments_id", table_name="message_archive_segments")
+    op.drop_table("message_archive_segments")
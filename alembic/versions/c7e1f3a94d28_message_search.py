@@ -0,0 +1,101 @@
+"""消息全文检索索引
+
+Revision ID: c7e1f3a94d28
+Revises: 9b2e4d7c5a31
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "c7e1f3a94d28"
+down_revision: Union[str, None] = "9b2e4d7c5a31"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# 与 app.models.message.SEARCH_VECTOR_SQL 保持一致
+SEARCH_VECTOR_SQL = "to_tsvector('simple'::regconfig, coalesce(content, ''))"
+INDEX_NAME = "ix_messages_content_search"
+
+SQLITE_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(content, content='messages', content_rowid='id')",
+    "CREATE TRIGGER IF NOT EXISTS messages_fts_insert AFTER INSERT ON messages BEGIN "
+    "INSERT INTO messages_fts(rowid, content) VALUES (new.id, new.content); END",
+    "CREATE TRIGGER IF NOT EXISTS messages_fts_delete AFTER DELETE ON messages BEGIN "
+    "INSERT INTO messages_fts(messages_fts, rowid, content) VALUES ('delete', old.id, old.content); END",
+    "CREATE TRIGGER IF NOT EXISTS messages_fts_update AFTER UPDATE OF content ON messages BEGIN "
+    "INSERT INTO messages_fts(messages_fts, rowid, content) VALUES ('delete', old.id, old.content); "
+    "INSERT INTO messages_fts(rowid, content) VALUES (new.id, new.content); END",
+    # 为已有消息建立索引
+    "INSERT INTO messages_fts(messages_fts) VALUES ('rebuild')",
+]
+
+
+def _search_index(bind, table: str) -> Union[str, None]:
+    """
+    返回表上已有的检索索引名（create_all创建的索引在分区迁移时会被重命名）
+    """
+    return bind.execute(
+        sa.text(
+            "SELECT indexname FROM pg_indexes "
+            "WHERE tablename = :table AND indexdef LIKE '%to_tsvector%'"
+        ),
+        {"table": table},
+    ).scalar()
+
+
+def _upgrade_postgresql(bind) -> None:
+    if _search_index(bind, "messages"):
+        return
+    partitions = bind.execute(
+        sa.text(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "JOIN pg_class p ON p.oid = i.inhparent "
+            "WHERE p.relname = 'messages'"
+        )
+    ).scalars().all()
+    if not partitions:
+        with op.get_context().autocommit_block():
+            op.execute(
+                f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {INDEX_NAME} "
+                f"ON messages USING gin ({SEARCH_VECTOR_SQL})"
+            )
+        return
+
+    # 分区表不支持并发建索引：先在各分区上并发建索引，再挂到父表的索引上
+    names = {}
+    with op.get_context().autocommit_block():
+        for partition in partitions:
+            names[partition] = _search_index(bind, partition) or f"{partition}_content_search_idx"
+            op.execute(
+                f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {names[partition]} "
+                f"ON {partition} USING gin ({SEARCH_VECTOR_SQL})"
+            )
+    op.execute(f"CREATE INDEX {INDEX_NAME} ON ONLY messages USING gin ({SEARCH_VECTOR_SQL})")
+    for partition, name in names.items():
+        op.execute(f"ALTER INDEX {INDEX_NAME} ATTACH PARTITION {name}")
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name == "postgresql":
+        _upgrade_postgresql(bind)
+    elif bind.dialect.name == "sqlite":
+        for statement in SQLITE_DDL:
+            op.execute(statement)
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name == "postgresql":
+        # 删除父表索引会同时删除各分区上挂载的索引
+        op.execute(f"DROP INDEX IF EXISTS {INDEX_NAME}")
+    elif bind.dialect.name == "sqlite":
+        for trigger in ("messages_fts_insert", "messages_fts_delete", "messages_fts_update"):
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        op.execute("DROP TABLE IF EXISTS messages_fts")
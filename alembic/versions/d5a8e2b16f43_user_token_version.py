@@ -0,0 +1,34 @@
+"""为用户添加令牌版本
+
+Revision ID: d5a8e2b16f43
+Revises: c7e1f3a94d28
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "d5a8e2b16f43"
+down_revision: Union[str, None] = "c7e1f3a94d28"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    columns = {column["name"] for column in sa.inspect(op.get_bind()).get_columns("users")}
+    # 由 create_all 新建的数据库已经包含该列
+    if "token_version" not in columns:
+        # 带常量默认值的非空列在PostgreSQL 11+上只修改元数据，不重写表
+        op.add_column(
+            "users",
+            sa.Column("token_version", sa.Integer(), nullable=False, server_default="0"),
+        )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("users") as batch_op:
+        batch_op.drop_column("token_version")
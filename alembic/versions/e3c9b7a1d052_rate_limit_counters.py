@@ -0,0 +1,35 @@
+"""新增登录限流计数表
+
+Revision ID: e3c9b7a1d052
+Revises: d5a8e2b16f43
+Create Date: 2026-10-18 20:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "e3c9b7a1d052"
+down_revision: Union[str, None] = "d5a8e2b16f43"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # 由 create_all 新建的数据库已经包含该表
+    if sa.inspect(op.get_bind()).has_table("rate_limit_counters"):
+        return
+    op.create_table(
+        "rate_limit_counters",
+        sa.Column("key", sa.String(), nullable=False),
+        sa.Column("window_start", sa.BigInteger(), nullable=False),
+        sa.Column("count", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("key", "window_start"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("rate_limit_counters")
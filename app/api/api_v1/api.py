@@ -1,9 +1,32 @@
 from fastapi import APIRouter
 
 from app.api.api_v1.endpoints import auth, users, knowledge_bases, papers, messages, tags
+from app.core.availability import user_availability
+from app.core.config import settings
+from app.core.pubsub import hub
+from app.core.ratelimit import login_limiter
+from app.core.revocation import token_versions
+from app.core.scheduler import scheduler
+from app.core.security import password_hasher
+from app.db.replicas import replicas
 
 api_router = APIRouter()
 
+if settings.AUTH_CLAIMS_TOKENS:
+    scheduler.add("token-versions", settings.AUTH_REVOCATION_REFRESH_SECONDS, token_versions.refresh)
+scheduler.add("user-availability", settings.USER_AVAILABILITY_REFRESH_SECONDS, user_availability.rebuild)
+if settings.LOGIN_RATE_LIMIT_ENABLED:
+    scheduler.add("login-rate-limit-prune", settings.LOGIN_RATE_LIMIT_WINDOW_SECONDS, login_limiter.prune)
+if replicas:
+    scheduler.add("replica-lag", settings.DB_REPLICA_CHECK_SECONDS, replicas.check)
+
+# 随应用启动和关闭实时消息推送中心和定时任务
+api_router.add_event_handler("startup", hub.start)
+api_router.add_event_handler("startup", scheduler.start)
+api_router.add_event_handler("shutdown", hub.stop)
+api_router.add_event_handler("shutdown", scheduler.stop)
+api_router.add_event_handler("shutdown", password_hasher.shutdown)
+
 api_router.include_router(auth.router, prefix="/auth", tags=["auth"])
 api_router.include_router(users.router, prefix="/users", tags=["users"])
 api_router.include_router(knowledge_bases.router, prefix="/knowledge-bases", tags=["knowledge-bases"])
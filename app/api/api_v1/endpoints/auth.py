@@ -1,25 +1,45 @@
 from datetime import timedelta
-from typing import Any
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import Any, Optional
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy import inspect
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
 from app import crud, models, schemas
 from app.api import deps
 from app.core import security
+from app.core.availability import user_availability
 from app.core.config import settings
+from app.core.ratelimit import login_limiter
 
 router = APIRouter()
 
 @router.post("/login", response_model=schemas.Token)
-def login_access_token(
+async def login_access_token(
+    request: Request,
     db: Session = Depends(deps.get_db),
     form_data: OAuth2PasswordRequestForm = Depends()
 ) -> Any:
     """
     获取OAuth2访问令牌
     """
-    user = crud.user.authenticate(
+    if settings.LOGIN_RATE_LIMIT_ENABLED:
+        ip = request.client.host if request.client else None
+        if login_limiter.backend.blocking:
+            retry_after = await run_in_threadpool(
+                login_limiter.check, ip=ip, email=form_data.username
+            )
+        else:
+            retry_after = login_limiter.check(ip=ip, email=form_data.username)
+        if retry_after:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many login attempts",
+                headers={"Retry-After": str(int(retry_after))},
+            )
+    user = await crud.user.authenticate_async(
         db, email=form_data.username, password=form_data.password
     )
     if not user:
@@ -35,36 +55,70 @@ def login_access_token(
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     return {
         "access_token": security.create_access_token(
-            user.id, expires_delta=access_token_expires
+            user.id,
+            expires_delta=access_token_expires,
+            claims=security.user_claims(user) if settings.AUTH_CLAIMS_TOKENS else None,
         ),
         "token_type": "bearer",
     }
 
-@router.post("/signup", response_model=schemas.User)
-def create_user(
-    *,
-    db: Session = Depends(deps.get_db),
-    user_in: schemas.UserCreate,
-) -> Any:
-    """
-    创建新用户
-    """
-    user = crud.user.get_by_email(db, email=user_in.email)
-    if user:
+def _raise_taken(email_taken: bool, username_taken: bool) -> None:
+    if email_taken:
         raise HTTPException(
             status_code=400,
             detail="The user with this email already exists in the system.",
         )
-    
-    user = crud.user.get_by_username(db, username=user_in.username)
-    if user:
+    if username_taken:
         raise HTTPException(
             status_code=400,
             detail="The user with this username already exists in the system.",
         )
+
+def _create_user(db: Session, user_in: schemas.UserCreate, hashed_password: str) -> models.User:
+    """
+    写入新用户；布隆过滤器未覆盖其他worker刚注册的用户，冲突时由唯一约束兜底
+    """
+    try:
+        return crud.user.create(db, obj_in=user_in, hashed_password=hashed_password)
+    except IntegrityError:
+        db.rollback()
+        email_taken = crud.user.get_by_email(db, email=user_in.email) is not None
+        _raise_taken(email_taken, not email_taken)
+
+@router.get("/availability", response_model=schemas.UserAvailabilityResult)
+def check_availability(
+    *,
+    db: Session = Depends(deps.get_db),
+    email: Optional[str] = None,
+    username: Optional[str] = None,
+) -> Any:
+    """
+    检查邮箱和用户名是否可用（注册页实时校验）
+    """
+    email_taken, username_taken = user_availability.check(db, email=email, username=username)
+    return {
+        "email": None if email is None else not email_taken,
+        "username": None if username is None else not username_taken,
+    }
+
+@router.post("/signup", response_model=schemas.User)
+async def create_user(
+    *,
+    db: Session = Depends(deps.get_db),
+    user_in: schemas.UserCreate,
+) -> Any:
+    """
+    创建新用户
+    """
+    email_taken, username_taken = await run_in_threadpool(
+        user_availability.check, db, email=user_in.email, username=user_in.username
+    )
+    _raise_taken(email_taken, username_taken)
     
-    user = crud.user.create(db, obj_in=user_in)
-    return user
+    hashed_password = await security.aget_password_hash(user_in.password)
+    user = await run_in_threadpool(_create_user, db, user_in, hashed_password)
+    # 新用户没有粉丝和关注，只返回列值（粉丝数、关注数取默认值0），不查询关注关系
+    return {attr.key: getattr(user, attr.key) for attr in inspect(user).mapper.column_attrs}
 
 @router.get("/me", response_model=schemas.User)
 def read_users_me(
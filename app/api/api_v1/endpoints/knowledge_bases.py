@@ -1,5 +1,6 @@
-from typing import Any, List
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import Any, List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from app import crud, models, schemas
@@ -15,18 +16,21 @@ from app.schemas.user import User
 
 router = APIRouter()
 
-@router.get("/", response_model=List[schemas.KnowledgeBase])
+@router.get("/", response_model=schemas.Page[schemas.KnowledgeBase])
 def read_knowledge_bases(
     db: Session = Depends(deps.get_db),
-    skip: int = 0,
-    limit: int = 100,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=100),
     current_user: models.User = Depends(deps.get_current_active_user),
 ) -> Any:
     """
-    获取所有知识库列表
+    获取所有知识库列表（游标分页）
     """
-    knowledge_bases = crud.knowledge_base.get_multi(db, skip=skip, limit=limit)
-    return knowledge_bases
+    try:
+        knowledge_bases, next_cursor = crud.knowledge_base.get_list_page(db, cursor=cursor, limit=limit)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="无效的游标")
+    return {"items": knowledge_bases, "next_cursor": next_cursor}
 
 @router.post("/", response_model=schemas.KnowledgeBase)
 def create_knowledge_base(
@@ -44,16 +48,16 @@ def create_knowledge_base(
     return knowledge_base
 
 @router.get("/{kb_id}", response_model=schemas.KnowledgeBaseWithPapers)
-def read_knowledge_base(
+async def read_knowledge_base(
     *,
-    db: Session = Depends(deps.get_db),
+    db: AsyncSession = Depends(deps.get_async_db),
     kb_id: int,
-    current_user: models.User = Depends(deps.get_current_active_user),
+    current_user: models.User = Depends(deps.get_current_active_user_async),
 ) -> Any:
     """
     获取知识库详情（包含论文）
     """
-    knowledge_base = crud.knowledge_base.get(db=db, id=kb_id)
+    knowledge_base = await crud.knowledge_base_async.get_with_papers(db=db, id=kb_id)
     if not knowledge_base:
         raise HTTPException(status_code=404, detail="Knowledge base not found")
     return knowledge_base
@@ -128,43 +132,49 @@ def add_paper_to_knowledge_base(
     )
     return paper
 
-@router.get("/user/{user_id}", response_model=List[schemas.KnowledgeBase])
+@router.get("/user/{user_id}", response_model=schemas.Page[schemas.KnowledgeBase])
 def read_user_knowledge_bases(
     *,
     db: Session = Depends(deps.get_db),
     user_id: int,
-    skip: int = 0,
-    limit: int = 100,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=100),
     current_user: models.User = Depends(deps.get_current_active_user),
 ) -> Any:
     """
-    获取用户的知识库
+    获取用户的知识库（游标分页）
     """
-    knowledge_bases = crud.knowledge_base.get_multi_by_owner(
-        db=db, owner_id=user_id, skip=skip, limit=limit
-    )
-    return knowledge_bases
+    try:
+        knowledge_bases, next_cursor = crud.knowledge_base.get_multi_by_owner(
+            db=db, owner_id=user_id, cursor=cursor, limit=limit
+        )
+    except ValueError:
+        raise HTTPException(status_code=400, detail="无效的游标")
+    return {"items": knowledge_bases, "next_cursor": next_cursor}
 
-@router.get("/username/{username}", response_model=List[schemas.KnowledgeBase])
+@router.get("/username/{username}", response_model=schemas.Page[schemas.KnowledgeBase])
 def read_user_knowledge_bases_by_username(
     *,
     db: Session = Depends(deps.get_db),
     username: str,
-    skip: int = 0,
-    limit: int = 100,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=100),
     current_user: models.User = Depends(deps.get_current_active_user),
 ) -> Any:
     """
-    通过用户名获取用户的知识库
+    通过用户名获取用户的知识库（游标分页）
     """
     user = crud.user.get_by_username(db=db, username=username)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
-    knowledge_bases = crud.knowledge_base.get_multi_by_owner(
-        db=db, owner_id=user.id, skip=skip, limit=limit
-    )
-    return knowledge_bases
+    try:
+        knowledge_bases, next_cursor = crud.knowledge_base.get_multi_by_owner(
+            db=db, owner_id=user.id, cursor=cursor, limit=limit
+        )
+    except ValueError:
+        raise HTTPException(status_code=400, detail="无效的游标")
+    return {"items": knowledge_bases, "next_cursor": next_cursor}
 
 @router.post("/{kb_id}/like", response_model=bool)
 def like_knowledge_base(
@@ -1,56 +1,261 @@
-from typing import Any, List
-from fastapi import APIRouter, Depends, HTTPException, status
+import asyncio
+import json
+from typing import Any, Dict, List, Optional, Tuple
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, WebSocket, WebSocketDisconnect, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from app import crud, models, schemas
 from app.api import deps
+from app.core.config import settings
+from app.core.pubsub import hub
+from app.db.session import SessionLocal
 
 router = APIRouter()
 
-@router.get("/conversations", response_model=List[schemas.Conversation])
-def read_conversations(
+# SSE保活间隔（秒），需小于nginx的proxy_read_timeout
+STREAM_KEEPALIVE_SECONDS = 15
+# 批量已读时每个message.read事件携带的消息ID数上限
+READ_EVENT_MAX_IDS = 1000
+
+def _message_event(event_type: str, message: models.Message) -> dict:
+    return {
+        "type": event_type,
+        "message": jsonable_encoder(schemas.Message.model_validate(message, from_attributes=True)),
+    }
+
+def _publish_read(reader_id: int, rows: List[Tuple[int, int]]) -> None:
+    """
+    批量标记已读后按发送者分组通知，并同步读者的其他在线设备
+    rows为被标记的消息的(id, sender_id)；事件只携带消息ID，不包含消息内容
+    """
+    by_sender: Dict[int, List[int]] = {}
+    for message_id, sender_id in rows:
+        by_sender.setdefault(sender_id, []).append(message_id)
+    for sender_id, message_ids in by_sender.items():
+        for start in range(0, len(message_ids), READ_EVENT_MAX_IDS):
+            event = {
+                "type": "message.read",
+                "reader_id": reader_id,
+                "message_ids": message_ids[start:start + READ_EVENT_MAX_IDS],
+            }
+            hub.publish(sender_id, event)
+            if sender_id != reader_id:
+                hub.publish(reader_id, event)
+
+def _authenticate_stream_user(token: Optional[str]) -> Optional[int]:
+    """
+    长连接只在建立时校验令牌，使用独立的短会话，避免连接期间占用数据库连接
+    """
+    if not token:
+        return None
+    db = SessionLocal()
+    try:
+        user = deps.get_user_from_token(db, token)
+        if user is None or not user.is_active:
+            return None
+        return user.id
+    finally:
+        db.close()
+
+@router.get("/conversations", response_model=schemas.Page[schemas.Conversation])
+async def read_conversations(
     *,
-    db: Session = Depends(deps.get_db),
-    current_user: models.User = Depends(deps.get_current_active_user),
+    db: AsyncSession = Depends(deps.get_async_db),
+    cursor: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    current_user: models.User = Depends(deps.get_current_active_user_async),
 ) -> Any:
     """
-    获取当前用户的所有会话
+    获取当前用户的所有会话（游标分页）
     """
-    # 获取所有会话元组列表 (user_id, latest_message, unread_count)
-    conversations_data = crud.message.get_conversations(db=db, user_id=current_user.id)
+    try:
+        conversations_data, next_cursor = await crud.message_async.get_conversations(
+            db=db, user_id=current_user.id, cursor=cursor, limit=limit
+        )
+    except ValueError:
+        raise HTTPException(status_code=400, detail="无效的游标")
     
-    # 转换为Conversation模型
+    # 转换为Conversation模型的数据
     result = []
-    for user_id, latest_message, unread_count in conversations_data:
-        # 获取用户信息
-        other_user = crud.user.get(db=db, id=user_id)
-        if not other_user:
-            continue
-            
-        conversation = schemas.Conversation(
-            id=user_id,  # 使用对话用户ID作为会话ID
-            participants=[current_user.id, user_id],
+    for other_user, latest_message, unread_count in conversations_data:
+        conversation = dict(
+            id=other_user.id,  # 使用对话用户ID作为会话ID
+            participants=[current_user.id, other_user.id],
             last_message=latest_message,
-            unread_count=unread_count
+            unread_count=unread_count,
+            other_user=other_user,
         )
         result.append(conversation)
     
-    return result
+    return {"items": result, "next_cursor": next_cursor}
+
+@router.get("/search", response_model=schemas.Page[schemas.MessageSearchHit])
+async def search_messages(
+    *,
+    db: AsyncSession = Depends(deps.get_async_db),
+    q: str = Query(..., min_length=1, max_length=200),
+    cursor: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    current_user: models.User = Depends(deps.get_current_active_user_async),
+) -> Any:
+    """
+    在当前用户收发的消息中全文检索（按相关度排序，游标分页）
+    """
+    try:
+        hits, next_cursor = await crud.message_async.search(
+            db=db, user_id=current_user.id, q=q, cursor=cursor, limit=limit
+        )
+    except ValueError:
+        raise HTTPException(status_code=400, detail="无效的游标")
+    items = [
+        dict(message=message, snippet=snippet or "", rank=rank)
+        for message, snippet, rank in hits
+    ]
+    return {"items": items, "next_cursor": next_cursor}
+
+@router.get("/unread-count", response_model=int)
+async def read_unread_count(
+    *,
+    db: AsyncSession = Depends(deps.get_async_db),
+    current_user: models.User = Depends(deps.get_current_active_user_async),
+) -> Any:
+    """
+    获取当前用户的未读消息总数（用于未读角标）
+    """
+    return await crud.message_async.get_unread_count(db=db, user_id=current_user.id)
 
-@router.get("/{user_id}", response_model=List[schemas.Message])
-def read_messages(
+@router.post("/read-all", response_model=int)
+def mark_everything_as_read(
     *,
     db: Session = Depends(deps.get_db),
-    user_id: int,
     current_user: models.User = Depends(deps.get_current_active_user),
 ) -> Any:
     """
-    获取与特定用户的消息历史
+    标记当前用户收到的所有消息为已读
     """
-    messages = crud.message.get_conversation(
-        db=db, user_id1=current_user.id, user_id2=user_id
+    rows = crud.message.mark_all_as_read(db=db, user_id=current_user.id)
+    _publish_read(current_user.id, rows)
+    return len(rows)
+
+@router.post("/read", response_model=int)
+def mark_messages_read(
+    *,
+    db: Session = Depends(deps.get_db),
+    batch_in: schemas.MessageReadBatch,
+    current_user: models.User = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    批量标记消息为已读（只处理当前用户收到的消息）
+    """
+    rows = crud.message.mark_many_as_read(
+        db=db, user_id=current_user.id, message_ids=batch_in.message_ids
     )
-    return messages
+    _publish_read(current_user.id, rows)
+    return len(rows)
+
+@router.websocket("/ws")
+async def message_socket(websocket: WebSocket, token: str = Query(...)) -> None:
+    """
+    通过WebSocket接收实时消息事件（message.created / message.read）
+    """
+    user_id = await run_in_threadpool(_authenticate_stream_user, token)
+    if user_id is None:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    await websocket.accept()
+    queue = hub.subscribe(user_id)
+    
+    async def forward() -> None:
+        while True:
+            await websocket.send_json(await queue.get())
+    
+    sender = asyncio.create_task(forward())
+    try:
+        # 客户端发来的内容仅用于保活，直接忽略
+        while True:
+            await websocket.receive_text()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        sender.cancel()
+        hub.unsubscribe(user_id, queue)
+
+@router.get("/stream")
+async def stream_messages(request: Request, token: Optional[str] = None) -> Any:
+    """
+    通过Server-Sent Events接收实时消息事件（WebSocket不可用时的降级方案）
+    令牌可通过token查询参数或Authorization头传递
+    """
+    if token is None:
+        scheme, _, credentials = request.headers.get("Authorization", "").partition(" ")
+        if scheme.lower() == "bearer":
+            token = credentials
+    user_id = await run_in_threadpool(_authenticate_stream_user, token)
+    if user_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="无法验证凭据",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    queue = hub.subscribe(user_id)
+    
+    async def events():
+        try:
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=STREAM_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+        finally:
+            hub.unsubscribe(user_id, queue)
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@router.get("/{user_id}", response_model=schemas.Page[schemas.Message])
+async def read_messages(
+    *,
+    db: AsyncSession = Depends(deps.get_async_db),
+    user_id: int,
+    cursor: Optional[str] = None,
+    before_id: Optional[int] = None,
+    after_id: Optional[int] = None,
+    limit: int = Query(50, ge=1, le=100),
+    current_user: models.User = Depends(deps.get_current_active_user_async),
+) -> Any:
+    """
+    获取与特定用户的消息历史（最新的消息在前）
+
+    - before_id: 获取比该消息更早的消息
+    - after_id: 获取比该消息更新的消息
+    - cursor: 上一页返回的next_cursor，沿同一方向继续翻页
+    """
+    if sum(param is not None for param in (cursor, before_id, after_id)) > 1:
+        raise HTTPException(
+            status_code=400, detail="cursor、before_id、after_id 只能指定一个"
+        )
+    try:
+        messages, next_cursor = await crud.message_async.get_conversation(
+            db=db,
+            user_id1=current_user.id,
+            user_id2=user_id,
+            cursor=cursor,
+            before_id=before_id,
+            after_id=after_id,
+            limit=limit,
+        )
+    except ValueError:
+        raise HTTPException(status_code=400, detail="无效的游标")
+    return {"items": messages, "next_cursor": next_cursor}
 
 @router.post("/", response_model=schemas.Message)
 def send_message(
@@ -67,9 +272,20 @@ def send_message(
     if not receiver:
         raise HTTPException(status_code=404, detail="Receiver not found")
     
-    message = crud.message.create_with_sender(
-        db=db, obj_in=message_in, sender_id=current_user.id
-    )
+    if settings.MESSAGE_GROUP_COMMIT:
+        message = crud.message.create_with_sender_grouped(
+            obj_in=message_in, sender_id=current_user.id
+        )
+    else:
+        message = crud.message.create_with_sender(
+            db=db, obj_in=message_in, sender_id=current_user.id
+        )
+    
+    # 推送给接收者和发送者的其他在线设备
+    event = _message_event("message.created", message)
+    hub.publish(message.receiver_id, event)
+    if message.sender_id != message.receiver_id:
+        hub.publish(message.sender_id, event)
     return message
 
 @router.post("/{message_id}/read", response_model=schemas.Message)
@@ -97,7 +313,20 @@ def mark_message_read(
         )
     
     # 标记为已读
-    message = crud.message.mark_one_as_read(db, message_id=message_id)
+    message, changed = crud.message.mark_one_as_read(db, message_id=message_id)
+    if not changed:
+        # 消息原本已读，不重复推送已读回执
+        return message
+    
+    # 通知发送者消息已读，并同步读者的其他在线设备；与批量已读的事件一样带有message_ids
+    event = {
+        **_message_event("message.read", message),
+        "reader_id": message.receiver_id,
+        "message_ids": [message.id],
+    }
+    hub.publish(message.sender_id, event)
+    if message.sender_id != message.receiver_id:
+        hub.publish(message.receiver_id, event)
     return message
 
 @router.post("/{user_id}/read-all", response_model=int)
@@ -111,7 +340,8 @@ def mark_all_as_read(
     标记与特定用户的所有消息为已读
     """
     # 将用户发送给当前用户的所有消息标记为已读
-    count = crud.message.mark_as_read(
+    rows = crud.message.mark_as_read(
         db=db, user_id1=current_user.id, user_id2=user_id
     )
-    return count 
\ No newline at end of file
+    _publish_read(current_user.id, rows)
+    return len(rows) 
\ No newline at end of file
@@ -1,5 +1,7 @@
-from typing import Any, List
+from typing import Any, List, Optional
+from sqlalchemy import select
 from fastapi import APIRouter, Depends, HTTPException, status, Query
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from app import crud, models, schemas
@@ -7,6 +9,104 @@ from app.api import deps
 
 router = APIRouter()
 
+@router.get("/search", response_model=schemas.Page[schemas.Paper])
+async def search_papers(
+    *,
+    db: AsyncSession = Depends(deps.get_async_db),
+    q: str,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=100),
+    current_user: models.User = Depends(deps.get_current_active_user_async),
+) -> Any:
+    """
+    搜索论文（游标分页）
+    """
+    try:
+        papers, next_cursor = await crud.paper_async.search(db=db, query=q, cursor=cursor, limit=limit)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="无效的游标")
+    return {"items": papers, "next_cursor": next_cursor}
+
+# 需要在/{paper_id}之前注册，否则"liked"会被当作paper_id
+@router.get("/liked", response_model=schemas.Page[schemas.Paper])
+def get_liked_papers(
+    *,
+    db: Session = Depends(deps.get_db),
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=100),
+    current_user: models.User = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    获取当前用户点赞的论文（游标分页）
+    """
+    try:
+        papers, next_cursor = crud.paper.get_liked_by_user(
+            db=db, user_id=current_user.id, cursor=cursor, limit=limit
+        )
+    except ValueError:
+        raise HTTPException(status_code=400, detail="无效的游标")
+    return {"items": papers, "next_cursor": next_cursor}
+
+def _owned_knowledge_bases(current_user: models.User):
+    return select(models.KnowledgeBase.id).where(models.KnowledgeBase.user_id == current_user.id)
+
+@router.post("/batch", response_model=List[schemas.BatchItemResult])
+def create_papers(
+    *,
+    db: Session = Depends(deps.get_db),
+    papers_in: List[schemas.PaperCreate],
+    current_user: models.User = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    批量添加论文（只能添加到自己的知识库），整批一条INSERT写入，返回每项的结果
+    """
+    deps.check_batch_size(len(papers_in))
+    kb_ids = {paper_in.knowledge_base_id for paper_in in papers_in}
+    owned = set(db.scalars(_owned_knowledge_bases(current_user).where(models.KnowledgeBase.id.in_(kb_ids))))
+    allowed = [index for index, paper_in in enumerate(papers_in) if paper_in.knowledge_base_id in owned]
+    results = {
+        index: {"index": index, "status": "error", "error": "知识库不存在或无权限"}
+        for index in range(len(papers_in))
+    }
+    for result in crud.paper.create_many(db=db, objs_in=[papers_in[index] for index in allowed]):
+        result["index"] = allowed[result["index"]]
+        results[result["index"]] = result
+    return [results[index] for index in range(len(papers_in))]
+
+@router.patch("/batch", response_model=List[schemas.BatchItemResult])
+def update_papers(
+    *,
+    db: Session = Depends(deps.get_db),
+    papers_in: List[schemas.PaperBatchUpdate],
+    current_user: models.User = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    批量更新论文（只能更新自己知识库中的论文），返回每项的结果
+    """
+    deps.check_batch_size(len(papers_in))
+    return crud.paper.update_many(
+        db=db,
+        objs_in=[(paper_in.id, paper_in) for paper_in in papers_in],
+        where=[models.Paper.knowledge_base_id.in_(_owned_knowledge_bases(current_user))],
+    )
+
+@router.post("/batch/delete", response_model=List[schemas.BatchItemResult])
+def delete_papers(
+    *,
+    db: Session = Depends(deps.get_db),
+    batch_in: schemas.BatchDelete,
+    current_user: models.User = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    批量删除论文（只能删除自己知识库中的论文），返回每项的结果
+    """
+    deps.check_batch_size(len(batch_in.ids))
+    return crud.paper.delete_many(
+        db=db,
+        ids=batch_in.ids,
+        where=[models.Paper.knowledge_base_id.in_(_owned_knowledge_bases(current_user))],
+    )
+
 @router.get("/{paper_id}", response_model=schemas.Paper)
 def read_paper(
     *,
@@ -92,34 +192,3 @@ def unlike_paper(
     """
     result = crud.paper.unlike(db=db, paper_id=paper_id, user_id=current_user.id)
     return result
-
-@router.get("/liked", response_model=List[schemas.Paper])
-def get_liked_papers(
-    *,
-    db: Session = Depends(deps.get_db),
-    skip: int = 0,
-    limit: int = 100,
-    current_user: models.User = Depends(deps.get_current_active_user),
-) -> Any:
-    """
-    获取当前用户点赞的论文
-    """
-    papers = crud.paper.get_liked_by_user(
-        db=db, user_id=current_user.id, skip=skip, limit=limit
-    )
-    return papers
-
-@router.get("/search", response_model=List[schemas.Paper])
-def search_papers(
-    *,
-    db: Session = Depends(deps.get_db),
-    q: str,
-    skip: int = 0,
-    limit: int = 100,
-    current_user: models.User = Depends(deps.get_current_active_user),
-) -> Any:
-    """
-    搜索论文
-    """
-    papers = crud.paper.search(db=db, query=q, skip=skip, limit=limit)
-    return papers 
\ No newline at end of file
@@ -1,26 +1,34 @@
-from typing import Any, List
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import Any, List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 
 from app.api import deps
 from app.crud import crud_tag
-from app.schemas.knowledge_base import Tag, TagCreate
+from app.models.tag import Tag as TagModel
+from app.schemas.batch import BatchDelete, BatchItemResult
+from app.schemas.knowledge_base import KnowledgeBase, Paper, Tag, TagCreate
+from app.schemas.pagination import Page
+from app.schemas.tag import TagBatchUpdate
 from app.schemas.user import User
 
 router = APIRouter()
 
-@router.get("/", response_model=List[Tag])
+@router.get("/", response_model=Page[Tag])
 def read_tags(
     db: Session = Depends(deps.get_db),
-    skip: int = 0,
-    limit: int = 100,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=100),
     current_user: User = Depends(deps.get_current_active_user),
 ) -> Any:
     """
-    获取所有标签
+    获取所有标签，按名称排序（游标分页）
     """
-    tags = crud_tag.tag.get_multi(db, skip=skip, limit=limit)
-    return tags
+    try:
+        tags, next_cursor = crud_tag.tag.get_list_page(db, cursor=cursor, limit=limit)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="无效的游标")
+    return {"items": tags, "next_cursor": next_cursor}
 
 @router.post("/", response_model=Tag)
 def create_tag(
@@ -41,6 +49,62 @@ def create_tag(
     tag = crud_tag.tag.create(db=db, obj_in=tag_in)
     return tag
 
+@router.post("/batch", response_model=List[BatchItemResult])
+def create_tags(
+    *,
+    db: Session = Depends(deps.get_db),
+    tags_in: List[TagCreate],
+    current_user: User = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    批量创建标签，已存在的标签（包括同一批次中重复的名称）返回exists和已有的id
+    """
+    deps.check_batch_size(len(tags_in))
+    names = [tag_in.name for tag_in in tags_in]
+    existing = dict(db.execute(select(TagModel.name, TagModel.id).where(TagModel.name.in_(names))).all())
+    new_names = list(dict.fromkeys(name for name in names if name not in existing))
+    created = {}
+    for result in crud_tag.tag.create_many(db, objs_in=[{"name": name} for name in new_names]):
+        created[new_names[result["index"]]] = result
+    
+    results, seen = [], set()
+    for index, name in enumerate(names):
+        if name in existing:
+            results.append({"index": index, "status": "exists", "id": existing[name]})
+            continue
+        result = dict(created[name], index=index)
+        if name in seen and result["status"] == "created":
+            result["status"] = "exists"
+        seen.add(name)
+        results.append(result)
+    return results
+
+@router.patch("/batch", response_model=List[BatchItemResult])
+def update_tags(
+    *,
+    db: Session = Depends(deps.get_db),
+    tags_in: List[TagBatchUpdate],
+    current_user: User = Depends(deps.get_current_active_superuser),
+) -> Any:
+    """
+    批量重命名标签（仅超级用户），与已有标签重名的项报告为error
+    """
+    deps.check_batch_size(len(tags_in))
+    return crud_tag.tag.update_many(db, objs_in=[(tag_in.id, tag_in) for tag_in in tags_in])
+
+@router.post("/batch/delete", response_model=List[BatchItemResult])
+def delete_tags(
+    *,
+    db: Session = Depends(deps.get_db),
+    batch_in: BatchDelete,
+    current_user: User = Depends(deps.get_current_active_superuser),
+) -> Any:
+    """
+    批量删除标签（仅超级用户），同时移除知识库和论文上的该标签
+    """
+    deps.check_batch_size(len(batch_in.ids))
+    return crud_tag.tag.delete_many(db, ids=batch_in.ids)
+
 @router.get("/{tag_id}", response_model=Tag)
 def read_tag(
     *,
@@ -59,17 +123,17 @@ def read_tag(
         )
     return tag
 
-@router.get("/{tag_id}/knowledge-bases", response_model=List[dict])
+@router.get("/{tag_id}/knowledge-bases", response_model=Page[KnowledgeBase])
 def read_tag_knowledge_bases(
     *,
     db: Session = Depends(deps.get_db),
     tag_id: int,
-    skip: int = 0,
-    limit: int = 100,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=100),
     current_user: User = Depends(deps.get_current_active_user),
 ) -> Any:
     """
-    获取标签下的知识库
+    获取标签下的知识库（游标分页）
     """
     tag = crud_tag.tag.get(db, id=tag_id)
     if not tag:
@@ -78,20 +142,25 @@ def read_tag_knowledge_bases(
             detail="标签不存在",
         )
     
-    knowledge_bases = crud_tag.tag.get_knowledge_bases(db, tag_id=tag_id, skip=skip, limit=limit)
-    return knowledge_bases
+    try:
+        knowledge_bases, next_cursor = crud_tag.tag.get_knowledge_bases(
+            db, tag_id=tag_id, cursor=cursor, limit=limit
+        )
+    except ValueError:
+        raise HTTPException(status_code=400, detail="无效的游标")
+    return {"items": knowledge_bases, "next_cursor": next_cursor}
 
-@router.get("/{tag_id}/papers", response_model=List[dict])
+@router.get("/{tag_id}/papers", response_model=Page[Paper])
 def read_tag_papers(
     *,
     db: Session = Depends(deps.get_db),
     tag_id: int,
-    skip: int = 0,
-    limit: int = 100,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=100),
     current_user: User = Depends(deps.get_current_active_user),
 ) -> Any:
     """
-    获取标签下的论文
+    获取标签下的论文（游标分页）
     """
     tag = crud_tag.tag.get(db, id=tag_id)
     if not tag:
@@ -100,5 +169,8 @@ def read_tag_papers(
             detail="标签不存在",
         )
     
-    papers = crud_tag.tag.get_papers(db, tag_id=tag_id, skip=skip, limit=limit)
-    return papers 
\ No newline at end of file
+    try:
+        papers, next_cursor = crud_tag.tag.get_papers(db, tag_id=tag_id, cursor=cursor, limit=limit)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="无效的游标")
+    return {"items": papers, "next_cursor": next_cursor} 
\ No newline at end of file
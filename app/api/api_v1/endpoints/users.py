@@ -1,48 +1,262 @@
-from typing import Any, List
-from fastapi import APIRouter, Depends, HTTPException, status
+import codecs
+import csv
+import json
+import tempfile
+from collections import deque
+from typing import Any, AsyncIterator, Deque, Dict, Iterator, List, Optional, Tuple
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from sqlalchemy import inspect
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from app.api import deps
+from app.core.config import settings
 from app.crud import crud_user
-from app.schemas.user import User, UserUpdate
+from app.schemas.pagination import Page
+from app.schemas.user import User, UserCreate, UserImportResult, UserListItem, UserUpdate
 
 router = APIRouter()
 
-@router.get("/", response_model=List[User])
+async def _read_lines(request: Request) -> AsyncIterator[Tuple[int, str]]:
+    """
+    逐块读取请求体并按行切分（JSONL），返回(行号, 行内容)，跳过空行
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    buffer, number = "", 0
+    async for chunk in request.stream():
+        buffer += decoder.decode(chunk)
+        *lines, buffer = buffer.split("\n")
+        for line in lines:
+            number += 1
+            if line.strip():
+                yield number, line.rstrip("\r")
+    buffer += decoder.decode(b"", final=True)
+    if buffer.strip():
+        yield number + 1, buffer.rstrip("\r")
+
+class _PendingLines:
+    """
+    csv.reader的输入：已从请求体解码、尚未解析的行（保留换行符）
+    """
+    def __init__(self):
+        self.lines: Deque[str] = deque()
+
+    def __iter__(self) -> "_PendingLines":
+        return self
+
+    def __next__(self) -> str:
+        if not self.lines:
+            raise StopIteration
+        return self.lines.popleft()
+
+async def _read_csv(request: Request) -> AsyncIterator[Tuple[int, Optional[List[str]], Optional[str]]]:
+    """
+    逐块读取请求体，用同一个csv.reader解析，返回(记录起始行号, 字段列表, 错误)，跳过空行
+    引号内的换行属于字段内容：已读入的行中引号全部配对时才从reader取记录，记录不会在块的边界被截断
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = _PendingLines()
+    reader = csv.reader(pending)
+    buffer, quotes, pending_size = "", 0, 0
+
+    def records() -> Iterator[Tuple[int, Optional[List[str]], Optional[str]]]:
+        nonlocal quotes, pending_size
+        while pending.lines:
+            number = reader.line_num + 1
+            try:
+                values = next(reader)
+            except csv.Error:
+                # 字段超过长度上限等格式错误，丢弃已读入的行，从下一行重新开始
+                pending.lines.clear()
+                yield number, None, "CSV格式错误"
+                break
+            if values:
+                yield number, values, None
+        quotes, pending_size = 0, 0
+
+    async for chunk in request.stream():
+        buffer += decoder.decode(chunk)
+        *lines, buffer = buffer.split("\n")
+        for line in lines:
+            pending.lines.append(line + "\n")
+            quotes += line.count('"')
+            pending_size += len(line) + 1
+            # 引号未闭合时继续读入后续行；超过单个字段的长度上限后不再等待，由reader报告错误
+            if quotes % 2 == 0 or pending_size > csv.field_size_limit():
+                for record in records():
+                    yield record
+    buffer += decoder.decode(b"", final=True)
+    if buffer:
+        pending.lines.append(buffer)
+    for record in records():
+        yield record
+
+async def _parse_rows(
+    request: Request, format: str
+) -> AsyncIterator[Tuple[int, Optional[Dict[str, Any]], Optional[str]]]:
+    """
+    解析CSV（首行为表头）或JSONL，返回(行号, 字段, 错误)
+    """
+    if format == "csv":
+        header = None
+        async for number, values, error in _read_csv(request):
+            if error is not None:
+                yield number, None, error
+                continue
+            if header is None:
+                header = [name.strip() for name in values]
+                continue
+            if len(values) != len(header):
+                yield number, None, "列数与表头不一致"
+                continue
+            # CSV中的空值视为未提供
+            yield number, {key: value for key, value in zip(header, values) if value != ""}, None
+        return
+    async for number, line in _read_lines(request):
+        try:
+            data = json.loads(line)
+        except ValueError:
+            yield number, None, "无效的JSON"
+            continue
+        if not isinstance(data, dict):
+            yield number, None, "每行应为一个JSON对象"
+            continue
+        yield number, data, None
+
+def _read_spool(spool) -> Iterator[bytes]:
+    try:
+        spool.seek(0)
+        yield from spool
+    finally:
+        spool.close()
+
+def _columns(user) -> Dict[str, Any]:
+    return {attr.key: getattr(user, attr.key) for attr in inspect(user).mapper.column_attrs}
+
+def _user_with_stats(db: Session, user, viewer_id: int) -> Dict[str, Any]:
+    """
+    用户信息附带粉丝数、关注数（一次查询）
+    """
+    followers, following, _ = crud_user.user.get_follow_stats(db, user_id=user.id, viewer_id=viewer_id)
+    return dict(_columns(user), followers=followers, following=following)
+
+def _user_page(db: Session, users: List[Any], next_cursor: Optional[str], viewer_id: int) -> Dict[str, Any]:
+    """
+    一页用户列表项，整页的关注统计批量查询，不随每页人数增加查询次数
+    """
+    stats = crud_user.user.get_follow_stats_many(db, user_ids=[user.id for user in users], viewer_id=viewer_id)
+    items = []
+    for user in users:
+        followers, following, is_following = stats[user.id]
+        items.append(
+            dict(
+                _columns(user),
+                followers_count=followers,
+                following_count=following,
+                is_following=is_following,
+            )
+        )
+    return {"items": items, "next_cursor": next_cursor}
+
+@router.get("/", response_model=Page[UserListItem])
 def read_users(
     db: Session = Depends(deps.get_db),
-    skip: int = 0,
-    limit: int = 100,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=100),
     current_user: User = Depends(deps.get_current_active_user),
 ) -> Any:
     """
-    获取用户列表
+    获取用户列表（游标分页）
+    """
+    try:
+        users, next_cursor = crud_user.user.get_page(db, cursor=cursor, limit=limit)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="无效的游标")
+    return _user_page(db, users, next_cursor, current_user.id)
+
+@router.post("/import", response_class=StreamingResponse)
+async def import_users(
+    request: Request,
+    db: Session = Depends(deps.get_db),
+    format: Optional[str] = Query(None, pattern="^(csv|jsonl)$"),
+    current_user: User = Depends(deps.get_current_active_superuser),
+) -> Any:
+    """
+    批量导入用户（仅超级用户），请求体为CSV（首行为表头）或JSONL，字段同注册接口
+    未指定format时根据Content-Type判断；边读取边分批写入，
+    返回每行一个结果的JSONL（UserImportResult），响应头中包含各状态的行数
     """
-    users = crud_user.user.get_multi(db, skip=skip, limit=limit)
-    return users
+    if format is None:
+        format = "csv" if "csv" in request.headers.get("content-type", "") else "jsonl"
+    # 响应开始后无法再读取请求体，结果先写入临时文件，导入完成后再流式返回
+    spool = tempfile.SpooledTemporaryFile(max_size=1024 * 1024)
+    counts = {"created": 0, "conflict": 0, "invalid": 0}
+    seen_emails, seen_usernames = set(), set()
+    batch: List[Tuple[int, UserCreate]] = []
+    invalid: List[Dict[str, Any]] = []
+
+    async def flush() -> None:
+        results = invalid[:]
+        if batch:
+            results += await run_in_threadpool(
+                crud_user.user.import_batch,
+                db,
+                rows=batch,
+                seen_emails=seen_emails,
+                seen_usernames=seen_usernames,
+            )
+        # 结果按行号顺序写出
+        for result in sorted(results, key=lambda result: result["line"]):
+            counts[result["status"]] += 1
+            spool.write(UserImportResult(**result).model_dump_json(exclude_none=True).encode() + b"\n")
+        batch.clear()
+        invalid.clear()
+
+    try:
+        async for number, data, error in _parse_rows(request, format):
+            if data is not None:
+                try:
+                    batch.append((number, UserCreate(**data)))
+                except ValidationError as e:
+                    first = e.errors()[0]
+                    error = f"{'.'.join(str(loc) for loc in first['loc'])}: {first['msg']}"
+            if error is not None:
+                invalid.append({"line": number, "status": "invalid", "error": error})
+            if len(batch) + len(invalid) >= settings.USER_IMPORT_BATCH_SIZE:
+                await flush()
+        await flush()
+    except Exception:
+        spool.close()
+        raise
+    return StreamingResponse(
+        _read_spool(spool),
+        media_type="application/x-ndjson",
+        headers={f"X-Import-{status_name.capitalize()}": str(count) for status_name, count in counts.items()},
+    )
 
 @router.get("/{user_id}", response_model=User)
-def read_user(
+async def read_user(
     user_id: int,
-    db: Session = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_active_user),
+    db: AsyncSession = Depends(deps.get_async_db),
+    current_user: User = Depends(deps.get_current_active_user_async),
 ) -> Any:
     """
-    获取用户信息
+    获取用户信息（粉丝数、关注数）
     """
-    user = crud_user.user.get(db, id=user_id)
+    user = await crud_user.user_async.get(db, id=user_id)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="用户不存在",
         )
     
-    # 添加关注状态
-    user.is_following = crud_user.user.is_following(db, follower=current_user, followed=user)
-    user.followers_count = crud_user.user.get_followers_count(db, user=user)
-    user.following_count = crud_user.user.get_following_count(db, user=user)
-    
-    return user
+    followers, following, _ = await crud_user.user_async.get_follow_stats(
+        db, user_id=user.id, viewer_id=current_user.id
+    )
+    return dict(_columns(user), followers=followers, following=following)
 
 @router.get("/username/{username}", response_model=User)
 def read_user_by_username(
@@ -60,12 +274,7 @@ def read_user_by_username(
             detail="用户不存在",
         )
     
-    # 添加关注状态
-    user.is_following = crud_user.user.is_following(db, follower=current_user, followed=user)
-    user.followers_count = crud_user.user.get_followers_count(db, user=user)
-    user.following_count = crud_user.user.get_following_count(db, user=user)
-    
-    return user
+    return _user_with_stats(db, user, current_user.id)
 
 @router.put("/me", response_model=User)
 def update_user_me(
@@ -78,7 +287,7 @@ def update_user_me(
     更新当前用户信息
     """
     user = crud_user.user.update(db, db_obj=current_user, obj_in=user_in)
-    return user
+    return _user_with_stats(db, user, current_user.id)
 
 @router.post("/follow/{user_id}", response_model=User)
 def follow_user(
@@ -102,20 +311,13 @@ def follow_user(
             detail="不能关注自己",
         )
     
-    if crud_user.user.is_following(db, follower=current_user, followed=user):
+    if not crud_user.user.follow(db, user_id=current_user.id, target_id=user.id):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="已经关注该用户",
         )
     
-    crud_user.user.follow(db, follower=current_user, followed=user)
-    
-    # 更新用户信息
-    user.is_following = True
-    user.followers_count = crud_user.user.get_followers_count(db, user=user)
-    user.following_count = crud_user.user.get_following_count(db, user=user)
-    
-    return user
+    return _user_with_stats(db, user, current_user.id)
 
 @router.post("/unfollow/{user_id}", response_model=User)
 def unfollow_user(
@@ -133,51 +335,46 @@ def unfollow_user(
             detail="用户不存在",
         )
     
-    if not crud_user.user.is_following(db, follower=current_user, followed=user):
+    if not crud_user.user.unfollow(db, user_id=current_user.id, target_id=user.id):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="未关注该用户",
         )
     
-    crud_user.user.unfollow(db, follower=current_user, followed=user)
-    
-    # 更新用户信息
-    user.is_following = False
-    user.followers_count = crud_user.user.get_followers_count(db, user=user)
-    user.following_count = crud_user.user.get_following_count(db, user=user)
-    
-    return user
+    return _user_with_stats(db, user, current_user.id)
 
-@router.get("/me/following", response_model=List[User])
+@router.get("/me/following", response_model=Page[UserListItem])
 def read_following(
     db: Session = Depends(deps.get_db),
-    skip: int = 0,
-    limit: int = 100,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=100),
     current_user: User = Depends(deps.get_current_active_user),
 ) -> Any:
     """
-    获取当前用户关注的用户列表
+    获取当前用户关注的用户列表（游标分页）
     """
-    users = current_user.following[skip:skip+limit]
-    for user in users:
-        user.is_following = True
-        user.followers_count = crud_user.user.get_followers_count(db, user=user)
-        user.following_count = crud_user.user.get_following_count(db, user=user)
-    return users
+    try:
+        users, next_cursor = crud_user.user.get_following(
+            db, user_id=current_user.id, cursor=cursor, limit=limit
+        )
+    except ValueError:
+        raise HTTPException(status_code=400, detail="无效的游标")
+    return _user_page(db, users, next_cursor, current_user.id)
 
-@router.get("/me/followers", response_model=List[User])
+@router.get("/me/followers", response_model=Page[UserListItem])
 def read_followers(
     db: Session = Depends(deps.get_db),
-    skip: int = 0,
-    limit: int = 100,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=100),
     current_user: User = Depends(deps.get_current_active_user),
 ) -> Any:
     """
-    获取当前用户的粉丝列表
+    获取当前用户的粉丝列表（游标分页）
     """
-    users = current_user.followers[skip:skip+limit]
-    for user in users:
-        user.is_following = crud_user.user.is_following(db, follower=current_user, followed=user)
-        user.followers_count = crud_user.user.get_followers_count(db, user=user)
-        user.following_count = crud_user.user.get_following_count(db, user=user)
-    return users 
\ No newline at end of file
+    try:
+        users, next_cursor = crud_user.user.get_followers(
+            db, user_id=current_user.id, cursor=cursor, limit=limit
+        )
+    except ValueError:
+        raise HTTPException(status_code=400, detail="无效的游标")
+    return _user_page(db, users, next_cursor, current_user.id)
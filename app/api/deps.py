@@ -1,25 +1,182 @@
-from typing import Generator, Optional
-from fastapi import Depends, HTTPException, status
+import time
+from typing import AsyncGenerator, Generator, Optional, Tuple
+from fastapi import Depends, HTTPException, Request, Response, status
 from fastapi.security import OAuth2PasswordBearer
+from fastapi.security.utils import get_authorization_scheme_param
 from jose import jwt, JWTError
-from pydantic import ValidationError
-from sqlalchemy.orm import Session
+from sqlalchemy import inspect
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, make_transient_to_detached
 
+from app.core.cache import primary_sticky_users, user_cache
 from app.core.config import settings
+from app.core.revocation import token_versions
 from app.core.security import verify_password
-from app.db.session import SessionLocal
+from app.db.replicas import replicas
+from app.db.routing import make_async_session, make_session
 from app.models.user import User
-from app.schemas.user import TokenData
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.API_V1_STR}/auth/login")
 
-def get_db() -> Generator:
+# 写请求之后一段时间内该客户端的读请求使用主库，值为截止时间戳
+PRIMARY_STICKY_COOKIE = "db_primary_until"
+# 同一截止时间也通过响应头返回，不保存cookie的客户端（如只使用Bearer令牌的客户端）可在随后的请求中带回
+PRIMARY_STICKY_HEADER = "X-DB-Primary-Until"
+SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+def _token_subject(request: Request) -> Optional[int]:
+    """
+    请求所带Bearer令牌的主体（用户ID），没有令牌或令牌无效时返回None
+    """
+    scheme, token = get_authorization_scheme_param(request.headers.get("Authorization"))
+    if scheme.lower() != "bearer" or not token:
+        return None
+    decoded = _decode_token(token)
+    return decoded[0] if decoded is not None else None
+
+def _sticky_until(request: Request, now: float) -> float:
+    """
+    客户端带回的粘滞截止时间（cookie或请求头中较晚的一个），不超过一个粘滞周期
+    """
+    sticky_until = 0.0
+    for value in (request.cookies.get(PRIMARY_STICKY_COOKIE), request.headers.get(PRIMARY_STICKY_HEADER)):
+        try:
+            sticky_until = max(sticky_until, float(value or 0))
+        except ValueError:
+            pass
+    return min(sticky_until, now + settings.DB_READ_STICKY_SECONDS + 1)
+
+def _session_purpose(request: Request, response: Response) -> Tuple[bool, bool]:
+    """
+    按请求方法决定会话用途，返回(是否只读, 是否可使用副本)
+    写请求之后，同一客户端随后的读请求在主库上读到自己的写入，客户端按以下任一方式识别：
+    - 写请求所带令牌的主体（用户ID），记录在本worker内
+    - 写请求响应中的cookie或响应头，客户端带回后在任意worker上生效
+    """
+    now = time.time()
+    if request.method not in SAFE_METHODS:
+        if replicas:
+            sticky_until = int(now + settings.DB_READ_STICKY_SECONDS) + 1
+            response.set_cookie(
+                PRIMARY_STICKY_COOKIE,
+                str(sticky_until),
+                max_age=int(settings.DB_READ_STICKY_SECONDS) + 1,
+                httponly=True,
+                samesite="lax",
+            )
+            response.headers[PRIMARY_STICKY_HEADER] = str(sticky_until)
+            user_id = _token_subject(request)
+            if user_id is not None:
+                primary_sticky_users.set(user_id, sticky_until)
+        return False, False
+    if not replicas:
+        return True, False
+    if _sticky_until(request, now) > now:
+        return True, False
+    user_id = _token_subject(request)
+    return True, user_id is None or primary_sticky_users.get(user_id) is None
+
+def get_db(request: Request, response: Response) -> Generator:
+    """
+    GET等只读请求得到只读会话（可路由到副本），其余请求得到主库上的写会话
+    会话在第一次执行语句时才选择引擎并取连接
+    """
+    read_only, use_replica = _session_purpose(request, response)
     try:
-        db = SessionLocal()
+        db = make_session(read_only=read_only, use_replica=use_replica)
         yield db
     finally:
         db.close()
 
+async def get_async_db(request: Request, response: Response) -> AsyncGenerator:
+    read_only, use_replica = _session_purpose(request, response)
+    async with make_async_session(read_only=read_only, use_replica=use_replica) as db:
+        yield db
+
+def _decode_token(token: str) -> Optional[Tuple[int, Optional[int], dict]]:
+    """
+    解码访问令牌，返回(用户ID, 令牌版本, 载荷)，令牌无效时返回None
+    """
+    try:
+        payload = jwt.decode(
+            token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
+        )
+        subject = payload.get("sub")
+        if subject is None:
+            return None
+        user_id = int(subject)
+        version = payload.get("ver")
+        if version is not None:
+            version = int(version)
+    except (JWTError, ValueError, TypeError):
+        return None
+    return user_id, version, payload
+
+def _cached_snapshot(user_id: int, version: Optional[int], payload: dict) -> Optional[dict]:
+    """
+    从缓存或令牌声明得到用户的列快照，都没有时返回None
+    """
+    snapshot = user_cache.get(user_id)
+    if snapshot is None and version is not None and token_versions.is_current(user_id, version):
+        snapshot = {
+            "id": user_id,
+            "is_active": bool(payload.get("act")),
+            "is_superuser": bool(payload.get("su")),
+            "token_version": version,
+        }
+    return snapshot
+
+def _detached_user(snapshot: dict) -> User:
+    user = User(**snapshot)
+    make_transient_to_detached(user)
+    return user
+
+def _cache_user(user: User) -> None:
+    user_cache.set(
+        user.id, {attr.key: getattr(user, attr.key) for attr in inspect(User).column_attrs}
+    )
+
+def get_user_from_token(db: Session, token: str) -> Optional[User]:
+    """
+    解析访问令牌并返回对应的用户，令牌无效或已吊销时返回None
+    用户的列快照按令牌主体（用户ID）缓存，命中时以merge(load=False)放入会话，不查询数据库；
+    携带声明且版本有效的令牌在未命中缓存时，直接由声明构造用户，其余字段在访问时才加载
+    """
+    decoded = _decode_token(token)
+    if decoded is None:
+        return None
+    user_id, version, payload = decoded
+    snapshot = _cached_snapshot(user_id, version, payload)
+    if snapshot is not None:
+        if version is not None and version < snapshot["token_version"]:
+            return None
+        return db.merge(_detached_user(snapshot), load=False)
+    user = db.get(User, user_id)
+    if user is None or (version is not None and version < user.token_version):
+        return None
+    _cache_user(user)
+    return user
+
+async def aget_user_from_token(db: AsyncSession, token: str) -> Optional[User]:
+    """
+    get_user_from_token的异步版本
+    异步会话不能按需加载属性，由声明构造的用户只能访问id、is_active、is_superuser
+    """
+    decoded = _decode_token(token)
+    if decoded is None:
+        return None
+    user_id, version, payload = decoded
+    snapshot = _cached_snapshot(user_id, version, payload)
+    if snapshot is not None:
+        if version is not None and version < snapshot["token_version"]:
+            return None
+        return await db.merge(_detached_user(snapshot), load=False)
+    user = await db.get(User, user_id)
+    if user is None or (version is not None and version < user.token_version):
+        return None
+    _cache_user(user)
+    return user
+
 def get_current_user(
     db: Session = Depends(get_db), token: str = Depends(oauth2_scheme)
 ) -> User:
@@ -28,17 +185,7 @@ def get_current_user(
         detail="无法验证凭据",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        payload = jwt.decode(
-            token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
-        )
-        username: str = payload.get("sub")
-        if username is None:
-            raise credentials_exception
-        token_data = TokenData(username=username)
-    except (JWTError, ValidationError):
-        raise credentials_exception
-    user = db.query(User).filter(User.username == token_data.username).first()
+    user = get_user_from_token(db, token)
     if user is None:
         raise credentials_exception
     return user
@@ -50,6 +197,25 @@ def get_current_active_user(
         raise HTTPException(status_code=400, detail="用户未激活")
     return current_user
 
+async def get_current_user_async(
+    db: AsyncSession = Depends(get_async_db), token: str = Depends(oauth2_scheme)
+) -> User:
+    user = await aget_user_from_token(db, token)
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="无法验证凭据",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return user
+
+async def get_current_active_user_async(
+    current_user: User = Depends(get_current_user_async),
+) -> User:
+    if not current_user.is_active:
+        raise HTTPException(status_code=400, detail="用户未激活")
+    return current_user
+
 def get_current_active_superuser(
     current_user: User = Depends(get_current_user),
 ) -> User:
@@ -57,4 +223,14 @@ def get_current_active_superuser(
         raise HTTPException(
             status_code=400, detail="用户没有足够的权限"
         )
-    return current_user 
\ No newline at end of file
+    return current_user
+
+def check_batch_size(count: int) -> None:
+    """
+    批量接口单次请求的条数上限
+    """
+    if count > settings.BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"单次批量操作最多{settings.BATCH_MAX_ITEMS}条",
+        )
@@ -0,0 +1,93 @@
+import threading
+from typing import List, Optional, Tuple
+
+from sqlalchemy import func, or_, select
+from sqlalchemy.orm import Session
+
+from app.core.bloom import BloomFilter
+from app.core.metrics import registry
+from app.db.session import SessionLocal
+from app.models.user import User
+
+class UserAvailability:
+    """
+    用户名和邮箱是否已被占用：每个worker各自维护已有用户名和邮箱的布隆过滤器，
+    过滤器判断不存在时直接回答，可能存在时才走索引查询
+    过滤器定期从数据库重建，本worker的注册和修改立即加入；
+    其他worker新注册的用户在重建前可能被判断为可用，最终以数据库唯一约束为准
+    """
+    def __init__(self, error_rate: float = 0.01):
+        self.error_rate = error_rate
+        self._emails: Optional[BloomFilter] = None
+        self._usernames: Optional[BloomFilter] = None
+        self._lock = threading.Lock()
+        # 重建期间加入的值，重建完成后补入新过滤器
+        self._recent: Optional[List[Tuple[Optional[str], Optional[str]]]] = None
+        self.filtered = registry.counter(
+            "user_availability_filtered_total", "由布隆过滤器直接判断为未占用的次数"
+        )
+        self.queried = registry.counter(
+            "user_availability_queries_total", "布隆过滤器无法排除、需要查询数据库的次数"
+        )
+
+    def add(self, *, email: Optional[str] = None, username: Optional[str] = None) -> None:
+        with self._lock:
+            if self._emails is not None and email:
+                self._emails.add(email)
+            if self._usernames is not None and username:
+                self._usernames.add(username)
+            if self._recent is not None:
+                self._recent.append((email, username))
+
+    def rebuild(self) -> None:
+        with self._lock:
+            self._recent = []
+        db = SessionLocal()
+        try:
+            capacity = db.scalar(select(func.count()).select_from(User)) or 0
+            # 预留增长空间，避免重建间隔内误判率明显上升
+            emails = BloomFilter(capacity * 2 + 1000, self.error_rate)
+            usernames = BloomFilter(capacity * 2 + 1000, self.error_rate)
+            rows = db.execute(
+                select(User.email, User.username).execution_options(yield_per=10000)
+            )
+            for email, username in rows:
+                if email:
+                    emails.add(email)
+                if username:
+                    usernames.add(username)
+        finally:
+            db.close()
+        with self._lock:
+            for email, username in self._recent:
+                if email:
+                    emails.add(email)
+                if username:
+                    usernames.add(username)
+            self._emails, self._usernames, self._recent = emails, usernames, None
+
+    def check(
+        self, db: Session, *, email: Optional[str] = None, username: Optional[str] = None
+    ) -> Tuple[bool, bool]:
+        """
+        返回(邮箱是否已占用, 用户名是否已占用)，未提供的项返回False
+        过滤器无法排除的项合并为一次查询
+        """
+        maybe_email = bool(email) and (self._emails is None or email in self._emails)
+        maybe_username = bool(username) and (self._usernames is None or username in self._usernames)
+        self.filtered.inc(int(bool(email) and not maybe_email) + int(bool(username) and not maybe_username))
+        if not maybe_email and not maybe_username:
+            return False, False
+        self.queried.inc()
+        criteria = []
+        if maybe_email:
+            criteria.append(User.email == email)
+        if maybe_username:
+            criteria.append(User.username == username)
+        rows = db.execute(select(User.email, User.username).where(or_(*criteria)).limit(2)).all()
+        return (
+            maybe_email and any(row.email == email for row in rows),
+            maybe_username and any(row.username == username for row in rows),
+        )
+
+user_availability = UserAvailability()
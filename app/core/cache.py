@@ -0,0 +1,63 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+from app.core.config import settings
+from app.core.metrics import registry
+
+class TTLCache:
+    """
+    进程内的LRU缓存，条目在ttl秒后过期，容量满时淘汰最久未使用的条目
+    命中/未命中次数记录到指标注册表
+    """
+    def __init__(self, name: str, *, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = registry.counter(f"{name}_cache_hits_total", f"{name} 缓存命中次数")
+        self.misses = registry.counter(f"{name}_cache_misses_total", f"{name} 缓存未命中次数")
+        registry.gauge(f"{name}_cache_size", f"{name} 缓存条目数", lambda: len(self._data))
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[0] > now:
+                self._data.move_to_end(key)
+                self.hits.inc()
+                return entry[1]
+            if entry is not None:
+                del self._data[key]
+        self.misses.inc()
+        return None
+
+    def set(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+# 已认证用户的列快照，按令牌主体（用户ID）缓存；各worker独立，其他worker上的修改在ttl内生效
+user_cache = TTLCache(
+    "auth_user",
+    maxsize=settings.AUTH_USER_CACHE_MAXSIZE,
+    ttl=settings.AUTH_USER_CACHE_TTL_SECONDS,
+)
+
+# 发出过写请求的用户（按令牌主体），ttl内的读请求使用主库；各worker独立，跨worker依赖客户端带回的cookie或请求头
+primary_sticky_users = TTLCache(
+    "db_primary_sticky",
+    maxsize=settings.DB_READ_STICKY_MAXSIZE,
+    ttl=settings.DB_READ_STICKY_SECONDS,
+)
@@ -22,11 +22,79 @@ class Settings(BaseSettings):
     
     # 数据库配置 - 使用PostgreSQL
     SQLALCHEMY_DATABASE_URI: Optional[str] = os.getenv("DATABASE_URL")
+    # 连接池（每个worker的同步、异步引擎各一个）：
+    # 总连接数上限为 workers × 2 × (DB_POOL_SIZE + DB_POOL_MAX_OVERFLOW)，需小于PostgreSQL的max_connections
+    DB_POOL_SIZE: int = 5
+    DB_POOL_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30
+    DB_POOL_RECYCLE: int = 1800
+    # LIFO优先复用最近归还的连接，低峰期多余的连接会空闲到被回收
+    DB_POOL_USE_LIFO: bool = True
+    DB_POOL_PRE_PING: bool = True
+    # 大于0时只对空闲超过该秒数的连接做存活检查，代替每次取连接都ping
+    DB_POOL_PING_IDLE_SECONDS: float = 0
+    
+    # 只读副本：逗号分隔的连接URL，为空时所有请求都使用主库
+    # GET等只读请求路由到延迟不超过DB_REPLICA_MAX_LAG_SECONDS的副本，
+    # 客户端发出写请求后DB_READ_STICKY_SECONDS内的读请求仍走主库，保证读到自己的写入
+    DATABASE_REPLICA_URLS: str = ""
+    DB_REPLICA_MAX_LAG_SECONDS: float = 5
+    DB_REPLICA_CHECK_SECONDS: float = 5
+    DB_READ_STICKY_SECONDS: float = 10
+    # 按令牌主体（用户ID）记录写请求时，每个worker最多记录的用户数
+    DB_READ_STICKY_MAXSIZE: int = 10000
     
     # JWT配置
     SECRET_KEY: str = secrets.token_urlsafe(32)
     ALGORITHM: str = os.getenv("ALGORITHM", "HS256")
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 8
+    # 已认证用户缓存：命中时请求无需查询用户表
+    AUTH_USER_CACHE_TTL_SECONDS: float = 30
+    AUTH_USER_CACHE_MAXSIZE: int = 10000
+    # 令牌携带用户ID、激活状态、超级用户标记和令牌版本，版本有效时认证无需查询数据库
+    AUTH_CLAIMS_TOKENS: bool = False
+    AUTH_REVOCATION_REFRESH_SECONDS: float = 30
+    
+    # 密码哈希：bcrypt成本因子（修改后用户下次登录时自动重新哈希），
+    # 以及执行哈希的进程池大小（0表示在请求线程中执行）
+    PASSWORD_HASH_ROUNDS: int = 12
+    PASSWORD_HASH_WORKERS: int = 2
+    
+    # 登录限流：窗口内按IP和邮箱分别限制尝试次数，超出时在验证密码前返回429
+    # 后端为memory（每个worker各自计数）或database（所有worker共享）
+    LOGIN_RATE_LIMIT_ENABLED: bool = True
+    LOGIN_RATE_LIMIT_BACKEND: str = "memory"
+    LOGIN_RATE_LIMIT_WINDOW_SECONDS: int = 300
+    LOGIN_RATE_LIMIT_PER_IP: int = 100
+    LOGIN_RATE_LIMIT_PER_EMAIL: int = 10
+    
+    # 批量导入用户时每批写入的行数
+    USER_IMPORT_BATCH_SIZE: int = 500
+    
+    # 论文、标签等批量创建/更新/删除接口单次请求的最大条数
+    BATCH_MAX_ITEMS: int = 1000
+    
+    # 用户名/邮箱占用判断的布隆过滤器重建间隔（秒）
+    USER_AVAILABILITY_REFRESH_SECONDS: float = 300
+    
+    # 实时消息推送配置：memory（单进程）或 broker（多worker通过本地中转服务分发）
+    PUBSUB_BACKEND: str = "memory"
+    PUBSUB_BROKER_HOST: str = "127.0.0.1"
+    PUBSUB_BROKER_PORT: int = 8765
+    # 中转服务为单个连接缓存的待发送字节数上限，超过时断开该连接（worker会自动重连）
+    PUBSUB_BROKER_MAX_BUFFER_BYTES: int = 4 * 1024 * 1024
+    
+    # 发送消息的组提交：并发发送在窗口期内合并为一个事务写入
+    MESSAGE_GROUP_COMMIT: bool = False
+    MESSAGE_GROUP_COMMIT_WINDOW_MS: float = 5
+    MESSAGE_GROUP_COMMIT_MAX_BATCH: int = 100
+    
+    # 消息归档：已读且超过指定天数的消息移入压缩归档文件，目录需为各实例共享的持久存储
+    MESSAGE_ARCHIVE_DIR: str = "archive/messages"
+    MESSAGE_ARCHIVE_AFTER_DAYS: int = 180
+    MESSAGE_ARCHIVE_BATCH_SIZE: int = 10000
+    # 按月分区时提前创建的分区月数（仅PostgreSQL）
+    MESSAGE_PARTITION_MONTHS_AHEAD: int = 3
     
     # 超级用户配置
     FIRST_SUPERUSER_EMAIL: EmailStr = "admin@sparkhub.com"
@@ -0,0 +1,33 @@
+from typing import Dict, Optional, Tuple
+
+from passlib.context import CryptContext
+
+# 在密码哈希进程池的子进程中执行，只依赖passlib，避免子进程导入整个应用
+_contexts: Dict[int, CryptContext] = {}
+
+def make_context(rounds: int) -> CryptContext:
+    """
+    创建bcrypt上下文；成本因子不等于rounds的哈希在验证时会被标记为需要重新哈希
+    """
+    return CryptContext(
+        schemes=["bcrypt"],
+        deprecated="auto",
+        bcrypt__default_rounds=rounds,
+        bcrypt__min_rounds=rounds,
+        bcrypt__max_rounds=rounds,
+    )
+
+def _context(rounds: int) -> CryptContext:
+    context = _contexts.get(rounds)
+    if context is None:
+        context = _contexts[rounds] = make_context(rounds)
+    return context
+
+def hash_password(password: str, rounds: int) -> str:
+    return _context(rounds).hash(password)
+
+def verify_and_update(password: str, hashed_password: str, rounds: int) -> Tuple[bool, Optional[str]]:
+    """
+    验证密码，密码正确且成本因子与配置不同时同时返回新的哈希
+    """
+    return _context(rounds).verify_and_update(password, hashed_password)
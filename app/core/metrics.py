@@ -0,0 +1,83 @@
+import threading
+from typing import Callable, Dict, Optional, Union
+
+class Counter:
+    """
+    单调递增的计数器
+    """
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str):
+        self.name = name
+        self.documentation = documentation
+        self._value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1) -> None:
+        with self._lock:
+            self._value += amount
+
+    @property
+    def value(self) -> int:
+        return self._value
+
+class Gauge:
+    """
+    可增可减的瞬时值；指定func时在读取时计算
+    """
+    type = "gauge"
+
+    def __init__(
+        self, name: str, documentation: str, func: Optional[Callable[[], float]] = None
+    ):
+        self.name = name
+        self.documentation = documentation
+        self._func = func
+        self._value: float = 0
+        self._lock = threading.Lock()
+
+    def set(self, value: float) -> None:
+        self._value = value
+
+    def inc(self, amount: float = 1) -> None:
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount: float = 1) -> None:
+        self.inc(-amount)
+
+    @property
+    def value(self) -> float:
+        return self._func() if self._func is not None else self._value
+
+class MetricsRegistry:
+    """
+    进程内的指标注册表，以Prometheus文本格式导出
+    每个worker进程各自计数，抓取时会落到其中一个worker上
+    """
+    def __init__(self):
+        self._metrics: Dict[str, Union[Counter, Gauge]] = {}
+        self._lock = threading.Lock()
+
+    def counter(self, name: str, documentation: str) -> Counter:
+        return self._register(Counter(name, documentation))
+
+    def gauge(
+        self, name: str, documentation: str, func: Optional[Callable[[], float]] = None
+    ) -> Gauge:
+        return self._register(Gauge(name, documentation, func))
+
+    def _register(self, metric):
+        with self._lock:
+            # 同名指标只注册一次，重复注册返回已有的指标
+            return self._metrics.setdefault(metric.name, metric)
+
+    def render(self) -> str:
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.append(f"{metric.name} {metric.value}")
+        return "\n".join(lines) + "\n"
+
+registry = MetricsRegistry()
@@ -0,0 +1,209 @@
+"""
+实时消息推送的发布/订阅中心
+
+接口层（WebSocket/SSE）按用户ID订阅事件，写入路径调用 hub.publish 发布事件。
+跨进程分发由可替换的后端负责：
+- memory: 仅在当前进程内分发（单worker部署）
+- broker: 通过本地中转服务在多个gunicorn worker之间分发，
+  中转服务可由 deploy/gunicorn_conf.py 自动启动，或执行 `python -m app.core.pubsub` 单独运行
+"""
+import asyncio
+import json
+from abc import ABC, abstractmethod
+import logging
+from collections import defaultdict
+from typing import Any, Callable, Dict, Optional, Set
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+Deliver = Callable[[int, Dict[str, Any]], None]
+
+
+class PubSubBackend(ABC):
+    """
+    跨进程分发后端的接口
+    """
+    @abstractmethod
+    async def start(self, deliver: Deliver) -> None:
+        pass
+
+    async def stop(self) -> None:
+        pass
+
+    @abstractmethod
+    def publish(self, user_id: int, event: Dict[str, Any]) -> None:
+        """
+        发布事件，可在任意线程中调用
+        """
+
+
+class MemoryBackend(PubSubBackend):
+    """
+    进程内后端，事件只投递给当前worker的订阅者
+    """
+    def __init__(self) -> None:
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._deliver: Optional[Deliver] = None
+
+    async def start(self, deliver: Deliver) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._deliver = deliver
+
+    def publish(self, user_id: int, event: Dict[str, Any]) -> None:
+        if self._loop is None or self._deliver is None:
+            return
+        self._loop.call_soon_threadsafe(self._deliver, user_id, event)
+
+
+class BrokerBackend(PubSubBackend):
+    """
+    本地中转后端，所有worker连接同一个中转服务，
+    发布的事件由中转服务广播回每个worker（包括发布者自己）
+    """
+    def __init__(self, host: str, port: int, reconnect_delay: float = 1.0) -> None:
+        self.host = host
+        self.port = port
+        self.reconnect_delay = reconnect_delay
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._deliver: Optional[Deliver] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self, deliver: Deliver) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._deliver = deliver
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+        if self._writer:
+            self._writer.close()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                reader, self._writer = await asyncio.open_connection(self.host, self.port)
+                logger.info(f"已连接消息中转服务 {self.host}:{self.port}")
+                while True:
+                    line = await reader.readline()
+                    if not line:
+                        break
+                    data = json.loads(line)
+                    self._deliver(data["user_id"], data["event"])
+            except (OSError, ValueError) as e:
+                logger.warning(f"消息中转服务连接异常: {e}")
+            finally:
+                self._writer = None
+            await asyncio.sleep(self.reconnect_delay)
+
+    def publish(self, user_id: int, event: Dict[str, Any]) -> None:
+        if self._loop is None:
+            return
+        line = (json.dumps({"user_id": user_id, "event": event}) + "\n").encode()
+        self._loop.call_soon_threadsafe(self._write, line)
+
+    def _write(self, line: bytes) -> None:
+        if self._writer is None:
+            logger.warning("消息中转服务未连接，事件已丢弃")
+            return
+        self._writer.write(line)
+
+
+class MessageHub:
+    """
+    按用户ID管理订阅者并投递事件
+    """
+    def __init__(self, backend: PubSubBackend, queue_size: int = 100) -> None:
+        self.backend = backend
+        self.queue_size = queue_size
+        self._subscribers: Dict[int, Set[asyncio.Queue]] = defaultdict(set)
+
+    async def start(self) -> None:
+        await self.backend.start(self._deliver)
+
+    async def stop(self) -> None:
+        await self.backend.stop()
+
+    def subscribe(self, user_id: int) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers[user_id].add(queue)
+        return queue
+
+    def unsubscribe(self, user_id: int, queue: asyncio.Queue) -> None:
+        queues = self._subscribers.get(user_id)
+        if queues is None:
+            return
+        queues.discard(queue)
+        if not queues:
+            del self._subscribers[user_id]
+
+    def publish(self, user_id: int, event: Dict[str, Any]) -> None:
+        """
+        发布事件给指定用户，可在同步接口的线程池中直接调用
+        """
+        self.backend.publish(user_id, event)
+
+    def _deliver(self, user_id: int, event: Dict[str, Any]) -> None:
+        for queue in self._subscribers.get(user_id, ()):
+            # 客户端消费过慢时丢弃最旧的事件，客户端可通过after_id补齐历史
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(event)
+
+
+async def serve_broker(host: str, port: int, max_buffer: Optional[int] = None) -> None:
+    """
+    运行本地消息中转服务：把任一连接发来的事件广播给所有连接
+    广播不等待任何连接发送完成；某个连接待发送的数据超过max_buffer字节（该worker停止读取）时断开它，
+    避免一个卡住的worker使中转服务的内存无限增长，也不拖慢其他worker
+    """
+    if max_buffer is None:
+        max_buffer = settings.PUBSUB_BROKER_MAX_BUFFER_BYTES
+    clients: Set[asyncio.StreamWriter] = set()
+
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        clients.add(writer)
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                for client in list(clients):
+                    if client.transport.get_write_buffer_size() > max_buffer:
+                        logger.warning(f"消息中转连接 {client.get_extra_info('peername')} 消费过慢，已断开")
+                        clients.discard(client)
+                        # 丢弃未发送的数据并立即关闭，close()会等待缓冲区发送完
+                        client.transport.abort()
+                        continue
+                    client.write(line)
+        except OSError:
+            pass
+        finally:
+            clients.discard(writer)
+            writer.close()
+
+    server = await asyncio.start_server(handle, host, port)
+    logger.info(f"消息中转服务已启动 {host}:{port}")
+    async with server:
+        await server.serve_forever()
+
+
+def run_broker() -> None:
+    asyncio.run(serve_broker(settings.PUBSUB_BROKER_HOST, settings.PUBSUB_BROKER_PORT))
+
+
+def create_backend() -> PubSubBackend:
+    if settings.PUBSUB_BACKEND == "broker":
+        return BrokerBackend(settings.PUBSUB_BROKER_HOST, settings.PUBSUB_BROKER_PORT)
+    return MemoryBackend()
+
+
+hub = MessageHub(create_backend())
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    run_broker()
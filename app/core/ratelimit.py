@@ -0,0 +1,156 @@
+import math
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import delete, select
+
+from app.core.config import settings
+from app.core.metrics import registry
+from app.crud.base import dialect_insert
+from app.db.session import SessionLocal
+from app.models.rate_limit import RateLimitCounter
+
+class RateLimitBackend(ABC):
+    """
+    限流计数后端：递增键在当前窗口的计数，并返回(上一窗口计数, 当前窗口计数)
+    """
+    # 是否会阻塞（访问数据库等），阻塞的后端需在线程池中调用
+    blocking = False
+
+    @abstractmethod
+    def incr(self, key: str, window_start: int, window: int) -> Tuple[int, int]:
+        pass
+
+    def prune(self, before: int) -> None:
+        """
+        清理窗口起始时间早于before的计数
+        """
+
+class MemoryBackend(RateLimitBackend):
+    """
+    进程内计数，每个worker各自限流
+    """
+    def __init__(self):
+        self._counts: Dict[Tuple[str, int], int] = {}
+        self._lock = threading.Lock()
+
+    def incr(self, key: str, window_start: int, window: int) -> Tuple[int, int]:
+        with self._lock:
+            current = self._counts.get((key, window_start), 0) + 1
+            self._counts[(key, window_start)] = current
+            return self._counts.get((key, window_start - window), 0), current
+
+    def prune(self, before: int) -> None:
+        with self._lock:
+            for entry in [entry for entry in self._counts if entry[1] < before]:
+                del self._counts[entry]
+
+class DatabaseBackend(RateLimitBackend):
+    """
+    数据库计数，所有worker共享；每次检查一条UPSERT ... RETURNING和一次主键查询
+    """
+    blocking = True
+
+    def incr(self, key: str, window_start: int, window: int) -> Tuple[int, int]:
+        db = SessionLocal()
+        try:
+            stmt = dialect_insert(db, RateLimitCounter.__table__).values(
+                key=key, window_start=window_start, count=1
+            )
+            current = db.scalar(
+                stmt.on_conflict_do_update(
+                    index_elements=[RateLimitCounter.key, RateLimitCounter.window_start],
+                    set_={"count": RateLimitCounter.count + 1},
+                ).returning(RateLimitCounter.count)
+            )
+            previous = db.scalar(
+                select(RateLimitCounter.count).where(
+                    RateLimitCounter.key == key,
+                    RateLimitCounter.window_start == window_start - window,
+                )
+            )
+            db.commit()
+            return previous or 0, current
+        finally:
+            db.close()
+
+    def prune(self, before: int) -> None:
+        db = SessionLocal()
+        try:
+            db.execute(delete(RateLimitCounter).where(RateLimitCounter.window_start < before))
+            db.commit()
+        finally:
+            db.close()
+
+class SlidingWindowLimiter:
+    """
+    滑动窗口计数限流：当前窗口计数加上一窗口计数按剩余重叠比例加权，
+    每个键只需保存两个计数；被拒绝的尝试同样计数
+    """
+    def __init__(self, backend: RateLimitBackend, *, limit: int, window: int):
+        self.backend = backend
+        self.limit = limit
+        self.window = window
+
+    def hit(self, key: str, now: Optional[float] = None) -> float:
+        """
+        记录一次请求，超出限制时返回需要等待的秒数，否则返回0
+        """
+        now = time.time() if now is None else now
+        window_start = int(now // self.window) * self.window
+        previous, current = self.backend.incr(key, window_start, self.window)
+        elapsed = now - window_start
+        weight = 1 - elapsed / self.window
+        if previous * weight + current <= self.limit:
+            return 0
+        # 下一次请求本身也会计数，估算值需降到limit - 1以下
+        allowed = self.limit - 1
+        if previous and current <= allowed:
+            # 上一窗口的权重随时间线性下降，在当前窗口内即可降下来
+            wait = (previous * weight + current - allowed) * self.window / previous
+        else:
+            # 需等到下一个窗口，当前窗口的计数在下一个窗口里同样按比例下降
+            wait = self.window - elapsed + self.window * (1 - allowed / current)
+        return max(1.0, math.ceil(wait))
+
+class LoginRateLimiter:
+    """
+    登录限流：按客户端IP和登录邮箱分别计数，在验证密码之前拒绝超出限制的尝试
+    """
+    def __init__(self, backend: RateLimitBackend):
+        self.backend = backend
+        self.by_ip = SlidingWindowLimiter(
+            backend,
+            limit=settings.LOGIN_RATE_LIMIT_PER_IP,
+            window=settings.LOGIN_RATE_LIMIT_WINDOW_SECONDS,
+        )
+        self.by_email = SlidingWindowLimiter(
+            backend,
+            limit=settings.LOGIN_RATE_LIMIT_PER_EMAIL,
+            window=settings.LOGIN_RATE_LIMIT_WINDOW_SECONDS,
+        )
+        self.rejected = registry.counter("login_rate_limited_total", "被限流拒绝的登录尝试次数")
+
+    def check(self, *, ip: Optional[str], email: str) -> float:
+        """
+        返回需要等待的秒数，0表示允许本次登录尝试
+        """
+        retry_after = self.by_email.hit(f"login:email:{email.strip().lower()}")
+        if ip:
+            retry_after = max(retry_after, self.by_ip.hit(f"login:ip:{ip}"))
+        if retry_after:
+            self.rejected.inc()
+        return retry_after
+
+    def prune(self) -> None:
+        window = settings.LOGIN_RATE_LIMIT_WINDOW_SECONDS
+        self.backend.prune(int(time.time() // window) * window - window)
+
+def create_backend() -> RateLimitBackend:
+    if settings.LOGIN_RATE_LIMIT_BACKEND == "database":
+        return DatabaseBackend()
+    return MemoryBackend()
+
+login_limiter = LoginRateLimiter(create_backend())
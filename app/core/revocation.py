@@ -0,0 +1,47 @@
+import threading
+from typing import Dict
+
+from sqlalchemy import select
+
+from app.core.metrics import registry
+from app.db.session import SessionLocal
+from app.models.user import User
+
+class TokenVersionMap:
+    """
+    令牌版本表：只记录token_version大于0的用户（改过密码、被停用或权限变更）
+    携带声明的令牌中ver不小于表中版本即有效，无需查询数据库
+    定期从数据库整体刷新；本worker内的变更通过bump立即生效
+    """
+    def __init__(self):
+        self._versions: Dict[int, int] = {}
+        self._lock = threading.Lock()
+        # 首次刷新完成前无法判断令牌是否已吊销
+        self.loaded = False
+        registry.gauge("auth_token_versions_size", "令牌版本表中的用户数", lambda: len(self._versions))
+
+    def is_current(self, user_id: int, version: int) -> bool:
+        return self.loaded and version >= self._versions.get(user_id, 0)
+
+    def bump(self, user_id: int, version: int) -> None:
+        with self._lock:
+            if version > self._versions.get(user_id, 0):
+                self._versions[user_id] = version
+
+    def refresh(self) -> None:
+        db = SessionLocal()
+        try:
+            versions = dict(
+                db.execute(select(User.id, User.token_version).where(User.token_version > 0)).all()
+            )
+        finally:
+            db.close()
+        with self._lock:
+            # 保留本worker中比数据库读到的更新的版本
+            for user_id, version in self._versions.items():
+                if version > versions.get(user_id, 0):
+                    versions[user_id] = version
+            self._versions = versions
+            self.loaded = True
+
+token_versions = TokenVersionMap()
@@ -0,0 +1,60 @@
+import logging
+import threading
+from typing import Callable, List
+
+logger = logging.getLogger(__name__)
+
+class PeriodicTask:
+    """
+    在后台线程中按固定间隔执行的任务，启动时立即执行一次
+    单次执行失败只记录日志，不影响后续执行
+    """
+    def __init__(self, name: str, interval: float, func: Callable[[], None]):
+        self.name = name
+        self.interval = interval
+        self.func = func
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stopped.is_set():
+            try:
+                self.func()
+            except Exception:
+                logger.exception(f"定时任务 {self.name} 执行失败")
+            self._stopped.wait(self.interval)
+
+class Scheduler:
+    """
+    进程内的定时任务调度器，随应用启动和关闭；每个worker各自执行
+    """
+    def __init__(self):
+        self._tasks: List[PeriodicTask] = []
+
+    def add(self, name: str, interval: float, func: Callable[[], None]) -> PeriodicTask:
+        task = PeriodicTask(name, interval, func)
+        self._tasks.append(task)
+        return task
+
+    def start(self) -> None:
+        for task in self._tasks:
+            task.start()
+
+    def stop(self) -> None:
+        for task in self._tasks:
+            task.stop()
+
+scheduler = Scheduler()
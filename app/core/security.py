@@ -1,16 +1,97 @@
+import asyncio
+import multiprocessing
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
 from datetime import datetime, timedelta
-from typing import Any, Union
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple, Union
+from fastapi.concurrency import run_in_threadpool
 from jose import jwt
-from passlib.context import CryptContext
+from app.core import hashing
 from app.core.config import settings
+from app.core.metrics import registry
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = hashing.make_context(settings.PASSWORD_HASH_ROUNDS)
+
+class PasswordHasher:
+    """
+    在独立的进程池中执行bcrypt，避免占用请求线程池和GIL
+    workers为0时在当前进程内执行（异步调用放到线程池中）
+    """
+    def __init__(self, workers: int, rounds: int):
+        self.workers = workers
+        self.rounds = rounds
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        # 已提交但未完成的任务，关闭进程池时逐个取消（cancel_futures需要Python 3.9）
+        self._pending: Set[Future] = set()
+        self._pending_lock = threading.Lock()
+        self.queue_depth = registry.gauge(
+            "password_hash_queue_depth", "已提交但未完成的密码哈希/验证任务数"
+        )
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    # 使用spawn启动子进程，避免在多线程的服务进程中fork
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.workers,
+                        mp_context=multiprocessing.get_context("spawn"),
+                    )
+        return self._executor
+
+    def submit(self, func: Callable, *args: Any) -> Future:
+        self.queue_depth.inc()
+        future = self._get_executor().submit(func, *args, self.rounds)
+        with self._pending_lock:
+            self._pending.add(future)
+        future.add_done_callback(self._done)
+        return future
+
+    def _done(self, future: Future) -> None:
+        with self._pending_lock:
+            self._pending.discard(future)
+        self.queue_depth.dec()
+
+    def run(self, func: Callable, *args: Any) -> Any:
+        if not self.workers:
+            return func(*args, self.rounds)
+        return self.submit(func, *args).result()
+
+    async def arun(self, func: Callable, *args: Any) -> Any:
+        if not self.workers:
+            return await run_in_threadpool(func, *args, self.rounds)
+        return await asyncio.wrap_future(self.submit(func, *args))
+
+    def configure(self, workers: int) -> None:
+        """
+        调整进程池大小，已提交的任务会被取消
+        """
+        self.shutdown()
+        self.workers = workers
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                with self._pending_lock:
+                    pending = list(self._pending)
+                # 先取消排队中的任务，已开始执行的任务无法取消，会在子进程中执行完
+                for future in pending:
+                    future.cancel()
+                self._executor.shutdown(wait=False)
+                self._executor = None
+
+password_hasher = PasswordHasher(
+    workers=settings.PASSWORD_HASH_WORKERS, rounds=settings.PASSWORD_HASH_ROUNDS
+)
 
 def create_access_token(
-    subject: Union[str, Any], expires_delta: timedelta = None
+    subject: Union[str, Any],
+    expires_delta: timedelta = None,
+    claims: Optional[Dict[str, Any]] = None,
 ) -> str:
     """
-    创建JWT访问令牌
+    创建JWT访问令牌，claims为附加的声明
     """
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
@@ -18,7 +99,7 @@ def create_access_token(
         expire = datetime.utcnow() + timedelta(
             minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES
         )
-    to_encode = {"exp": expire, "sub": str(subject)}
+    to_encode = {**(claims or {}), "exp": expire, "sub": str(subject)}
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm="HS256")
     return encoded_jwt
 
@@ -26,10 +107,44 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     """
     验证密码
     """
-    return pwd_context.verify(plain_password, hashed_password)
+    return password_hasher.run(hashing.verify_and_update, plain_password, hashed_password)[0]
 
 def get_password_hash(password: str) -> str:
     """
     获取密码哈希
     """
-    return pwd_context.hash(password) 
\ No newline at end of file
+    return password_hasher.run(hashing.hash_password, password)
+
+def get_password_hashes(passwords: List[str]) -> List[str]:
+    """
+    批量获取密码哈希，全部提交后再等待，在进程池的各进程间并行计算
+    """
+    if not password_hasher.workers:
+        return [get_password_hash(password) for password in passwords]
+    futures = [password_hasher.submit(hashing.hash_password, password) for password in passwords]
+    return [future.result() for future in futures]
+
+async def averify_and_update_password(
+    plain_password: str, hashed_password: str
+) -> Tuple[bool, Optional[str]]:
+    """
+    异步验证密码，返回(是否正确, 新哈希)；成本因子与配置不同时返回新哈希，否则为None
+    """
+    return await password_hasher.arun(hashing.verify_and_update, plain_password, hashed_password)
+
+async def aget_password_hash(password: str) -> str:
+    """
+    异步获取密码哈希
+    """
+    return await password_hasher.arun(hashing.hash_password, password)
+
+def user_claims(user: Any) -> Dict[str, Any]:
+    """
+    携带声明的令牌中的用户声明：用户ID、是否激活、是否超级用户、令牌版本
+    """
+    return {
+        "uid": user.id,
+        "act": bool(user.is_active),
+        "su": bool(user.is_superuser),
+        "ver": user.token_version or 0,
+    }
@@ -1,5 +1,5 @@
-from .crud_user import user
-from .crud_knowledge_base import knowledge_base
-from .crud_paper import paper
-from .crud_message import message
-from .crud_tag import tag 
\ No newline at end of file
+from .crud_user import user, user_async
+from .crud_knowledge_base import knowledge_base, knowledge_base_async
+from .crud_paper import paper, paper_async
+from .crud_message import message, message_async
+from .crud_tag import tag
\ No newline at end of file
@@ -0,0 +1,112 @@
+from typing import Any, Dict, Generic, List, Optional, Sequence, Tuple, Type, Union
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import inspect, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.sql import Select
+
+from app.crud.base import (
+    CreateSchemaType,
+    ModelType,
+    UpdateSchemaType,
+    apply_returned,
+    changed_values,
+    loaded_values,
+    keyset_result,
+    keyset_statement,
+    lookup_statement,
+    update_returning,
+)
+
+async def apaginate(
+    db: AsyncSession,
+    stmt: Select,
+    keys: Sequence[Any],
+    *,
+    cursor: Optional[str] = None,
+    limit: int = 100,
+    descending: bool = False,
+) -> Tuple[List[Any], Optional[str]]:
+    """
+    paginate的异步版本
+    """
+    stmt = keyset_statement(stmt, keys, cursor=cursor, limit=limit, descending=descending)
+    return keyset_result((await db.scalars(stmt)).all(), keys, limit=limit)
+
+async def aget_by(db: AsyncSession, attribute: Any, value: Any) -> Optional[Any]:
+    return (await db.scalars(lookup_statement(attribute, value))).first()
+
+class AsyncCRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
+    def __init__(self, model: Type[ModelType]):
+        """
+        CRUDBase的异步版本，用于AsyncSession
+
+        异步会话不能在访问属性时隐式加载，需要的关系要在查询时用selectinload等预先加载
+        """
+        self.model = model
+
+    async def get(self, db: AsyncSession, id: Any) -> Optional[ModelType]:
+        return await db.get(self.model, id)
+
+    async def get_multi(
+        self, db: AsyncSession, *, skip: int = 0, limit: int = 100
+    ) -> List[ModelType]:
+        result = await db.scalars(select(self.model).offset(skip).limit(limit))
+        return list(result)
+
+    async def get_page(
+        self,
+        db: AsyncSession,
+        *,
+        cursor: Optional[str] = None,
+        limit: int = 100,
+        sort: Sequence[Any] = (),
+        descending: bool = False,
+        stmt: Optional[Select] = None,
+    ) -> Tuple[List[ModelType], Optional[str]]:
+        if stmt is None:
+            stmt = select(self.model)
+        return await apaginate(
+            db, stmt, [*sort, self.model.id], cursor=cursor, limit=limit, descending=descending
+        )
+
+    async def create(self, db: AsyncSession, *, obj_in: CreateSchemaType) -> ModelType:
+        obj_in_data = jsonable_encoder(obj_in)
+        db_obj = self.model(**obj_in_data)  # type: ignore
+        db.add(db_obj)
+        await db.flush()
+        # 异步会话提交后不过期；未插入值的列标记为已加载，访问时不会触发隐式IO
+        values = loaded_values(db_obj, inserted=True)
+        await db.commit()
+        for key, value in values.items():
+            set_committed_value(db_obj, key, value)
+        return db_obj
+
+    async def update(
+        self,
+        db: AsyncSession,
+        *,
+        db_obj: ModelType,
+        obj_in: Union[UpdateSchemaType, Dict[str, Any]]
+    ) -> ModelType:
+        columns = inspect(self.model).column_attrs.keys()
+        if isinstance(obj_in, dict):
+            update_data = obj_in
+        else:
+            update_data = obj_in.model_dump(exclude_unset=True)
+        values = {key: value for key, value in update_data.items() if key in columns and key != "id"}
+        changed = changed_values(db_obj, values)
+        if not changed:
+            return db_obj
+        stmt, keys = update_returning(self.model, db_obj.id, changed)
+        row = (await db.execute(stmt)).one()
+        await db.commit()
+        apply_returned(db_obj, keys, row)
+        return db_obj
+
+    async def remove(self, db: AsyncSession, *, id: int) -> Optional[ModelType]:
+        obj = await db.get(self.model, id)
+        if obj is not None:
+            await db.delete(obj)
+            await db.commit()
+        return obj
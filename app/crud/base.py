@@ -1,7 +1,15 @@
-from typing import Any, Dict, Generic, List, Optional, Type, TypeVar, Union
+import base64
+import json
+from datetime import datetime
+from typing import Any, Callable, Dict, Generic, List, Optional, Sequence, Tuple, Type, TypeVar, Union
 from fastapi.encoders import jsonable_encoder
 from pydantic import BaseModel
+from sqlalchemy import delete, insert, inspect, lambda_stmt, literal, select, tuple_, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import DataError, IntegrityError
 from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import NO_VALUE, set_committed_value
+from sqlalchemy.sql import Select
 
 from app.db.base_class import Base
 
@@ -9,6 +17,201 @@ ModelType = TypeVar("ModelType", bound=Base)
 CreateSchemaType = TypeVar("CreateSchemaType", bound=BaseModel)
 UpdateSchemaType = TypeVar("UpdateSchemaType", bound=BaseModel)
 
+def lookup_statement(attribute: Any, value: Any) -> Any:
+    """
+    按列的值查找第一条记录的lambda语句，如lookup_statement(User.email, email)
+    语句只在第一次调用时构造和编译，之后按缓存键（lambda的代码位置和所查的列）直接复用，每次只替换参数值
+    """
+    model = attribute.class_
+    return lambda_stmt(lambda: select(model).where(attribute == value).limit(1))
+
+def get_by(db: Session, attribute: Any, value: Any) -> Optional[Any]:
+    return db.scalars(lookup_statement(attribute, value)).first()
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """
+    将排序键编码为不透明的分页游标
+    """
+    payload = [
+        {"dt": value.isoformat()} if isinstance(value, datetime) else value
+        for value in values
+    ]
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> List[Any]:
+    """
+    解码分页游标，游标无效时抛出ValueError
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+    except (ValueError, TypeError) as e:
+        raise ValueError("无效的游标") from e
+    if not isinstance(payload, list):
+        raise ValueError("无效的游标")
+    try:
+        return [
+            datetime.fromisoformat(value["dt"]) if isinstance(value, dict) else value
+            for value in payload
+        ]
+    except (KeyError, TypeError) as e:
+        raise ValueError("无效的游标") from e
+
+def keyset_statement(
+    stmt: Select,
+    keys: Sequence[Any],
+    *,
+    cursor: Optional[str] = None,
+    limit: int = 100,
+    descending: bool = False,
+) -> Select:
+    """
+    为查询加上键集分页条件：按keys排序，从游标位置之后取limit+1行（多取一行用于判断是否还有下一页）
+    keys的最后一个键必须唯一（通常为id），各键不能为NULL；游标无效时抛出ValueError
+    """
+    if cursor:
+        values = decode_cursor(cursor)
+        if len(values) != len(keys):
+            raise ValueError("无效的游标")
+        position = tuple_(*keys)
+        anchor = tuple_(*[literal(value, key.type) for key, value in zip(keys, values)])
+        stmt = stmt.where(position < anchor if descending else position > anchor)
+    order_by = [key.desc() if descending else key.asc() for key in keys]
+    return stmt.order_by(*order_by).limit(limit + 1)
+
+def keyset_result(
+    items: Sequence[Any], keys: Sequence[Any], *, limit: int
+) -> Tuple[List[Any], Optional[str]]:
+    """
+    截取keyset_statement查询结果的当前页，返回(当前页, 下一页游标)，没有下一页时游标为None
+    """
+    items = list(items)
+    if len(items) <= limit:
+        return items, None
+    items = items[:limit]
+    return items, encode_cursor([getattr(items[-1], key.key) for key in keys])
+
+def paginate(
+    db: Session,
+    stmt: Select,
+    keys: Sequence[Any],
+    *,
+    cursor: Optional[str] = None,
+    limit: int = 100,
+    descending: bool = False,
+) -> Tuple[List[Any], Optional[str]]:
+    """
+    键集分页：每页都是从上一页最后一行开始的索引范围扫描，开销与翻页深度无关，
+    翻页期间插入或删除的行也不会造成重复或遗漏
+    """
+    stmt = keyset_statement(stmt, keys, cursor=cursor, limit=limit, descending=descending)
+    return keyset_result(db.scalars(stmt).all(), keys, limit=limit)
+
+def _row_error(error: Exception) -> str:
+    if isinstance(error, IntegrityError):
+        return "违反数据约束（唯一性或关联的记录不存在）"
+    return "数据格式无效"
+
+def write_rows(
+    db: Session,
+    rows: Sequence[Tuple[int, Any]],
+    write: Callable[[List[Any]], List[Any]],
+    results: Dict[int, Dict[str, Any]],
+    status: str,
+) -> None:
+    """
+    在保存点中用一条语句写入整批rows（(序号, 参数)列表，参数为列值或id），write返回每行对应的id
+    整批违反约束时回滚保存点，逐行在各自的保存点中重试，定位出错的行，其余行照常写入
+    每行的结果写入results[序号]，提交由调用方负责
+    """
+    if not rows:
+        return
+    try:
+        with db.begin_nested():
+            ids = write([row for _, row in rows])
+    except (IntegrityError, DataError):
+        for index, row in rows:
+            try:
+                with db.begin_nested():
+                    (id,) = write([row])
+            except (IntegrityError, DataError) as e:
+                id = row.get("id") if isinstance(row, dict) else row
+                results[index] = {"index": index, "status": "error", "id": id, "error": _row_error(e)}
+            else:
+                results[index] = {"index": index, "status": status, "id": id}
+        return
+    for (index, _), id in zip(rows, ids):
+        results[index] = {"index": index, "status": status, "id": id}
+
+def changed_values(db_obj: Any, values: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    values中与对象当前值不同的列；未加载的属性视为有变化，比较时不会触发加载
+    """
+    state = inspect(db_obj)
+    changed = {}
+    for key, value in values.items():
+        current = state.attrs[key].loaded_value
+        if current is NO_VALUE or current != value:
+            changed[key] = value
+    return changed
+
+def update_returning(model: Any, id: Any, values: Dict[str, Any]) -> Tuple[Any, List[str]]:
+    """
+    只SET给定列的UPDATE ... RETURNING语句，返回整行以取回onupdate等服务端生成的值
+    返回(语句, 与RETURNING各列对应的属性名)
+    """
+    attrs = inspect(model).column_attrs
+    stmt = (
+        update(model.__table__)
+        .where(model.__table__.c.id == id)
+        .values({attrs[key].columns[0].name: value for key, value in values.items()})
+        .returning(*[attr.columns[0] for attr in attrs])
+    )
+    return stmt, [attr.key for attr in attrs]
+
+def apply_returned(db_obj: Any, keys: Sequence[str], row: Sequence[Any]) -> None:
+    """
+    将RETURNING取回的值写回对象（作为已提交的值），提交使对象过期后访问属性也不再查询
+    """
+    for key, value in zip(keys, row):
+        set_committed_value(db_obj, key, value)
+
+def loaded_values(db_obj: Any, *, inserted: bool = False) -> Dict[str, Any]:
+    """
+    对象已加载的列值和关系。inserted为True表示对象刚由flush插入：
+    flush时INSERT ... RETURNING已取回id、created_at等服务端生成的值（eager_defaults="auto"），
+    未赋值且没有任何默认值的列插入的是NULL，也记为None。
+    方言不支持RETURNING时服务端生成的值不在其中，这些列仍需在首次访问时查询
+    """
+    state = inspect(db_obj)
+    values = {}
+    for attr in state.mapper.column_attrs:
+        column = attr.columns[0]
+        if attr.key in state.dict:
+            values[attr.key] = state.dict[attr.key]
+        elif (
+            inserted
+            and column.default is None
+            and column.server_default is None
+            and column.computed is None
+            and not column.primary_key
+        ):
+            values[attr.key] = None
+    for relationship in state.mapper.relationships:
+        if relationship.key in state.dict:
+            value = state.dict[relationship.key]
+            values[relationship.key] = list(value) if relationship.uselist else value
+    return values
+
+def dialect_insert(db: Session, table: Any) -> Any:
+    """
+    返回支持 on_conflict_do_update 的方言INSERT语句（PostgreSQL/SQLite）
+    """
+    if db.get_bind().dialect.name == "sqlite":
+        return sqlite.insert(table)
+    return postgresql.insert(table)
+
 class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
     def __init__(self, model: Type[ModelType]):
         """
@@ -22,21 +225,54 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         self.model = model
 
     def get(self, db: Session, id: Any) -> Optional[ModelType]:
-        return db.query(self.model).filter(self.model.id == id).first()
+        return get_by(db, self.model.id, id)
 
     def get_multi(
         self, db: Session, *, skip: int = 0, limit: int = 100
     ) -> List[ModelType]:
         return db.query(self.model).offset(skip).limit(limit).all()
 
+    def get_page(
+        self,
+        db: Session,
+        *,
+        cursor: Optional[str] = None,
+        limit: int = 100,
+        sort: Sequence[Any] = (),
+        descending: bool = False,
+        stmt: Optional[Select] = None,
+    ) -> Tuple[List[ModelType], Optional[str]]:
+        """
+        键集分页获取记录，返回(当前页, 下一页游标)
+        sort为排序列，id总是作为最后的决胜键；stmt可传入带过滤条件或关联的select(self.model)
+        """
+        if stmt is None:
+            stmt = select(self.model)
+        return paginate(
+            db, stmt, [*sort, self.model.id], cursor=cursor, limit=limit, descending=descending
+        )
+
     def create(self, db: Session, *, obj_in: CreateSchemaType) -> ModelType:
         obj_in_data = jsonable_encoder(obj_in)
         db_obj = self.model(**obj_in_data)  # type: ignore
         db.add(db_obj)
-        db.commit()
-        db.refresh(db_obj)
+        self._commit_created(db, db_obj)
         return db_obj
 
+    def _commit_created(self, db: Session, *objs: Any) -> None:
+        """
+        提交新建的对象，不再refresh：提交前记下INSERT ... RETURNING取回的值，
+        提交使对象过期后原样写回，之后读取属性不需要再查询
+        objs中也可以包含响应需要的已有对象（如新知识库的标签），保留其已加载的值
+        """
+        pending = [inspect(obj).key is None for obj in objs]
+        db.flush()
+        loaded = [(obj, loaded_values(obj, inserted=new)) for obj, new in zip(objs, pending)]
+        db.commit()
+        for obj, values in loaded:
+            for key, value in values.items():
+                set_committed_value(obj, key, value)
+
     def update(
         self,
         db: Session,
@@ -44,21 +280,121 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         db_obj: ModelType,
         obj_in: Union[UpdateSchemaType, Dict[str, Any]]
     ) -> ModelType:
-        obj_data = jsonable_encoder(db_obj)
-        if isinstance(obj_in, dict):
-            update_data = obj_in
-        else:
-            update_data = obj_in.dict(exclude_unset=True)
-        for field in obj_data:
-            if field in update_data:
-                setattr(db_obj, field, update_data[field])
-        db.add(db_obj)
+        """
+        只更新与当前值不同的列：一条UPDATE ... RETURNING写入并取回整行，提交后不再refresh；
+        没有变化时不执行语句也不提交。db_obj可以是未加入会话的对象（如缓存的当前用户）
+        """
+        values = self.column_values(obj_in, exclude_unset=True)
+        values.pop("id", None)
+        changed = changed_values(db_obj, values)
+        if not changed:
+            return db_obj
+        stmt, keys = update_returning(self.model, db_obj.id, changed)
+        row = db.execute(stmt).one()
         db.commit()
-        db.refresh(db_obj)
+        apply_returned(db_obj, keys, row)
         return db_obj
 
     def remove(self, db: Session, *, id: int) -> ModelType:
-        obj = db.query(self.model).get(id)
+        obj = db.get(self.model, id)
         db.delete(obj)
         db.commit()
-        return obj 
\ No newline at end of file
+        return obj
+
+    def column_values(
+        self, obj_in: Union[BaseModel, Dict[str, Any]], *, exclude_unset: bool = False
+    ) -> Dict[str, Any]:
+        """
+        将输入转换为表列的值，忽略不是列的字段（如关系、标签名列表）
+        """
+        data = obj_in if isinstance(obj_in, dict) else obj_in.model_dump(exclude_unset=exclude_unset)
+        columns = inspect(self.model).column_attrs.keys()
+        return {key: value for key, value in data.items() if key in columns}
+
+    def create_many(
+        self, db: Session, *, objs_in: Sequence[Union[CreateSchemaType, Dict[str, Any]]]
+    ) -> List[Dict[str, Any]]:
+        """
+        批量创建：一条多行INSERT ... RETURNING写入整批，只提交一次
+        返回与objs_in顺序对应的每行结果：{"index", "status": created|error, "id", "error"}
+        """
+        rows = [(index, self.column_values(obj_in)) for index, obj_in in enumerate(objs_in)]
+        stmt = insert(self.model).returning(self.model.id, sort_by_parameter_order=True)
+        results: Dict[int, Dict[str, Any]] = {}
+        write_rows(db, rows, lambda params: db.scalars(stmt, params).all(), results, "created")
+        db.commit()
+        return [results[index] for index, _ in rows]
+
+    def update_many(
+        self,
+        db: Session,
+        *,
+        objs_in: Sequence[Tuple[Any, Union[UpdateSchemaType, Dict[str, Any]]]],
+        where: Sequence[Any] = (),
+    ) -> List[Dict[str, Any]]:
+        """
+        批量更新，objs_in为(id, 更新内容)列表，只更新提供了的字段
+        先用一次IN查询确认记录存在（where为额外的条件，如所有者），
+        再按主键批量执行UPDATE（executemany），只提交一次
+        返回每行结果：{"index", "status": updated|not_found|error, "id", "error"}
+        """
+        ids = [id for id, _ in objs_in]
+        found = set(db.scalars(select(self.model.id).where(self.model.id.in_(ids), *where)))
+        results: Dict[int, Dict[str, Any]] = {}
+        rows, seen = [], set()
+        for index, (id, obj_in) in enumerate(objs_in):
+            if id not in found:
+                results[index] = {"index": index, "status": "not_found", "id": id, "error": "记录不存在或无权限"}
+            elif id in seen:
+                results[index] = {"index": index, "status": "error", "id": id, "error": "同一批次中重复的id"}
+            else:
+                seen.add(id)
+                values = self.column_values(obj_in, exclude_unset=True)
+                values.pop("id", None)
+                if values:
+                    rows.append((index, {"id": id, **values}))
+                else:
+                    results[index] = {"index": index, "status": "updated", "id": id}
+
+        def write(params: List[Dict[str, Any]]) -> List[Any]:
+            db.execute(update(self.model), params)
+            return [row["id"] for row in params]
+
+        write_rows(db, rows, write, results, "updated")
+        db.commit()
+        return [results[index] for index in range(len(objs_in))]
+
+    def delete_many(
+        self, db: Session, *, ids: Sequence[Any], where: Sequence[Any] = ()
+    ) -> List[Dict[str, Any]]:
+        """
+        批量删除：一条DELETE ... WHERE id IN (...)删除整批，只提交一次
+        多对多关联表中的行一并删除；一对多的子记录不会级联删除，由外键约束报告为出错的行
+        返回每行结果：{"index", "status": deleted|not_found|error, "id", "error"}
+        """
+        found = set(db.scalars(select(self.model.id).where(self.model.id.in_(ids), *where)))
+        results: Dict[int, Dict[str, Any]] = {}
+        rows, seen = [], set()
+        for index, id in enumerate(ids):
+            if id not in found:
+                results[index] = {"index": index, "status": "not_found", "id": id, "error": "记录不存在或无权限"}
+            elif id in seen:
+                results[index] = {"index": index, "status": "error", "id": id, "error": "同一批次中重复的id"}
+            else:
+                seen.add(id)
+                rows.append((index, id))
+
+        def write(batch: List[Any]) -> List[Any]:
+            for relationship in inspect(self.model).relationships:
+                if relationship.secondary is not None:
+                    for _, secondary_column in relationship.synchronize_pairs:
+                        db.execute(delete(relationship.secondary).where(secondary_column.in_(batch)))
+            db.execute(
+                delete(self.model).where(self.model.id.in_(batch)),
+                execution_options={"synchronize_session": False},
+            )
+            return batch
+
+        write_rows(db, rows, write, results, "deleted")
+        db.commit()
+        return [results[index] for index in range(len(ids))] 
\ No newline at end of file
@@ -1,24 +1,44 @@
-from typing import List, Optional, Dict, Any, Union
-from sqlalchemy.orm import Session
-from sqlalchemy import func
+from typing import List, Optional, Dict, Any, Tuple, Union
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, selectinload
 
 from fastapi.encoders import jsonable_encoder
 
-from app.crud.base import CRUDBase
+from app.crud.async_base import AsyncCRUDBase
+from app.crud.base import CRUDBase, get_by
 from app.models.knowledge_base import KnowledgeBase, Tag
 from app.models.paper import Paper
 from app.schemas.knowledge_base import KnowledgeBaseCreate, KnowledgeBaseUpdate, PaperCreate, TagCreate
 
 class CRUDKnowledgeBase(CRUDBase[KnowledgeBase, KnowledgeBaseCreate, KnowledgeBaseUpdate]):
-    def get_by_user_id(self, db: Session, *, user_id: int, skip: int = 0, limit: int = 100) -> List[KnowledgeBase]:
-        return db.query(KnowledgeBase).filter(KnowledgeBase.user_id == user_id).offset(skip).limit(limit).all()
+    def list_statement(self):
+        """
+        知识库列表的查询，同时预先加载标签
+        """
+        return select(KnowledgeBase).options(selectinload(KnowledgeBase.tags))
+    
+    def get_list_page(
+        self, db: Session, *, cursor: Optional[str] = None, limit: int = 100
+    ) -> Tuple[List[KnowledgeBase], Optional[str]]:
+        """
+        获取知识库列表（游标分页）
+        """
+        return self.get_page(db, stmt=self.list_statement(), cursor=cursor, limit=limit)
+    
+    def get_by_user_id(
+        self, db: Session, *, user_id: int, cursor: Optional[str] = None, limit: int = 100
+    ) -> Tuple[List[KnowledgeBase], Optional[str]]:
+        return self.get_multi_by_owner(db, owner_id=user_id, cursor=cursor, limit=limit)
     
-    def get_by_username(self, db: Session, *, username: str, skip: int = 0, limit: int = 100) -> List[KnowledgeBase]:
+    def get_by_username(
+        self, db: Session, *, username: str, cursor: Optional[str] = None, limit: int = 100
+    ) -> Tuple[List[KnowledgeBase], Optional[str]]:
         from app.models.user import User
-        user = db.query(User).filter(User.username == username).first()
+        user = get_by(db, User.username, username)
         if not user:
-            return []
-        return self.get_by_user_id(db, user_id=user.id, skip=skip, limit=limit)
+            return [], None
+        return self.get_by_user_id(db, user_id=user.id, cursor=cursor, limit=limit)
     
     def create_with_owner(
         self, db: Session, *, obj_in: KnowledgeBaseCreate, owner_id: int
@@ -36,7 +56,7 @@ class CRUDKnowledgeBase(CRUDBase[KnowledgeBase, KnowledgeBaseCreate, KnowledgeBa
         if obj_in.tags:
             for tag_name in obj_in.tags:
                 # 检查标签是否存在，不存在则创建
-                tag = db.query(Tag).filter(Tag.name == tag_name).first()
+                tag = get_by(db, Tag.name, tag_name)
                 if not tag:
                     tag = Tag(name=tag_name)
                     db.add(tag)
@@ -44,23 +64,17 @@ class CRUDKnowledgeBase(CRUDBase[KnowledgeBase, KnowledgeBaseCreate, KnowledgeBa
                 db_obj.tags.append(tag)
                 
         db.add(db_obj)
-        db.commit()
-        db.refresh(db_obj)
+        self._commit_created(db, db_obj, *db_obj.tags)
         return db_obj
     
     def get_multi_by_owner(
-        self, db: Session, *, owner_id: int, skip: int = 0, limit: int = 100
-    ) -> List[KnowledgeBase]:
+        self, db: Session, *, owner_id: int, cursor: Optional[str] = None, limit: int = 100
+    ) -> Tuple[List[KnowledgeBase], Optional[str]]:
         """
-        获取用户的所有知识库
+        获取用户的知识库（游标分页）
         """
-        return (
-            db.query(self.model)
-            .filter(KnowledgeBase.user_id == owner_id)
-            .offset(skip)
-            .limit(limit)
-            .all()
-        )
+        stmt = self.list_statement().where(KnowledgeBase.user_id == owner_id)
+        return self.get_page(db, stmt=stmt, cursor=cursor, limit=limit)
     
     def get_by_title(self, db: Session, *, title: str) -> Optional[KnowledgeBase]:
         """
@@ -79,7 +93,7 @@ class CRUDKnowledgeBase(CRUDBase[KnowledgeBase, KnowledgeBaseCreate, KnowledgeBa
         
         # 添加新标签
         for tag_name in tags:
-            tag = db.query(Tag).filter(Tag.name == tag_name).first()
+            tag = get_by(db, Tag.name, tag_name)
             if not tag:
                 tag = Tag(name=tag_name)
                 db.add(tag)
@@ -92,19 +106,13 @@ class CRUDKnowledgeBase(CRUDBase[KnowledgeBase, KnowledgeBaseCreate, KnowledgeBa
         return db_obj
     
     def get_by_tag(
-        self, db: Session, *, tag_name: str, skip: int = 0, limit: int = 100
-    ) -> List[KnowledgeBase]:
-        """
-        通过标签获取知识库
-        """
-        return (
-            db.query(self.model)
-            .join(self.model.tags)
-            .filter(Tag.name == tag_name)
-            .offset(skip)
-            .limit(limit)
-            .all()
-        )
+        self, db: Session, *, tag_name: str, cursor: Optional[str] = None, limit: int = 100
+    ) -> Tuple[List[KnowledgeBase], Optional[str]]:
+        """
+        通过标签获取知识库（游标分页）
+        """
+        stmt = self.list_statement().join(KnowledgeBase.tags).where(Tag.name == tag_name)
+        return self.get_page(db, stmt=stmt, cursor=cursor, limit=limit)
 
     def like(self, db: Session, *, kb_id: int, user_id: int) -> bool:
         """
@@ -113,7 +121,7 @@ class CRUDKnowledgeBase(CRUDBase[KnowledgeBase, KnowledgeBaseCreate, KnowledgeBa
         from app.models.user import User
         
         kb = self.get(db, id=kb_id)
-        user = db.query(User).filter(User.id == user_id).first()
+        user = get_by(db, User.id, user_id)
         
         if not kb or not user or kb in user.liked_knowledge_bases:
             return False
@@ -130,7 +138,7 @@ class CRUDKnowledgeBase(CRUDBase[KnowledgeBase, KnowledgeBaseCreate, KnowledgeBa
         from app.models.user import User
         
         kb = self.get(db, id=kb_id)
-        user = db.query(User).filter(User.id == user_id).first()
+        user = get_by(db, User.id, user_id)
         
         if not kb or not user or kb not in user.liked_knowledge_bases:
             return False
@@ -141,18 +149,22 @@ class CRUDKnowledgeBase(CRUDBase[KnowledgeBase, KnowledgeBaseCreate, KnowledgeBa
         return True
     
     def get_liked_by_user(
-        self, db: Session, *, user_id: int, skip: int = 0, limit: int = 100
-    ) -> List[KnowledgeBase]:
+        self, db: Session, *, user_id: int, cursor: Optional[str] = None, limit: int = 100
+    ) -> Tuple[List[KnowledgeBase], Optional[str]]:
         """
-        获取用户点赞的知识库
+        获取用户点赞的知识库（游标分页）
         """
-        from app.models.user import User
+        from app.models.user import user_liked_knowledge_bases
         
-        user = db.query(User).filter(User.id == user_id).first()
-        if not user:
-            return []
-        
-        return user.liked_knowledge_bases[skip:skip+limit]
+        stmt = (
+            self.list_statement()
+            .join(
+                user_liked_knowledge_bases,
+                user_liked_knowledge_bases.c.knowledge_base_id == KnowledgeBase.id,
+            )
+            .where(user_liked_knowledge_bases.c.user_id == user_id)
+        )
+        return self.get_page(db, stmt=stmt, cursor=cursor, limit=limit)
 
 class CRUDPaper(CRUDBase[Paper, PaperCreate, PaperCreate]):
     def get_by_knowledge_base_id(
@@ -173,13 +185,12 @@ class CRUDPaper(CRUDBase[Paper, PaperCreate, PaperCreate]):
             knowledge_base_id=knowledge_base_id,
         )
         db.add(db_obj)
-        db.commit()
-        db.refresh(db_obj)
+        self._commit_created(db, db_obj)
         return db_obj
     
     def like(self, db: Session, *, db_obj: Paper, user_id: int) -> Paper:
         from app.models.user import User
-        user = db.query(User).filter(User.id == user_id).first()
+        user = get_by(db, User.id, user_id)
         if user and db_obj not in user.liked_papers:
             user.liked_papers.append(db_obj)
             db.commit()
@@ -188,7 +199,7 @@ class CRUDPaper(CRUDBase[Paper, PaperCreate, PaperCreate]):
     
     def unlike(self, db: Session, *, db_obj: Paper, user_id: int) -> Paper:
         from app.models.user import User
-        user = db.query(User).filter(User.id == user_id).first()
+        user = get_by(db, User.id, user_id)
         if user and db_obj in user.liked_papers:
             user.liked_papers.remove(db_obj)
             db.commit()
@@ -197,17 +208,31 @@ class CRUDPaper(CRUDBase[Paper, PaperCreate, PaperCreate]):
 
 class CRUDTag(CRUDBase[Tag, TagCreate, TagCreate]):
     def get_by_name(self, db: Session, *, name: str) -> Optional[Tag]:
-        return db.query(Tag).filter(Tag.name == name).first()
+        return get_by(db, Tag.name, name)
     
     def get_or_create(self, db: Session, *, name: str) -> Tag:
         tag = self.get_by_name(db, name=name)
         if not tag:
             tag = Tag(name=name)
             db.add(tag)
-            db.commit()
-            db.refresh(tag)
+            self._commit_created(db, tag)
         return tag
 
+class AsyncCRUDKnowledgeBase(AsyncCRUDBase[KnowledgeBase, KnowledgeBaseCreate, KnowledgeBaseUpdate]):
+    async def get_with_papers(self, db: AsyncSession, *, id: int) -> Optional[KnowledgeBase]:
+        """
+        获取知识库，同时预先加载标签、论文及论文的标签
+        """
+        return await db.scalar(
+            select(KnowledgeBase)
+            .where(KnowledgeBase.id == id)
+            .options(
+                selectinload(KnowledgeBase.tags),
+                selectinload(KnowledgeBase.papers).selectinload(Paper.tags),
+            )
+        )
+
 knowledge_base = CRUDKnowledgeBase(KnowledgeBase)
+knowledge_base_async = AsyncCRUDKnowledgeBase(KnowledgeBase)
 paper = CRUDPaper(Paper)
 tag = CRUDTag(Tag) 
\ No newline at end of file
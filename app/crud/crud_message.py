@@ -1,14 +1,28 @@
-from typing import List, Optional, Dict, Any, Tuple
-from sqlalchemy import or_, and_
-from sqlalchemy.orm import Session
+import threading
+from collections import Counter
+from typing import Iterable, List, Optional, Dict, Any, Tuple
+from sqlalchemy import Float, or_, and_, bindparam, case, cast, column, delete, exists, func, insert, literal, literal_column, select, table, tuple_, union_all, update
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, aliased
 from datetime import datetime
 
-from app.crud.base import CRUDBase
-from app.models.message import Message
+from app.core.config import settings
+from app.crud.async_base import AsyncCRUDBase
+from app.crud.base import CRUDBase, decode_cursor, encode_cursor, dialect_insert
+from app.crud.group_commit import GroupCommitter
+from app.crud.message_archive import ARCHIVE_FIELDS, read_segment, write_segment
+from app.db.session import SessionLocal
+from app.models.conversation import Conversation, UnreadCounter
+from app.models.message import Message, SEARCH_TEXT_CONFIG, SEARCH_VECTOR_SQL, make_pair_key
+from app.models.message_archive import MessageArchiveSegment
 from app.models.user import User
-from app.schemas.message import MessageCreate, MessageUpdate, Conversation
+from app.schemas.message import MessageCreate, MessageUpdate
 
 class CRUDMessage(CRUDBase[Message, MessageCreate, MessageCreate]):
+    _group_committer: Optional[GroupCommitter] = None
+    _group_committer_lock = threading.Lock()
+    
     def create_with_sender(
         self, db: Session, *, obj_in: MessageCreate, sender_id: int
     ) -> Message:
@@ -21,120 +35,763 @@ class CRUDMessage(CRUDBase[Message, MessageCreate, MessageCreate]):
             receiver_id=obj_in.receiver_id,
         )
         db.add(db_obj)
-        db.commit()
-        db.refresh(db_obj)
+        db.flush()
+        self._touch_conversations(db, messages=[db_obj])
+        self._commit_created(db, db_obj)
         return db_obj
     
+    def create_many_with_sender(
+        self, db: Session, *, items: List[Tuple[MessageCreate, int]]
+    ) -> List[Message]:
+        """
+        批量创建消息，items为(消息内容, 发送者ID)列表
+        使用一条多行INSERT ... RETURNING写入并只提交一次，返回的消息与items顺序一致
+        """
+        rows = [
+            {
+                "content": obj_in.content,
+                "sender_id": sender_id,
+                "receiver_id": obj_in.receiver_id,
+                "pair_key": make_pair_key(sender_id, obj_in.receiver_id),
+                "is_read": False,
+            }
+            for obj_in, sender_id in items
+        ]
+        messages = list(
+            db.scalars(
+                insert(Message).returning(Message, sort_by_parameter_order=True), rows
+            )
+        )
+        self._touch_conversations(db, messages=messages)
+        db.commit()
+        return messages
+    
+    def create_with_sender_grouped(
+        self, *, obj_in: MessageCreate, sender_id: int
+    ) -> Message:
+        """
+        通过组提交创建消息：与窗口期内的其他并发发送合并为一个事务
+        使用独立会话写入，返回的消息对象已与会话分离
+        """
+        if self._group_committer is None:
+            with self._group_committer_lock:
+                if self._group_committer is None:
+                    self._group_committer = GroupCommitter(
+                        self._flush_group,
+                        window_ms=settings.MESSAGE_GROUP_COMMIT_WINDOW_MS,
+                        max_batch=settings.MESSAGE_GROUP_COMMIT_MAX_BATCH,
+                        name="message-group-commit",
+                    )
+        return self._group_committer.submit((obj_in, sender_id))
+    
+    def _flush_group(self, items: List[Tuple[MessageCreate, int]]) -> List[Message]:
+        db = SessionLocal(expire_on_commit=False)
+        try:
+            messages = self.create_many_with_sender(db, items=items)
+            db.expunge_all()
+            return messages
+        finally:
+            db.close()
+    
     def get_conversation(
-        self, db: Session, *, user_id1: int, user_id2: int, skip: int = 0, limit: int = 100
+        self,
+        db: Session,
+        *,
+        user_id1: int,
+        user_id2: int,
+        cursor: Optional[str] = None,
+        before_id: Optional[int] = None,
+        after_id: Optional[int] = None,
+        limit: int = 50,
+    ) -> Tuple[List[Message], Optional[str]]:
+        """
+        获取两个用户之间的会话（最新的消息在前，游标分页）
+        返回：(消息列表, 下一页游标)
+
+        before_id/after_id 分别获取比该消息更早/更新的消息，
+        游标会沿同一方向继续翻页；每页都是一次索引范围扫描，与翻页深度无关
+        向更早方向翻页越过在线数据后，继续从归档文件中读取（before_id需为在线消息）
+        """
+        messages, direction, archive = self._online_conversation(
+            db,
+            user_id1=user_id1,
+            user_id2=user_id2,
+            cursor=cursor,
+            before_id=before_id,
+            after_id=after_id,
+            limit=limit,
+        )
+        if archive is not None:
+            messages += self._read_archive(db, **archive)
+        return self._conversation_page(messages, direction, limit)
+    
+    def _online_conversation(
+        self,
+        db: Session,
+        *,
+        user_id1: int,
+        user_id2: int,
+        cursor: Optional[str] = None,
+        before_id: Optional[int] = None,
+        after_id: Optional[int] = None,
+        limit: int = 50,
+    ) -> Tuple[List[Message], str, Optional[Dict[str, Any]]]:
+        """
+        查询一页在线消息（最多limit+1条）
+        返回：(消息列表, 翻页方向, 还需读取的归档范围)，不需要读取归档时第三项为None
+        """
+        pair_key = make_pair_key(user_id1, user_id2)
+        position = tuple_(Message.created_at, Message.id)
+        
+        direction, anchor, anchor_values, anchor_archived = "before", None, None, None
+        if cursor:
+            values = decode_cursor(cursor)
+            if (
+                len(values) != 3
+                or values[0] not in ("before", "after")
+                or not isinstance(values[1], datetime)
+                or not isinstance(values[2], int)
+            ):
+                raise ValueError("无效的游标")
+            direction, anchor_values = values[0], (values[1], values[2])
+            # 锚点时间取该消息存储的值，与排序比较的是同一种表示（SQLite按文本比较时间，
+            # 服务端默认值与绑定参数的文本格式不同，同一时刻的值不相等）
+            # 锚点消息已归档时为NULL：归档的消息早于所有在线消息，向更早翻页没有在线消息，向更新翻页所有在线消息都符合
+            anchor_created_at = (
+                select(Message.created_at)
+                .where(Message.id == anchor_values[1], Message.pair_key == pair_key)
+                .scalar_subquery()
+            )
+            anchor = tuple_(anchor_created_at, literal(anchor_values[1], Message.id.type))
+            anchor_archived = anchor_created_at.is_(None)
+        elif before_id is not None or after_id is not None:
+            direction = "before" if before_id is not None else "after"
+            anchor_id = before_id if before_id is not None else after_id
+            anchor_created_at = (
+                select(Message.created_at)
+                .where(Message.id == anchor_id, Message.pair_key == pair_key)
+                .scalar_subquery()
+            )
+            anchor = tuple_(anchor_created_at, anchor_id)
+        
+        stmt = select(Message).where(Message.pair_key == pair_key)
+        if direction == "before":
+            if anchor is not None:
+                stmt = stmt.where(position < anchor)
+            stmt = stmt.order_by(Message.created_at.desc(), Message.id.desc())
+        else:
+            after = position > anchor
+            if anchor_archived is not None:
+                after = or_(after, anchor_archived)
+            stmt = stmt.where(after).order_by(Message.created_at, Message.id)
+        messages = list(db.scalars(stmt.limit(limit + 1)))
+        
+        # 归档的消息总是早于该会话所有在线消息，在线数据不足一页时才需要读取归档
+        archive = None
+        if direction == "before" and len(messages) <= limit:
+            if messages:
+                anchor_values = (messages[-1].created_at, messages[-1].id)
+            elif before_id is not None:
+                anchor_values = None
+            if anchor_values is not None or anchor is None:
+                archive = {
+                    "pair_key": pair_key,
+                    "before": anchor_values,
+                    "limit": limit + 1 - len(messages),
+                }
+        return messages, direction, archive
+    
+    def _conversation_page(
+        self, messages: List[Message], direction: str, limit: int
+    ) -> Tuple[List[Message], Optional[str]]:
+        """
+        截取一页消息并生成下一页游标，向更新方向翻页时恢复为最新的在前
+        """
+        next_cursor = None
+        if len(messages) > limit:
+            messages = messages[:limit]
+            edge = messages[-1]
+            next_cursor = encode_cursor([direction, edge.created_at, edge.id])
+        if direction == "after":
+            messages.reverse()
+        return messages, next_cursor
+    
+    def _read_archive(
+        self,
+        db: Session,
+        *,
+        pair_key: int,
+        before: Optional[Tuple[datetime, int]],
+        limit: int,
     ) -> List[Message]:
         """
-        获取两个用户之间的会话
+        从归档文件中读取会话里早于before位置的消息（最新的在前）
+        返回的消息对象不属于任何会话
         """
-        return (
-            db.query(self.model)
-            .filter(
-                or_(
-                    and_(
-                        Message.sender_id == user_id1,
-                        Message.receiver_id == user_id2
-                    ),
-                    and_(
-                        Message.sender_id == user_id2,
-                        Message.receiver_id == user_id1
+        segments = db.scalars(self._archive_segments(pair_key=pair_key, before=before))
+        return self._read_segments(segments, before=before, limit=limit)
+    
+    def _archive_segments(self, *, pair_key: int, before: Optional[Tuple[datetime, int]]):
+        """
+        会话中包含早于before位置消息的归档块，按块的最新位置倒序
+        """
+        stmt = select(MessageArchiveSegment).where(MessageArchiveSegment.pair_key == pair_key)
+        if before is not None:
+            stmt = stmt.where(
+                tuple_(MessageArchiveSegment.first_created_at, MessageArchiveSegment.first_id)
+                < tuple_(*before)
+            )
+        return stmt.order_by(
+            MessageArchiveSegment.last_created_at.desc(), MessageArchiveSegment.last_id.desc()
+        )
+    
+    def _read_segments(
+        self,
+        segments: Iterable[MessageArchiveSegment],
+        *,
+        before: Optional[Tuple[datetime, int]],
+        limit: int,
+    ) -> List[Message]:
+        """
+        依次读取归档块（读文件并解压，不访问数据库），够一页即停止
+        同一会话的归档块互不重叠，按顺序读取得到的消息即为最新的在前
+        """
+        messages: List[Message] = []
+        for segment in segments:
+            rows = read_segment(
+                settings.MESSAGE_ARCHIVE_DIR, segment.path, segment.offset, segment.length
+            )
+            for row in reversed(rows):
+                if before is None or (row["created_at"], row["id"]) < tuple(before):
+                    messages.append(Message(**row))
+            if len(messages) >= limit:
+                break
+        return messages[:limit]
+    
+    def archive_read_messages(
+        self,
+        db: Session,
+        *,
+        older_than: datetime,
+        archive_dir: str,
+        batch_size: int = 10000,
+    ) -> int:
+        """
+        将早于older_than的已读消息移入归档文件，每批写一个文件并在同一事务内
+        记录段索引、删除在线数据；文件在提交前已落盘，失败的批次只会留下未被引用的文件
+        返回归档的消息数
+
+        每个会话只归档最早的一段连续历史：比会话中最早的未读消息更新的消息
+        以及会话的最新一条消息（会话列表引用）保持在线，因此归档数据总是早于在线数据
+        """
+        unread = aliased(Message)
+        eligible = (
+            select(*(getattr(Message, field) for field in ARCHIVE_FIELDS))
+            .where(
+                Message.is_read == True,
+                Message.created_at < older_than,
+                Message.id.not_in(
+                    select(Conversation.last_message_id).where(
+                        Conversation.last_message_id.is_not(None)
                     )
-                )
+                ),
+                ~exists().where(
+                    unread.pair_key == Message.pair_key,
+                    unread.is_read == False,
+                    tuple_(unread.created_at, unread.id)
+                    < tuple_(Message.created_at, Message.id),
+                ),
             )
-            .order_by(Message.created_at)
-            .offset(skip)
-            .limit(limit)
-            .all()
+            .order_by(Message.created_at, Message.id)
+            .limit(batch_size)
         )
+        total = 0
+        while True:
+            rows = [dict(row) for row in db.execute(eligible).mappings()]
+            if not rows:
+                return total
+            groups: Dict[int, List[Dict[str, Any]]] = {}
+            for row in rows:
+                groups.setdefault(row["pair_key"], []).append(row)
+            ids = [row["id"] for row in rows]
+            name = f"{rows[0]['created_at']:%Y%m}-{min(ids)}-{max(ids)}"
+            path, extents = write_segment(archive_dir, name, groups.values())
+            db.execute(
+                insert(MessageArchiveSegment),
+                [
+                    {
+                        "pair_key": pair_key,
+                        "path": path,
+                        "offset": offset,
+                        "length": length,
+                        "message_count": len(group),
+                        "first_created_at": group[0]["created_at"],
+                        "first_id": group[0]["id"],
+                        "last_created_at": group[-1]["created_at"],
+                        "last_id": group[-1]["id"],
+                    }
+                    for (pair_key, group), (offset, length) in zip(groups.items(), extents)
+                ],
+            )
+            # 带上created_at条件，分区表上只扫描相关分区
+            db.execute(
+                delete(Message)
+                .where(Message.id.in_(ids), Message.created_at < older_than)
+                .execution_options(synchronize_session=False)
+            )
+            db.commit()
+            total += len(rows)
     
-    def get_conversations(
-        self, db: Session, *, user_id: int
-    ) -> List[Tuple[int, Message, int]]:
-        """
-        获取用户的所有会话
-        返回：(对话用户ID, 最新消息, 未读消息数)
-        """
-        # 获取用户参与的所有消息的用户ID（发送者或接收者）
-        user_ids = (
-            db.query(Message.sender_id)
-            .filter(Message.receiver_id == user_id)
-            .distinct()
-            .all()
-        )
-        user_ids += (
-            db.query(Message.receiver_id)
-            .filter(Message.sender_id == user_id)
-            .distinct()
-            .all()
-        )
-        # 去重
-        user_ids = list(set([uid[0] for uid in user_ids]))
+    def search(
+        self,
+        db: Session,
+        *,
+        user_id: int,
+        q: str,
+        cursor: Optional[str] = None,
+        limit: int = 20,
+    ) -> Tuple[List[Tuple[Message, str, float]], Optional[str]]:
+        """
+        在用户收发的消息中全文检索（按相关度倒序，相同相关度按消息ID倒序，游标分页）
+        返回：([(消息, 高亮片段, 相关度)], 下一页游标)
+
+        PostgreSQL使用表达式GIN索引，SQLite使用FTS5表；已归档的消息不参与检索
+        """
+        cursor_values = decode_cursor(cursor) if cursor else None
+        if cursor_values is not None and (
+            len(cursor_values) != 2
+            or not isinstance(cursor_values[0], (int, float))
+            or not isinstance(cursor_values[1], int)
+        ):
+            raise ValueError("无效的游标")
+        # 相关度统一按双精度比较：ts_rank返回float4，与游标中的双精度值比较时相同相关度不再相等
+        rank_type = Float(53)
+        own = or_(Message.sender_id == user_id, Message.receiver_id == user_id)
+        
+        if db.get_bind().dialect.name == "sqlite":
+            # 每个词按短语匹配，避免用户输入被解析为FTS5查询语法
+            terms = ['"' + term.replace('"', '""') + '"' for term in q.split()]
+            if not terms:
+                return [], None
+            fts = table("messages_fts", column("rowid"))
+            fts_table = literal_column("messages_fts")
+            hits = (
+                select(
+                    Message.id,
+                    Message.created_at,
+                    cast(-func.bm25(fts_table), rank_type).label("rank"),
+                    func.snippet(fts_table, 0, "<mark>", "</mark>", "…", 16).label("snippet"),
+                )
+                .select_from(fts)
+                .join(Message, Message.id == fts.c.rowid)
+                .where(fts_table.op("MATCH")(" ".join(terms)), own)
+            )
+        else:
+            config = literal_column(f"'{SEARCH_TEXT_CONFIG}'::regconfig")
+            vector = literal_column(SEARCH_VECTOR_SQL)
+            query = func.websearch_to_tsquery(config, q)
+            hits = select(
+                Message.id,
+                Message.created_at,
+                cast(func.ts_rank(vector, query), rank_type).label("rank"),
+            ).where(vector.op("@@")(query), own)
         
-        conversations = []
-        for uid in user_ids:
-            # 获取与该用户的最新一条消息
-            latest_message = (
-                db.query(self.model)
-                .filter(
+        hits = hits.subquery()
+        page = select(hits)
+        if cursor_values:
+            rank, last_id = literal(float(cursor_values[0]), rank_type), cursor_values[1]
+            page = page.where(or_(hits.c.rank < rank, and_(hits.c.rank == rank, hits.c.id < last_id)))
+        page = page.order_by(hits.c.rank.desc(), hits.c.id.desc()).limit(limit + 1).subquery()
+        
+        if db.get_bind().dialect.name == "sqlite":
+            snippet = page.c.snippet
+        else:
+            # 只为当前页生成高亮片段
+            snippet = func.ts_headline(
+                config,
+                Message.content,
+                query,
+                "StartSel=<mark>, StopSel=</mark>, MaxFragments=2, MaxWords=20, MinWords=5",
+            )
+        rows = db.execute(
+            select(Message, snippet, page.c.rank)
+            .join(page, and_(Message.id == page.c.id, Message.created_at == page.c.created_at))
+            .order_by(page.c.rank.desc(), page.c.id.desc())
+        ).all()
+        
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            _, _, rank = rows[-1]
+            next_cursor = encode_cursor([rank, rows[-1][0].id])
+        return [tuple(row) for row in rows], next_cursor
+    
+    def get_conversations(
+        self,
+        db: Session,
+        *,
+        user_id: int,
+        cursor: Optional[str] = None,
+        limit: int = 20,
+    ) -> Tuple[List[Tuple[User, Message, int]], Optional[str]]:
+        """
+        获取用户的会话列表（按最近活动时间倒序，游标分页）
+        返回：([(对话用户, 最新消息, 未读消息数)], 下一页游标)
+
+        直接读取会话汇总表，两侧各走一次索引范围扫描，
+        开销与会话数量和消息历史长度无关
+        """
+        def side(own_column, partner_column, unread_column, *criteria):
+            stmt = select(
+                Conversation.id.label("conversation_id"),
+                Conversation.last_message_id.label("message_id"),
+                Conversation.last_activity_at.label("last_activity_at"),
+                partner_column.label("partner_id"),
+                unread_column.label("unread_count"),
+            ).where(own_column == user_id, *criteria)
+            if cursor_values:
+                last_activity_at, last_id = cursor_values
+                stmt = stmt.where(
                     or_(
+                        Conversation.last_activity_at < last_activity_at,
                         and_(
-                            Message.sender_id == user_id,
-                            Message.receiver_id == uid
+                            Conversation.last_activity_at == last_activity_at,
+                            Conversation.id < last_id,
                         ),
-                        and_(
-                            Message.sender_id == uid,
-                            Message.receiver_id == user_id
-                        )
                     )
                 )
-                .order_by(Message.created_at.desc())
-                .first()
-            )
-            
-            # 获取未读消息数
-            unread_count = (
-                db.query(self.model)
-                .filter(
-                    Message.sender_id == uid,
-                    Message.receiver_id == user_id,
-                    Message.is_read == False
-                )
-                .count()
-            )
-            
-            if latest_message:
-                conversations.append((uid, latest_message, unread_count))
-        
-        # 按最新消息时间排序
-        conversations.sort(key=lambda x: x[1].created_at, reverse=True)
-        return conversations
+            stmt = stmt.order_by(
+                Conversation.last_activity_at.desc(), Conversation.id.desc()
+            ).limit(limit + 1)
+            return select(stmt.subquery())
+
+        cursor_values = decode_cursor(cursor) if cursor else None
+        inbox = union_all(
+            side(Conversation.user_low_id, Conversation.user_high_id, Conversation.unread_low),
+            side(
+                Conversation.user_high_id,
+                Conversation.user_low_id,
+                Conversation.unread_high,
+                Conversation.user_low_id != user_id,
+            ),
+        ).subquery()
+        rows = db.execute(
+            select(User, Message, inbox.c.unread_count, inbox.c.last_activity_at, inbox.c.conversation_id)
+            .join(Message, Message.id == inbox.c.message_id)
+            .join(User, User.id == inbox.c.partner_id)
+            .order_by(inbox.c.last_activity_at.desc(), inbox.c.conversation_id.desc())
+            .limit(limit + 1)
+        ).all()
+
+        conversations = [(other, latest, unread) for other, latest, unread, _, _ in rows[:limit]]
+        next_cursor = None
+        if len(rows) > limit:
+            _, _, _, last_activity_at, conversation_id = rows[limit - 1]
+            next_cursor = encode_cursor([last_activity_at, conversation_id])
+        return conversations, next_cursor
     
     def mark_as_read(
         self, db: Session, *, user_id1: int, user_id2: int
-    ) -> int:
+    ) -> List[Tuple[int, int]]:
         """
         标记用户2发送给用户1的所有消息为已读
-        返回修改的消息数
+        返回被标记的消息的(id, sender_id)
         """
-        unread_messages = (
-            db.query(self.model)
-            .filter(
-                Message.sender_id == user_id2,
+        return self._mark_read_where(
+            db,
+            user_id=user_id1,
+            criteria=[
+                Message.pair_key == make_pair_key(user_id1, user_id2),
                 Message.receiver_id == user_id1,
-                Message.is_read == False
+            ],
+        )
+    
+    def mark_all_as_read(self, db: Session, *, user_id: int) -> List[Tuple[int, int]]:
+        """
+        标记用户收到的所有消息为已读
+        返回被标记的消息的(id, sender_id)
+        """
+        return self._mark_read_where(
+            db, user_id=user_id, criteria=[Message.receiver_id == user_id]
+        )
+    
+    def mark_many_as_read(
+        self, db: Session, *, user_id: int, message_ids: List[int]
+    ) -> List[Tuple[int, int]]:
+        """
+        批量标记指定消息为已读，只处理用户收到的消息
+        返回被标记的消息的(id, sender_id)
+        """
+        if not message_ids:
+            return []
+        return self._mark_read_where(
+            db,
+            user_id=user_id,
+            criteria=[Message.id.in_(message_ids), Message.receiver_id == user_id],
+        )
+    
+    def mark_one_as_read(
+        self, db: Session, *, message_id: int
+    ) -> Tuple[Optional[Message], bool]:
+        """
+        标记单条消息为已读
+        返回：(消息, 是否由未读变为已读)，消息原本已读时第二项为False
+        """
+        row = db.execute(
+            update(Message)
+            .where(Message.id == message_id, Message.is_read == False)
+            .values(is_read=True)
+            .returning(Message.receiver_id, Message.sender_id)
+            .execution_options(synchronize_session=False)
+        ).first()
+        if row:
+            receiver_id, sender_id = row
+            self._decrement_unread(db, reader_id=receiver_id, counts={sender_id: 1})
+        db.commit()
+        return self.get(db, id=message_id), row is not None
+    
+    def _mark_read_where(
+        self, db: Session, *, user_id: int, criteria: List[Any]
+    ) -> List[Tuple[int, int]]:
+        """
+        用一条UPDATE ... RETURNING语句标记消息为已读，并按发送者汇总扣减未读数
+        返回被标记的消息的(id, sender_id)，用于通知发送者
+        """
+        rows = [
+            (message_id, sender_id)
+            for message_id, sender_id in db.execute(
+                update(Message)
+                .where(*criteria, Message.is_read == False)
+                .values(is_read=True)
+                .returning(Message.id, Message.sender_id)
+                .execution_options(synchronize_session=False)
             )
-            .all()
+        ]
+        self._decrement_unread(
+            db, reader_id=user_id, counts=Counter(sender_id for _, sender_id in rows)
         )
+        db.commit()
+        return rows
+    
+    def rebuild_conversations(self, db: Session) -> int:
+        """
+        从messages表重建会话汇总表
+        返回重建后的会话数
+        """
+        user_low = case(
+            (Message.sender_id < Message.receiver_id, Message.sender_id),
+            else_=Message.receiver_id,
+        )
+        user_high = case(
+            (Message.sender_id < Message.receiver_id, Message.receiver_id),
+            else_=Message.sender_id,
+        )
+        unread = and_(Message.is_read == False, Message.receiver_id == user_low)
+        ranked = select(
+            user_low.label("user_low_id"),
+            user_high.label("user_high_id"),
+            Message.id.label("last_message_id"),
+            Message.created_at.label("last_activity_at"),
+            func.row_number()
+            .over(
+                partition_by=Message.pair_key,
+                order_by=(Message.created_at.desc(), Message.id.desc()),
+            )
+            .label("rank"),
+            func.sum(case((unread, 1), else_=0))
+            .over(partition_by=Message.pair_key)
+            .label("unread_low"),
+            func.sum(
+                case(
+                    (
+                        and_(
+                            Message.is_read == False,
+                            Message.receiver_id == user_high,
+                            Message.sender_id != Message.receiver_id,
+                        ),
+                        1,
+                    ),
+                    else_=0,
+                )
+            )
+            .over(partition_by=Message.pair_key)
+            .label("unread_high"),
+        ).subquery()
+        columns = [
+            "user_low_id",
+            "user_high_id",
+            "last_message_id",
+            "last_activity_at",
+            "unread_low",
+            "unread_high",
+        ]
+        db.execute(delete(Conversation))
+        result = db.execute(
+            Conversation.__table__.insert().from_select(
+                columns,
+                select(*(ranked.c[name] for name in columns)).where(ranked.c.rank == 1),
+            )
+        )
+        db.commit()
+        return result.rowcount
+    
+    def get_unread_count(self, db: Session, *, user_id: int) -> int:
+        """
+        获取用户的未读消息总数（读取计数表，不扫描消息表）
+        """
+        count = db.scalar(
+            select(UnreadCounter.unread_count).where(UnreadCounter.user_id == user_id)
+        )
+        return count or 0
+    
+    def rebuild_unread_counters(self, db: Session) -> int:
+        """
+        从messages表重建用户未读总数
+        返回有未读消息的用户数
+        """
+        db.execute(delete(UnreadCounter))
+        result = db.execute(
+            UnreadCounter.__table__.insert().from_select(
+                ["user_id", "unread_count"],
+                select(Message.receiver_id, func.count())
+                .where(Message.is_read == False)
+                .group_by(Message.receiver_id),
+            )
+        )
+        db.commit()
+        return result.rowcount
+    
+    def _touch_conversations(self, db: Session, *, messages: List[Message]) -> None:
+        """
+        新消息写入后更新会话汇总行和接收者的未读总数（与消息处于同一事务）
+        messages需按写入顺序排列，同一会话的多条消息会合并为一次更新
+        """
+        conversations: Dict[Tuple[int, int], Dict[str, int]] = {}
+        for message in messages:
+            user_low_id = min(message.sender_id, message.receiver_id)
+            user_high_id = max(message.sender_id, message.receiver_id)
+            row = conversations.setdefault(
+                (user_low_id, user_high_id),
+                {"user_low_id": user_low_id, "user_high_id": user_high_id, "unread_low": 0, "unread_high": 0},
+            )
+            row["message_id"] = message.id
+            # 发给自己的消息只计入user_low一侧
+            if message.receiver_id == user_low_id:
+                row["unread_low"] += 1
+            else:
+                row["unread_high"] += 1
         
-        for message in unread_messages:
-            message.is_read = True
-            db.add(message)
+        message_id = bindparam("message_id")
+        stmt = dialect_insert(db, Conversation.__table__).values(
+            last_message_id=message_id,
+            last_activity_at=select(Message.created_at).where(Message.id == message_id).scalar_subquery(),
+        )
+        db.execute(
+            stmt.on_conflict_do_update(
+                index_elements=[Conversation.user_low_id, Conversation.user_high_id],
+                set_={
+                    "last_message_id": stmt.excluded.last_message_id,
+                    "last_activity_at": stmt.excluded.last_activity_at,
+                    "unread_low": Conversation.unread_low + stmt.excluded.unread_low,
+                    "unread_high": Conversation.unread_high + stmt.excluded.unread_high,
+                },
+            ),
+            list(conversations.values()),
+        )
         
-        db.commit()
-        return len(unread_messages)
+        receivers = Counter(message.receiver_id for message in messages)
+        stmt = dialect_insert(db, UnreadCounter.__table__)
+        db.execute(
+            stmt.on_conflict_do_update(
+                index_elements=[UnreadCounter.user_id],
+                set_={"unread_count": UnreadCounter.unread_count + stmt.excluded.unread_count},
+            ),
+            [{"user_id": user_id, "unread_count": count} for user_id, count in receivers.items()],
+        )
+    
+    def _decrement_unread(
+        self, db: Session, *, reader_id: int, counts: Dict[int, int]
+    ) -> None:
+        """
+        消息被读者标记为已读后，扣减会话汇总行中读者一侧的未读数和读者的未读总数
+        counts: {对话用户ID: 已读消息数}
+        """
+        params = [
+            {
+                "low_id": min(reader_id, partner_id),
+                "high_id": max(reader_id, partner_id),
+                "read_count": count,
+            }
+            for partner_id, count in counts.items()
+            if count > 0
+        ]
+        if not params:
+            return
+        # 读者是user_low时扣减unread_low，否则扣减unread_high
+        reader_is_low = Conversation.user_low_id == reader_id
+        read_count = bindparam("read_count")
+        db.execute(
+            update(Conversation.__table__)
+            .where(
+                Conversation.user_low_id == bindparam("low_id"),
+                Conversation.user_high_id == bindparam("high_id"),
+            )
+            .values(
+                unread_low=Conversation.unread_low - case((reader_is_low, read_count), else_=0),
+                unread_high=Conversation.unread_high - case((reader_is_low, 0), else_=read_count),
+            ),
+            params,
+        )
+        db.execute(
+            update(UnreadCounter)
+            .where(UnreadCounter.user_id == reader_id)
+            .values(unread_count=UnreadCounter.unread_count - sum(p["read_count"] for p in params))
+        )
+
+class AsyncCRUDMessage(AsyncCRUDBase[Message, MessageCreate, MessageCreate]):
+    """
+    消息读取的异步版本
+    分页和检索的语句构造较复杂，通过run_sync在异步连接上执行同步实现，
+    语句仍由异步驱动发送，不占用线程池的线程
+    run_sync中的代码运行在事件循环上，读取归档文件等阻塞操作不能放在其中
+    """
+    async def get_conversation(
+        self, db: AsyncSession, *, limit: int = 50, **kwargs: Any
+    ) -> Tuple[List[Message], Optional[str]]:
+        messages, direction, archive = await db.run_sync(
+            lambda session: message._online_conversation(session, limit=limit, **kwargs)
+        )
+        if archive is not None:
+            segments = list(
+                await db.scalars(
+                    message._archive_segments(pair_key=archive["pair_key"], before=archive["before"])
+                )
+            )
+            if segments:
+                # 读文件和解压在线程池中执行
+                messages += await run_in_threadpool(
+                    message._read_segments, segments, before=archive["before"], limit=archive["limit"]
+                )
+        return message._conversation_page(messages, direction, limit)
+    
+    async def get_conversations(
+        self, db: AsyncSession, **kwargs: Any
+    ) -> Tuple[List[Tuple[User, Message, int]], Optional[str]]:
+        return await db.run_sync(lambda session: message.get_conversations(session, **kwargs))
+    
+    async def search(
+        self, db: AsyncSession, **kwargs: Any
+    ) -> Tuple[List[Tuple[Message, str, float]], Optional[str]]:
+        return await db.run_sync(lambda session: message.search(session, **kwargs))
+    
+    async def get_unread_count(self, db: AsyncSession, *, user_id: int) -> int:
+        """
+        获取用户的未读消息总数（读取计数表，不扫描消息表）
+        """
+        count = await db.scalar(
+            select(UnreadCounter.unread_count).where(UnreadCounter.user_id == user_id)
+        )
+        return count or 0
 
-message = CRUDMessage(Message) 
\ No newline at end of file
+message = CRUDMessage(Message)
+message_async = AsyncCRUDMessage(Message)
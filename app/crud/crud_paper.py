@@ -1,26 +1,36 @@
-from typing import List, Optional, Dict, Any, Union
+from typing import List, Optional, Dict, Any, Tuple, Union
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.crud.base import CRUDBase
+from app.crud.async_base import AsyncCRUDBase, apaginate
+from app.crud.base import CRUDBase, get_by, paginate
+from app.models.knowledge_base import user_likes_papers
 from app.models.paper import Paper
 from app.models.user import User
 from app.schemas.paper import PaperCreate, PaperUpdate
 
 
 class CRUDPaper(CRUDBase[Paper, PaperCreate, PaperUpdate]):
+    def column_values(
+        self, obj_in: Union[PaperCreate, PaperUpdate, Dict[str, Any]], *, exclude_unset: bool = False
+    ) -> Dict[str, Any]:
+        """
+        作者列表存储为逗号分隔的字符串
+        """
+        values = super().column_values(obj_in, exclude_unset=exclude_unset)
+        if isinstance(values.get("authors"), list):
+            values["authors"] = ", ".join(values["authors"])
+        return values
+    
     def get_multi_by_knowledge_base(
-        self, db: Session, *, knowledge_base_id: int, skip: int = 0, limit: int = 100
-    ) -> List[Paper]:
+        self, db: Session, *, knowledge_base_id: int, cursor: Optional[str] = None, limit: int = 100
+    ) -> Tuple[List[Paper], Optional[str]]:
         """
-        获取知识库的所有论文
+        获取知识库的论文（游标分页）
         """
-        return (
-            db.query(self.model)
-            .filter(Paper.knowledge_base_id == knowledge_base_id)
-            .offset(skip)
-            .limit(limit)
-            .all()
-        )
+        stmt = select(Paper).where(Paper.knowledge_base_id == knowledge_base_id)
+        return self.get_page(db, stmt=stmt, cursor=cursor, limit=limit)
     
     def create_with_knowledge_base(
         self, db: Session, *, obj_in: PaperCreate, knowledge_base_id: int
@@ -28,43 +38,27 @@ class CRUDPaper(CRUDBase[Paper, PaperCreate, PaperUpdate]):
         """
         创建论文，指定知识库
         """
-        db_obj = Paper(
-            title=obj_in.title,
-            authors=obj_in.authors,
-            abstract=obj_in.abstract,
-            publish_date=obj_in.publish_date,
-            doi=obj_in.doi,
-            url=obj_in.url,
-            knowledge_base_id=knowledge_base_id,
-        )
+        values = self.column_values(obj_in)
+        values["knowledge_base_id"] = knowledge_base_id
+        db_obj = Paper(**values)
         db.add(db_obj)
-        db.commit()
-        db.refresh(db_obj)
+        self._commit_created(db, db_obj)
         return db_obj
     
     def search(
-        self, db: Session, *, query: str, skip: int = 0, limit: int = 100
-    ) -> List[Paper]:
-        """
-        搜索论文
-        """
-        return (
-            db.query(self.model)
-            .filter(
-                Paper.title.ilike(f"%{query}%") | 
-                Paper.abstract.ilike(f"%{query}%")
-            )
-            .offset(skip)
-            .limit(limit)
-            .all()
-        )
+        self, db: Session, *, query: str, cursor: Optional[str] = None, limit: int = 100
+    ) -> Tuple[List[Paper], Optional[str]]:
+        """
+        搜索论文（游标分页）
+        """
+        return paginate(db, search_statement(query), [Paper.id], cursor=cursor, limit=limit)
     
     def like(self, db: Session, *, paper_id: int, user_id: int) -> bool:
         """
         用户点赞论文
         """
         paper = self.get(db, id=paper_id)
-        user = db.query(User).filter(User.id == user_id).first()
+        user = get_by(db, User.id, user_id)
         
         if not paper or not user or paper in user.liked_papers:
             return False
@@ -78,7 +72,7 @@ class CRUDPaper(CRUDBase[Paper, PaperCreate, PaperUpdate]):
         用户取消点赞论文
         """
         paper = self.get(db, id=paper_id)
-        user = db.query(User).filter(User.id == user_id).first()
+        user = get_by(db, User.id, user_id)
         
         if not paper or not user or paper not in user.liked_papers:
             return False
@@ -88,16 +82,35 @@ class CRUDPaper(CRUDBase[Paper, PaperCreate, PaperUpdate]):
         return True
     
     def get_liked_by_user(
-        self, db: Session, *, user_id: int, skip: int = 0, limit: int = 100
-    ) -> List[Paper]:
+        self, db: Session, *, user_id: int, cursor: Optional[str] = None, limit: int = 100
+    ) -> Tuple[List[Paper], Optional[str]]:
         """
-        获取用户点赞的论文
+        获取用户点赞的论文（游标分页）
         """
-        user = db.query(User).filter(User.id == user_id).first()
-        if not user:
-            return []
-        
-        return user.liked_papers[skip:skip+limit]
+        stmt = (
+            select(Paper)
+            .join(user_likes_papers, user_likes_papers.c.paper_id == Paper.id)
+            .where(user_likes_papers.c.user_id == user_id)
+        )
+        return self.get_page(db, stmt=stmt, cursor=cursor, limit=limit)
+
+
+def search_statement(query: str):
+    """
+    按标题或摘要搜索论文的查询
+    """
+    return select(Paper).where(Paper.title.ilike(f"%{query}%") | Paper.abstract.ilike(f"%{query}%"))
+
+
+class AsyncCRUDPaper(AsyncCRUDBase[Paper, PaperCreate, PaperUpdate]):
+    async def search(
+        self, db: AsyncSession, *, query: str, cursor: Optional[str] = None, limit: int = 100
+    ) -> Tuple[List[Paper], Optional[str]]:
+        """
+        搜索论文（游标分页）
+        """
+        return await apaginate(db, search_statement(query), [Paper.id], cursor=cursor, limit=limit)
 
 
-paper = CRUDPaper(Paper) 
\ No newline at end of file
+paper = CRUDPaper(Paper)
+paper_async = AsyncCRUDPaper(Paper)
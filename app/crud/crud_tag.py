@@ -1,8 +1,11 @@
-from typing import List, Optional
+from typing import List, Optional, Tuple
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 
-from app.crud.base import CRUDBase
+from app.crud.base import CRUDBase, get_by
 from app.models.knowledge_base import Tag, KnowledgeBase
+from app.models.paper import Paper
+from app.models.tag import knowledge_base_tags, paper_tags
 from app.schemas.tag import TagCreate, TagUpdate
 
 
@@ -11,7 +14,7 @@ class CRUDTag(CRUDBase[Tag, TagCreate, TagUpdate]):
         """
         通过名称获取标签
         """
-        return db.query(self.model).filter(Tag.name == name).first()
+        return get_by(db, Tag.name, name)
     
     def get_or_create(self, db: Session, *, name: str) -> Tag:
         """
@@ -23,17 +26,56 @@ class CRUDTag(CRUDBase[Tag, TagCreate, TagUpdate]):
             tag = self.create(db, obj_in=tag_in)
         return tag
     
+    def get_list_page(
+        self, db: Session, *, cursor: Optional[str] = None, limit: int = 100
+    ) -> Tuple[List[Tag], Optional[str]]:
+        """
+        获取标签列表，按名称排序（游标分页）
+        """
+        return self.get_page(db, sort=[Tag.name], cursor=cursor, limit=limit)
+    
     def get_multi_by_knowledge_base(
-        self, db: Session, *, knowledge_base_id: int, skip: int = 0, limit: int = 100
-    ) -> List[Tag]:
+        self, db: Session, *, knowledge_base_id: int, cursor: Optional[str] = None, limit: int = 100
+    ) -> Tuple[List[Tag], Optional[str]]:
+        """
+        获取知识库的标签，按名称排序（游标分页）
+        """
+        stmt = (
+            select(Tag)
+            .join(knowledge_base_tags, knowledge_base_tags.c.tag_id == Tag.id)
+            .where(knowledge_base_tags.c.knowledge_base_id == knowledge_base_id)
+        )
+        return self.get_page(db, stmt=stmt, sort=[Tag.name], cursor=cursor, limit=limit)
+    
+    def get_knowledge_bases(
+        self, db: Session, *, tag_id: int, cursor: Optional[str] = None, limit: int = 100
+    ) -> Tuple[List[KnowledgeBase], Optional[str]]:
         """
-        获取知识库的所有标签
+        获取带有该标签的知识库（游标分页）
         """
-        kb = db.query(KnowledgeBase).filter(KnowledgeBase.id == knowledge_base_id).first()
-        if not kb:
-            return []
+        from app.crud.crud_knowledge_base import knowledge_base
         
-        return kb.tags[skip:skip+limit]
+        stmt = (
+            knowledge_base.list_statement()
+            .join(knowledge_base_tags, knowledge_base_tags.c.knowledge_base_id == KnowledgeBase.id)
+            .where(knowledge_base_tags.c.tag_id == tag_id)
+        )
+        return knowledge_base.get_page(db, stmt=stmt, cursor=cursor, limit=limit)
+    
+    def get_papers(
+        self, db: Session, *, tag_id: int, cursor: Optional[str] = None, limit: int = 100
+    ) -> Tuple[List[Paper], Optional[str]]:
+        """
+        获取带有该标签的论文（游标分页）
+        """
+        from app.crud.crud_paper import paper
+        
+        stmt = (
+            select(Paper)
+            .join(paper_tags, paper_tags.c.paper_id == Paper.id)
+            .where(paper_tags.c.tag_id == tag_id)
+        )
+        return paper.get_page(db, stmt=stmt, cursor=cursor, limit=limit)
     
     def get_popular(self, db: Session, *, limit: int = 10) -> List[Tag]:
         """
@@ -51,15 +93,14 @@ class CRUDTag(CRUDBase[Tag, TagCreate, TagUpdate]):
     def create_with_knowledge_base(
         self, db: Session, *, obj_in: TagCreate, knowledge_base_id: int
     ) -> Tag:
-        tag = db.query(Tag).filter(Tag.name == obj_in.name).first()
+        tag = self.get_by_name(db, name=obj_in.name)
         if not tag:
             tag = Tag(name=obj_in.name)
             db.add(tag)
-            db.commit()
-            db.refresh(tag)
+            self._commit_created(db, tag)
         
         # 添加到知识库
-        kb = db.query(KnowledgeBase).filter(KnowledgeBase.id == knowledge_base_id).first()
+        kb = get_by(db, KnowledgeBase.id, knowledge_base_id)
         if kb and tag not in kb.tags:
             kb.tags.append(tag)
             db.commit()
@@ -1,9 +1,17 @@
-from typing import Any, Dict, Optional, Union, List
+from typing import Any, Dict, Optional, Set, Tuple, Union, List
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import exists, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.core.security import get_password_hash, verify_password
-from app.crud.base import CRUDBase
-from app.models.user import User
+from app.core.cache import user_cache
+from app.core.revocation import token_versions
+from app.core import hashing
+from app.core.availability import user_availability
+from app.core.security import averify_and_update_password, get_password_hash, get_password_hashes, password_hasher
+from app.crud.async_base import AsyncCRUDBase, aget_by
+from app.crud.base import CRUDBase, dialect_insert, get_by
+from app.models.user import User, user_following
 from app.schemas.user import UserCreate, UserUpdate
 
 class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
@@ -11,22 +19,24 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
         """
         通过邮箱获取用户
         """
-        return db.query(User).filter(User.email == email).first()
+        return get_by(db, User.email, email)
     
     def get_by_username(self, db: Session, *, username: str) -> Optional[User]:
         """
         通过用户名获取用户
         """
-        return db.query(User).filter(User.username == username).first()
+        return get_by(db, User.username, username)
     
-    def create(self, db: Session, *, obj_in: UserCreate) -> User:
+    def create(
+        self, db: Session, *, obj_in: UserCreate, hashed_password: Optional[str] = None
+    ) -> User:
         """
-        创建用户
+        创建用户，hashed_password为预先计算好的密码哈希（未提供时在此计算）
         """
         db_obj = User(
             email=obj_in.email,
             username=obj_in.username,
-            hashed_password=get_password_hash(obj_in.password),
+            hashed_password=hashed_password or get_password_hash(obj_in.password),
             avatar=obj_in.avatar,
             is_active=obj_in.is_active,
             is_superuser=obj_in.is_superuser,
@@ -37,10 +47,82 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
             school=obj_in.school,
         )
         db.add(db_obj)
-        db.commit()
-        db.refresh(db_obj)
+        self._commit_created(db, db_obj)
+        user_availability.add(email=db_obj.email, username=db_obj.username)
         return db_obj
     
+    def import_batch(
+        self,
+        db: Session,
+        *,
+        rows: List[Tuple[int, UserCreate]],
+        seen_emails: Set[str],
+        seen_usernames: Set[str],
+    ) -> List[Dict[str, Any]]:
+        """
+        批量导入一批用户，rows为(行号, 用户数据)列表
+        seen_emails/seen_usernames记录本次导入中之前批次已使用的邮箱和用户名，会被更新
+        邮箱和用户名的唯一性各用一次IN查询检查，密码在进程池中并行哈希，
+        用一条多行INSERT ... ON CONFLICT DO NOTHING RETURNING写入并只提交一次
+        返回每行的结果：{"line", "status": created|conflict, "id", "error"}
+        """
+        emails = [obj.email for _, obj in rows]
+        usernames = [obj.username for _, obj in rows]
+        taken_emails = seen_emails | set(db.scalars(select(User.email).where(User.email.in_(emails))))
+        taken_usernames = seen_usernames | set(
+            db.scalars(select(User.username).where(User.username.in_(usernames)))
+        )
+        
+        results: Dict[int, Dict[str, Any]] = {}
+        candidates = []
+        for line, obj in rows:
+            if obj.email in taken_emails:
+                results[line] = {"line": line, "status": "conflict", "error": "邮箱已存在"}
+            elif obj.username in taken_usernames:
+                results[line] = {"line": line, "status": "conflict", "error": "用户名已存在"}
+            else:
+                taken_emails.add(obj.email)
+                taken_usernames.add(obj.username)
+                candidates.append((line, obj))
+        seen_emails.update(obj.email for _, obj in candidates)
+        seen_usernames.update(obj.username for _, obj in candidates)
+        
+        if candidates:
+            hashed_passwords = get_password_hashes([obj.password for _, obj in candidates])
+            values = [
+                {
+                    "email": obj.email,
+                    "username": obj.username,
+                    "hashed_password": hashed_password,
+                    "avatar": obj.avatar,
+                    "is_active": obj.is_active,
+                    "is_superuser": obj.is_superuser,
+                    "location": obj.location,
+                    "experience": obj.experience,
+                    "gender": obj.gender,
+                    "age": obj.age,
+                    "school": obj.school,
+                }
+                for (_, obj), hashed_password in zip(candidates, hashed_passwords)
+            ]
+            # 与其他并发注册冲突的行不会写入，也不会出现在RETURNING结果中
+            created = dict(
+                db.execute(
+                    dialect_insert(db, User.__table__)
+                    .values(values)
+                    .on_conflict_do_nothing()
+                    .returning(User.email, User.id)
+                ).all()
+            )
+            db.commit()
+            for line, obj in candidates:
+                if obj.email in created:
+                    user_availability.add(email=obj.email, username=obj.username)
+                    results[line] = {"line": line, "status": "created", "id": created[obj.email]}
+                else:
+                    results[line] = {"line": line, "status": "conflict", "error": "邮箱或用户名已存在"}
+        return [results[line] for line, _ in rows]
+    
     def update(
         self, db: Session, *, db_obj: User, obj_in: Union[UserUpdate, Dict[str, Any]]
     ) -> User:
@@ -55,7 +137,26 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
             hashed_password = get_password_hash(update_data["password"])
             del update_data["password"]
             update_data["hashed_password"] = hashed_password
-        return super().update(db, db_obj=db_obj, obj_in=update_data)
+        # 停用、权限或密码变更时递增令牌版本，之前签发的令牌随之失效
+        if "hashed_password" in update_data or any(
+            field in update_data and update_data[field] != getattr(db_obj, field)
+            for field in ("is_active", "is_superuser")
+        ):
+            update_data["token_version"] = (db_obj.token_version or 0) + 1
+        user = super().update(db, db_obj=db_obj, obj_in=update_data)
+        user_availability.add(email=update_data.get("email"), username=update_data.get("username"))
+        # 资料、激活状态、密码变更后，本worker的认证缓存立即失效
+        user_cache.invalidate(user.id)
+        token_versions.bump(user.id, user.token_version)
+        return user
+    
+    def remove(self, db: Session, *, id: int) -> User:
+        """
+        删除用户
+        """
+        user = super().remove(db, id=id)
+        user_cache.invalidate(id)
+        return user
     
     def authenticate(self, db: Session, *, email: str, password: str) -> Optional[User]:
         """
@@ -64,10 +165,45 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
         user = self.get_by_email(db, email=email)
         if not user:
             return None
-        if not verify_password(password, user.hashed_password):
+        valid, new_hash = password_hasher.run(
+            hashing.verify_and_update, password, user.hashed_password
+        )
+        if not valid:
+            return None
+        if new_hash:
+            self._rehash(db, user=user, hashed_password=new_hash)
+        return user
+    
+    async def authenticate_async(
+        self, db: Session, *, email: str, password: str
+    ) -> Optional[User]:
+        """
+        验证用户：数据库操作在线程池中执行，bcrypt在密码哈希进程池中执行，
+        等待哈希结果时不占用请求线程
+        """
+        user = await run_in_threadpool(self.get_by_email, db, email=email)
+        if not user:
+            return None
+        valid, new_hash = await averify_and_update_password(password, user.hashed_password)
+        if not valid:
             return None
+        if new_hash:
+            await run_in_threadpool(self._rehash, db, user=user, hashed_password=new_hash)
         return user
     
+    def _rehash(self, db: Session, *, user: User, hashed_password: str) -> None:
+        """
+        成本因子变更后用新哈希替换旧哈希；密码本身未变，不递增令牌版本
+        """
+        db.execute(
+            update(User)
+            .where(User.id == user.id, User.hashed_password == user.hashed_password)
+            .values(hashed_password=hashed_password)
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+        user_cache.invalidate(user.id)
+    
     def is_active(self, user: User) -> bool:
         """
         检查用户是否激活
@@ -120,24 +256,112 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
         
         return target in user.following
     
-    def get_following(self, db: Session, *, user_id: int) -> List[User]:
+    def get_following(
+        self, db: Session, *, user_id: int, cursor: Optional[str] = None, limit: int = 100
+    ) -> Tuple[List[User], Optional[str]]:
         """
-        获取用户关注的用户列表
+        获取用户关注的用户列表（游标分页）
         """
-        user = self.get(db, id=user_id)
-        if not user:
-            return []
-        
-        return user.following
+        stmt = (
+            select(User)
+            .join(user_following, user_following.c.followed_id == User.id)
+            .where(user_following.c.follower_id == user_id)
+        )
+        return self.get_page(db, stmt=stmt, cursor=cursor, limit=limit)
     
-    def get_followers(self, db: Session, *, user_id: int) -> List[User]:
+    def get_followers(
+        self, db: Session, *, user_id: int, cursor: Optional[str] = None, limit: int = 100
+    ) -> Tuple[List[User], Optional[str]]:
         """
-        获取用户的粉丝列表
+        获取用户的粉丝列表（游标分页）
         """
-        user = self.get(db, id=user_id)
-        if not user:
-            return []
-        
-        return user.followers
+        stmt = (
+            select(User)
+            .join(user_following, user_following.c.follower_id == User.id)
+            .where(user_following.c.followed_id == user_id)
+        )
+        return self.get_page(db, stmt=stmt, cursor=cursor, limit=limit)
+    
+    def get_follow_stats(self, db: Session, *, user_id: int, viewer_id: int) -> Tuple[int, int, bool]:
+        """
+        一次查询返回用户的粉丝数、关注数，以及viewer是否关注了该用户
+        """
+        row = db.execute(follow_stats_statement(user_id, viewer_id)).one()
+        return row[0], row[1], bool(row[2])
+    
+    def get_follow_stats_many(
+        self, db: Session, *, user_ids: List[int], viewer_id: int
+    ) -> Dict[int, Tuple[int, int, bool]]:
+        """
+        批量返回一页用户的(粉丝数, 关注数, viewer是否关注)，每项统计一次分组查询
+        """
+        if not user_ids:
+            return {}
+        followers = dict(
+            db.execute(
+                select(user_following.c.followed_id, func.count())
+                .where(user_following.c.followed_id.in_(user_ids))
+                .group_by(user_following.c.followed_id)
+            ).all()
+        )
+        following = dict(
+            db.execute(
+                select(user_following.c.follower_id, func.count())
+                .where(user_following.c.follower_id.in_(user_ids))
+                .group_by(user_following.c.follower_id)
+            ).all()
+        )
+        followed_by_viewer = set(
+            db.scalars(
+                select(user_following.c.followed_id).where(
+                    user_following.c.follower_id == viewer_id,
+                    user_following.c.followed_id.in_(user_ids),
+                )
+            )
+        )
+        return {
+            user_id: (followers.get(user_id, 0), following.get(user_id, 0), user_id in followed_by_viewer)
+            for user_id in user_ids
+        }
+
+def follow_stats_statement(user_id: int, viewer_id: int):
+    """
+    查询用户的粉丝数、关注数，以及viewer是否关注了该用户
+    """
+    return select(
+        select(func.count())
+        .where(user_following.c.followed_id == user_id)
+        .scalar_subquery(),
+        select(func.count())
+        .where(user_following.c.follower_id == user_id)
+        .scalar_subquery(),
+        exists().where(
+            user_following.c.follower_id == viewer_id,
+            user_following.c.followed_id == user_id,
+        ),
+    )
+
+class AsyncCRUDUser(AsyncCRUDBase[User, UserCreate, UserUpdate]):
+    async def get_by_email(self, db: AsyncSession, *, email: str) -> Optional[User]:
+        """
+        通过邮箱获取用户
+        """
+        return await aget_by(db, User.email, email)
+    
+    async def get_by_username(self, db: AsyncSession, *, username: str) -> Optional[User]:
+        """
+        通过用户名获取用户
+        """
+        return await aget_by(db, User.username, username)
+    
+    async def get_follow_stats(
+        self, db: AsyncSession, *, user_id: int, viewer_id: int
+    ) -> Tuple[int, int, bool]:
+        """
+        一次查询返回用户的粉丝数、关注数，以及viewer是否关注了该用户
+        """
+        row = (await db.execute(follow_stats_statement(user_id, viewer_id))).one()
+        return row[0], row[1], bool(row[2])
 
-user = CRUDUser(User) 
\ No newline at end of file
+user = CRUDUser(User)
+user_async = AsyncCRUDUser(User)
@@ -0,0 +1,80 @@
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class GroupCommitter:
+    """
+    组提交：把短时间窗口内并发提交的写入合并为一个事务
+
+    调用方在各自的线程中调用 submit 并阻塞等待自己的结果；
+    后台线程收集最多 max_batch 条写入（或等待 window_ms 毫秒）后调用 flush 一次性写入。
+    flush 接收写入项列表，必须按相同顺序返回结果列表。
+    """
+    def __init__(
+        self,
+        flush: Callable[[List[Any]], List[Any]],
+        *,
+        window_ms: float,
+        max_batch: int,
+        name: str = "group-commit",
+    ) -> None:
+        self.flush = flush
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self.name = name
+        self._queue: "queue.Queue[Tuple[Any, Future]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def submit(self, item: Any) -> Any:
+        """
+        提交一条写入并等待其所在批次提交完成，返回该写入对应的结果
+        """
+        self._ensure_started()
+        future: Future = Future()
+        self._queue.put((item, future))
+        return future.result()
+
+    def _ensure_started(self) -> None:
+        # 延迟到第一次使用时启动，保证线程运行在gunicorn fork之后的worker进程中
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._commit(batch)
+
+    def _commit(self, batch: List[Tuple[Any, Future]]) -> None:
+        try:
+            results = self.flush([item for item, _ in batch])
+        except Exception as e:
+            if len(batch) == 1:
+                batch[0][1].set_exception(e)
+                return
+            # 整批失败时逐条重试，只让出错的写入失败
+            logger.warning(f"组提交失败，逐条重试 {len(batch)} 条写入: {e}")
+            for entry in batch:
+                self._commit([entry])
+            return
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
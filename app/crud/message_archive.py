@@ -0,0 +1,52 @@
+import gzip
+import json
+import os
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Tuple
+
+ARCHIVE_FIELDS = ("id", "sender_id", "receiver_id", "pair_key", "content", "is_read", "created_at")
+
+def write_segment(
+    archive_dir: str, name: str, groups: Iterable[List[Dict[str, Any]]]
+) -> Tuple[str, List[Tuple[int, int]]]:
+    """
+    将若干组消息写入一个归档文件，每组（同一会话的连续消息）压缩为一个独立的gzip成员
+    整个文件仍是合法的 .jsonl.gz，可直接用 zcat 查看
+    先写临时文件并fsync，再原子重命名，保证索引记录指向的文件一定完整
+    返回：(相对路径, [(每组的偏移, 长度)])
+    """
+    relative_path = os.path.join(name[:6], f"{name}.jsonl.gz")
+    path = os.path.join(archive_dir, relative_path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    extents = []
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        for rows in groups:
+            lines = "".join(
+                json.dumps(
+                    {**row, "created_at": row["created_at"].isoformat()},
+                    ensure_ascii=False,
+                ) + "\n"
+                for row in rows
+            )
+            data = gzip.compress(lines.encode("utf-8"))
+            extents.append((f.tell(), len(data)))
+            f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    return relative_path, extents
+
+def read_segment(archive_dir: str, path: str, offset: int, length: int) -> List[Dict[str, Any]]:
+    """
+    读取归档文件中的一个gzip成员，返回按(created_at, id)升序排列的消息
+    """
+    with open(os.path.join(archive_dir, path), "rb") as f:
+        f.seek(offset)
+        data = gzip.decompress(f.read(length))
+    rows = []
+    for line in data.decode("utf-8").splitlines():
+        row = json.loads(line)
+        row["created_at"] = datetime.fromisoformat(row["created_at"])
+        rows.append(row)
+    return rows
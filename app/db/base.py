@@ -5,4 +5,7 @@ from app.db.base_class import Base  # noqa
 from app.models.user import User  # noqa
 from app.models.knowledge_base import KnowledgeBase, Tag, user_likes_papers, knowledge_base_tags, paper_tags  # noqa
 from app.models.paper import Paper  # noqa
-from app.models.message import Message  # noqa 
\ No newline at end of file
+from app.models.message import Message  # noqa
+from app.models.message_archive import MessageArchiveSegment  # noqa
+from app.models.conversation import Conversation, UnreadCounter  # noqa
+from app.models.rate_limit import RateLimitCounter  # noqa
@@ -11,4 +11,5 @@ class Base:
     # 自动生成表名
     @declared_attr
     def __tablename__(cls) -> str:
-        return cls.__name__.lower() 
\ No newline at end of file
+        return cls.__name__.lower() 
+
@@ -0,0 +1,56 @@
+from datetime import datetime, timezone
+from typing import List
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+def month_start(moment: datetime, months: int = 0) -> datetime:
+    """
+    返回moment所在月份（向后偏移months个月）的第一天零点（UTC）
+    """
+    index = moment.year * 12 + moment.month - 1 + months
+    return datetime(index // 12, index % 12 + 1, 1, tzinfo=timezone.utc)
+
+def message_partition_name(start: datetime) -> str:
+    return f"messages_y{start.year:04d}m{start.month:02d}"
+
+def is_partitioned(db: Session, table: str) -> bool:
+    """
+    判断表是否为PostgreSQL分区表
+    """
+    if db.get_bind().dialect.name != "postgresql":
+        return False
+    return bool(
+        db.scalar(
+            text(
+                "SELECT 1 FROM pg_partitioned_table p "
+                "JOIN pg_class c ON c.oid = p.partrelid "
+                "WHERE c.relname = :table AND pg_table_is_visible(c.oid)"
+            ),
+            {"table": table},
+        )
+    )
+
+def ensure_message_partitions(db: Session, *, months_ahead: int = 3) -> List[str]:
+    """
+    为messages表创建未来months_ahead个月的月分区（已存在的跳过）
+    当前月份的分区在之前的运行或迁移中已创建，这里只创建下个月起的分区，
+    避免与默认分区中已有的数据冲突；非PostgreSQL或未分区时不做任何事
+    返回本次检查的分区名
+    """
+    if not is_partitioned(db, "messages"):
+        return []
+    now = datetime.now(timezone.utc)
+    names = []
+    for months in range(1, months_ahead + 1):
+        start, end = month_start(now, months), month_start(now, months + 1)
+        name = message_partition_name(start)
+        db.execute(
+            text(
+                f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF messages "
+                f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+            )
+        )
+        names.append(name)
+    db.commit()
+    return names
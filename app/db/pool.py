@@ -0,0 +1,134 @@
+import time
+from typing import Any, Dict, Tuple
+
+from sqlalchemy import event, exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from app.core.config import settings
+from app.core.metrics import registry
+
+class PoolMetrics:
+    """
+    连接池的取连接指标，每个worker进程各自持有连接池，以下指标均为当前worker的值
+    """
+    def __init__(self, prefix: str):
+        self.prefix = prefix
+        self.checkouts = registry.counter(f"{prefix}_checkouts_total", "从连接池取出连接的次数")
+        self.wait_seconds = registry.counter(
+            f"{prefix}_checkout_wait_seconds_total", "从连接池取出连接的累计等待时间（秒）"
+        )
+        self.wait_seconds_max = registry.gauge(
+            f"{prefix}_checkout_wait_seconds_max", "自启动以来取出连接的最长等待时间（秒）"
+        )
+        self.timeouts = registry.counter(
+            f"{prefix}_checkout_timeouts_total", "等待连接超过pool_timeout而失败的次数"
+        )
+        self.idle_pings = registry.counter(
+            f"{prefix}_idle_pings_total", "对空闲过久的连接执行存活检查的次数"
+        )
+
+    def observe(self, waited: float) -> None:
+        self.checkouts.inc()
+        self.wait_seconds.inc(waited)
+        if waited > self.wait_seconds_max.value:
+            self.wait_seconds_max.set(waited)
+
+class _CheckoutTimingMixin:
+    """
+    记录取连接等待时间，等待时间包括池满时排队以及新建连接的耗时
+    """
+    metrics: PoolMetrics
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            self.metrics.timeouts.inc()
+            raise
+        finally:
+            self.metrics.observe(time.perf_counter() - start)
+
+_pool_classes: Dict[Tuple[str, type], type] = {}
+
+def instrumented_pool_class(prefix: str, base: type = QueuePool) -> type:
+    """
+    返回以prefix命名指标的连接池类，同一prefix复用同一个类（dispose重建连接池时沿用）
+    """
+    key = (prefix, base)
+    if key not in _pool_classes:
+        _pool_classes[key] = type(
+            f"Instrumented{base.__name__}",
+            (_CheckoutTimingMixin, base),
+            {"metrics": PoolMetrics(prefix)},
+        )
+    return _pool_classes[key]
+
+InstrumentedQueuePool = instrumented_pool_class("db_pool")
+InstrumentedAsyncQueuePool = instrumented_pool_class("db_async_pool", AsyncAdaptedQueuePool)
+
+def engine_options(is_async: bool = False, prefix: str = None) -> Dict[str, Any]:
+    """
+    根据配置生成create_engine/create_async_engine的连接池参数
+    prefix为连接池指标的前缀，默认为主库的db_pool / db_async_pool
+    """
+    if prefix is None:
+        poolclass = InstrumentedAsyncQueuePool if is_async else InstrumentedQueuePool
+    else:
+        poolclass = instrumented_pool_class(prefix, AsyncAdaptedQueuePool if is_async else QueuePool)
+    return {
+        "poolclass": poolclass,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_POOL_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_use_lifo": settings.DB_POOL_USE_LIFO,
+        # 设置了空闲检查时不再每次取连接都ping
+        "pool_pre_ping": settings.DB_POOL_PRE_PING and not settings.DB_POOL_PING_IDLE_SECONDS,
+    }
+
+def install_idle_ping(engine: Engine, idle_seconds: float, metrics: PoolMetrics) -> None:
+    """
+    只对归还后空闲超过idle_seconds的连接在取出时执行存活检查，
+    代替pool_pre_ping每次取连接都多一次往返
+    """
+    @event.listens_for(engine, "checkin")
+    def _checkin(dbapi_connection, connection_record):
+        connection_record.info["checked_in_at"] = time.monotonic()
+
+    @event.listens_for(engine, "checkout")
+    def _checkout(dbapi_connection, connection_record, connection_proxy):
+        checked_in_at = connection_record.info.get("checked_in_at")
+        if checked_in_at is None or time.monotonic() - checked_in_at < idle_seconds:
+            return
+        metrics.idle_pings.inc()
+        cursor = dbapi_connection.cursor()
+        try:
+            cursor.execute("SELECT 1")
+        except Exception:
+            # 抛出DisconnectionError后连接池会丢弃该连接并重新获取
+            raise exc.DisconnectionError()
+        finally:
+            try:
+                cursor.close()
+            except Exception:
+                pass
+
+def instrument(engine: Engine) -> None:
+    """
+    注册当前worker连接池的状态指标，异步引擎传入其sync_engine
+    每次采集时读取engine.pool：dispose或重建连接池后指标反映新的连接池
+    """
+    metrics = engine.pool.metrics
+    prefix = metrics.prefix
+    registry.gauge(f"{prefix}_size", "连接池的常驻连接数上限", lambda: engine.pool.size())
+    registry.gauge(f"{prefix}_checked_out", "当前被请求占用的连接数", lambda: engine.pool.checkedout())
+    registry.gauge(f"{prefix}_checked_in", "当前在池中空闲的连接数", lambda: engine.pool.checkedin())
+    registry.gauge(
+        f"{prefix}_overflow",
+        "当前超出pool_size的连接数（为负表示尚未建满）",
+        lambda: engine.pool.overflow(),
+    )
+    if settings.DB_POOL_PING_IDLE_SECONDS:
+        install_idle_ping(engine, settings.DB_POOL_PING_IDLE_SECONDS, metrics)
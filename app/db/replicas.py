@@ -0,0 +1,117 @@
+import itertools
+import logging
+import threading
+from typing import List, Optional
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import settings
+from app.core.metrics import registry
+from app.db.pool import engine_options, instrument
+from app.db.session import async_database_uri
+
+logger = logging.getLogger(__name__)
+
+# 副本的复制延迟（秒）；WAL已全部回放时为0，避免主库空闲时回放时间戳变旧被误判为延迟
+REPLICA_LAG_SQL = text(
+    """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+    """
+)
+
+replica_reads_total = registry.counter(
+    "db_replica_reads_total", "路由到只读副本的请求数"
+)
+primary_reads_total = registry.counter(
+    "db_primary_reads_total", "配置了副本但因写后粘滞或副本延迟而使用主库的只读请求数"
+)
+
+class Replica:
+    """
+    一个只读副本：同步和异步引擎各一个连接池，以及最近一次检查的复制延迟
+    """
+    def __init__(self, index: int, url: str):
+        self.name = f"replica{index}"
+        self.engine = create_engine(url, **engine_options(prefix=f"db_{self.name}_pool"))
+        instrument(self.engine)
+        self.async_engine = create_async_engine(
+            async_database_uri(url), **engine_options(is_async=True, prefix=f"db_{self.name}_async_pool")
+        )
+        instrument(self.async_engine.sync_engine)
+        self.session_factory = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
+        self.async_session_factory = async_sessionmaker(
+            self.async_engine, autoflush=False, expire_on_commit=False
+        )
+        # 首次检查之前不使用该副本
+        self.lag: Optional[float] = None
+        registry.gauge(
+            f"db_{self.name}_lag_seconds",
+            "副本最近一次检查的复制延迟（秒），无法连接时为-1",
+            lambda: -1 if self.lag is None else self.lag,
+        )
+
+    def check(self) -> None:
+        try:
+            with self.engine.connect() as connection:
+                self.lag = measure_lag(self.engine, connection)
+        except Exception:
+            logger.exception(f"只读副本 {self.name} 检查失败")
+            self.lag = None
+
+def measure_lag(engine: Engine, connection) -> float:
+    """
+    查询副本的复制延迟；非PostgreSQL数据库（本地测试用SQLite代替副本）视为没有延迟
+    """
+    if engine.dialect.name != "postgresql":
+        return 0.0
+    return float(connection.execute(REPLICA_LAG_SQL).scalar() or 0)
+
+class ReplicaSet:
+    """
+    只读副本集合，轮询选择复制延迟不超过上限的副本
+    延迟由定时任务定期检查，请求路由时只读取检查结果，不额外查询
+    """
+    def __init__(self, urls: List[str], max_lag: float):
+        self.replicas = [Replica(index, url) for index, url in enumerate(urls)]
+        self.max_lag = max_lag
+        self._cycle = itertools.cycle(self.replicas) if self.replicas else None
+        self._lock = threading.Lock()
+        registry.gauge("db_replicas_available", "延迟在上限内、可用于读请求的副本数", self.available_count)
+
+    def __bool__(self) -> bool:
+        return bool(self.replicas)
+
+    def _usable(self, replica: Replica) -> bool:
+        return replica.lag is not None and replica.lag <= self.max_lag
+
+    def available_count(self) -> int:
+        return sum(self._usable(replica) for replica in self.replicas)
+
+    def choose(self) -> Optional[Replica]:
+        """
+        返回下一个可用的副本，全部不可用时返回None（由调用方回退到主库）
+        """
+        if self._cycle is None:
+            return None
+        with self._lock:
+            for _ in range(len(self.replicas)):
+                replica = next(self._cycle)
+                if self._usable(replica):
+                    return replica
+        return None
+
+    def check(self) -> None:
+        for replica in self.replicas:
+            replica.check()
+
+replicas = ReplicaSet(
+    [url.strip() for url in settings.DATABASE_REPLICA_URLS.split(",") if url.strip()],
+    settings.DB_REPLICA_MAX_LAG_SECONDS,
+)
@@ -0,0 +1,77 @@
+from typing import Optional
+
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import InvalidRequestError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.db.replicas import primary_reads_total, replica_reads_total, replicas
+from app.db.session import async_engine, engine
+
+# 只读会话的连接以只读事务执行（PostgreSQL的BEGIN READ ONLY，不增加往返），其他数据库忽略该选项
+READ_ONLY_OPTIONS = {"postgresql_readonly": True}
+
+_read_only_engines = {}
+
+def _read_only(bind: Engine) -> Engine:
+    """
+    与bind共享连接池、以只读事务执行的引擎
+    """
+    if bind not in _read_only_engines:
+        _read_only_engines[bind] = bind.execution_options(**READ_ONLY_OPTIONS)
+    return _read_only_engines[bind]
+
+class RoutingSession(Session):
+    """
+    按用途区分的会话：
+    - 写会话绑定主库，语义与SessionLocal相同
+    - 只读会话不自动flush、提交后不过期，有待写入的改动时flush直接报错；
+      可使用副本时在第一次执行语句时才选择副本，认证失败等未查询数据库的请求不会占用副本或连接
+    会话本身只在第一次执行语句时从连接池取连接
+    """
+    def __init__(
+        self, *, read_only: bool = False, use_replica: bool = False, is_async: bool = False, **kw
+    ):
+        if read_only:
+            kw.setdefault("autoflush", False)
+            kw.setdefault("expire_on_commit", False)
+        super().__init__(**kw)
+        self.read_only = read_only
+        self.use_replica = use_replica
+        self.is_async = is_async
+        self._routed_bind: Optional[Engine] = None
+
+    def get_bind(self, mapper=None, clause=None, **kw) -> Engine:
+        if self._routed_bind is None:
+            self._routed_bind = self._choose_bind()
+        return self._routed_bind
+
+    def _choose_bind(self) -> Engine:
+        primary = async_engine.sync_engine if self.is_async else engine
+        if not self.read_only:
+            return primary
+        replica = replicas.choose() if self.use_replica else None
+        if replica is not None:
+            replica_reads_total.inc()
+            return _read_only(replica.async_engine.sync_engine if self.is_async else replica.engine)
+        if replicas:
+            primary_reads_total.inc()
+        return _read_only(primary)
+
+    def flush(self, objects=None) -> None:
+        if self.read_only and (self.new or self.dirty or self.deleted):
+            raise InvalidRequestError("只读会话不能写入数据")
+        super().flush(objects)
+
+def make_session(*, read_only: bool = False, use_replica: bool = False) -> RoutingSession:
+    return RoutingSession(read_only=read_only, use_replica=use_replica, autoflush=False)
+
+def make_async_session(*, read_only: bool = False, use_replica: bool = False) -> AsyncSession:
+    return AsyncSession(
+        sync_session_class=RoutingSession,
+        read_only=read_only,
+        use_replica=use_replica,
+        is_async=True,
+        autoflush=False,
+        expire_on_commit=False,
+    )
@@ -1,12 +1,42 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
 from app.core.config import settings
+from app.db.pool import engine_options, instrument
 
-engine = create_engine(settings.SQLALCHEMY_DATABASE_URI, pool_pre_ping=True)
+# 同步驱动对应的异步驱动
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+    "sqlite+pysqlite": "sqlite+aiosqlite",
+}
+
+def async_database_uri(uri: str) -> str:
+    """
+    将同步数据库URL转换为对应异步驱动的URL（asyncpg / aiosqlite）
+    """
+    url = make_url(uri)
+    return url.set(drivername=ASYNC_DRIVERS.get(url.drivername, url.drivername)).render_as_string(
+        hide_password=False
+    )
+
+engine = create_engine(settings.SQLALCHEMY_DATABASE_URI, **engine_options())
+instrument(engine)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# 异步引擎：协程在等待数据库时让出事件循环，不占用线程池的线程
+# 与同步引擎各有一个连接池，每个worker的连接数上限按两者之和计算
+async_engine = create_async_engine(
+    async_database_uri(settings.SQLALCHEMY_DATABASE_URI), **engine_options(is_async=True)
+)
+instrument(async_engine.sync_engine)
+# 提交后不使对象过期：异步会话中访问过期属性会触发隐式IO而报错
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
 
 # 依赖函数，用于获取数据库会话
@@ -15,4 +45,4 @@ def get_db():
     try:
         yield db
     finally:
-        db.close() 
\ No newline at end of file
+        db.close()
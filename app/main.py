@@ -1,6 +1,9 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from app.api.api_v1.api import api_router
+from app.api.deps import PRIMARY_STICKY_HEADER
+from app.core.metrics import registry
 
 app = FastAPI()
 
@@ -11,6 +14,8 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # 跨域的前端需要读取该响应头并在随后的请求中带回
+    expose_headers=[PRIMARY_STICKY_HEADER],
 )
 
 # 注册路由
@@ -26,4 +31,9 @@ async def health_check():
     """
     健康检查端点，用于Kubernetes的活性和就绪探针
     """
-    return {"status": "ok"}
\ No newline at end of file
+    return {"status": "ok"}
+
+# 指标端点，Prometheus文本格式（各worker分别计数）
+@app.get("/metrics", tags=["Health"], response_class=PlainTextResponse)
+def metrics():
+    return registry.render()
@@ -2,4 +2,7 @@ from app.models.user import User
 from app.models.knowledge_base import KnowledgeBase
 from app.models.paper import Paper
 from app.models.tag import Tag
-from app.models.message import Message 
\ No newline at end of file
+from app.models.message import Message
+from app.models.message_archive import MessageArchiveSegment
+from app.models.conversation import Conversation, UnreadCounter
+from app.models.rate_limit import RateLimitCounter
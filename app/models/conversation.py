@@ -0,0 +1,36 @@
+from sqlalchemy import Column, Integer, ForeignKey, DateTime, Index, UniqueConstraint
+
+from app.db.base_class import Base
+
+class Conversation(Base):
+    """
+    会话汇总表，由消息写入路径在同一事务内维护，
+    可通过 reconcile_db.py 从 messages 表重建
+    """
+    __tablename__ = "conversations"
+
+    id = Column(Integer, primary_key=True, index=True)
+    # 参与者按ID排序存储，保证每对用户只有一行
+    user_low_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    user_high_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    # messages在PostgreSQL上按月分区，主键为(id, created_at)，因此这里不设外键
+    last_message_id = Column(Integer)
+    last_activity_at = Column(DateTime(timezone=True), nullable=False)
+    # 各自一方的未读消息数
+    unread_low = Column(Integer, nullable=False, default=0)
+    unread_high = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        UniqueConstraint("user_low_id", "user_high_id", name="uq_conversations_pair"),
+        Index("ix_conversations_low_activity", "user_low_id", "last_activity_at", "id"),
+        Index("ix_conversations_high_activity", "user_high_id", "last_activity_at", "id"),
+    )
+
+class UnreadCounter(Base):
+    """
+    用户收到的未读消息总数，与会话汇总表在同一事务内维护，用于未读角标
+    """
+    __tablename__ = "unread_counters"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    unread_count = Column(Integer, nullable=False, default=0)
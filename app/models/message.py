@@ -1,15 +1,35 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Text, Boolean
+from sqlalchemy import BigInteger, Column, Integer, String, ForeignKey, DateTime, Text, Boolean, Index, DDL, event
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 
 from app.db.base_class import Base
 
+# 会话键的高位偏移：pair_key = min(用户ID) << 32 | max(用户ID)
+PAIR_KEY_SHIFT = 2 ** 32
+
+def make_pair_key(user_id1: int, user_id2: int) -> int:
+    """
+    计算两个用户之间会话的规范键，与参与者顺序无关
+    """
+    return min(user_id1, user_id2) * PAIR_KEY_SHIFT + max(user_id1, user_id2)
+
+# PostgreSQL全文检索使用的分词配置；中文分词可安装zhparser等扩展后修改，并重建检索索引
+SEARCH_TEXT_CONFIG = "simple"
+# 与检索索引的表达式保持一致，查询才能命中索引
+SEARCH_VECTOR_SQL = f"to_tsvector('{SEARCH_TEXT_CONFIG}'::regconfig, coalesce(content, ''))"
+
+def _default_pair_key(context) -> int:
+    params = context.get_current_parameters()
+    return make_pair_key(params["sender_id"], params["receiver_id"])
+
 class Message(Base):
     __tablename__ = "messages"
 
     id = Column(Integer, primary_key=True, index=True)
     sender_id = Column(Integer, ForeignKey("users.id"))
     receiver_id = Column(Integer, ForeignKey("users.id"))
+    # 会话规范键，插入时根据发送者和接收者自动计算
+    pair_key = Column(BigInteger, nullable=False, default=_default_pair_key)
     content = Column(Text)
     is_read = Column(Boolean, default=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -18,6 +38,13 @@ class Message(Base):
     sender = relationship("User", foreign_keys=[sender_id], back_populates="sent_messages")
     receiver = relationship("User", foreign_keys=[receiver_id], back_populates="received_messages")
 
+    __table_args__ = (
+        # 会话历史：一次索引范围扫描，id用于同一时间戳内的稳定排序
+        Index("ix_messages_pair_key_created_at", "pair_key", "created_at", "id"),
+        # 未读消息统计与批量已读
+        Index("ix_messages_receiver_id_is_read", "receiver_id", "is_read"),
+    )
+
     def to_dict(self):
         return {
             "id": self.id,
@@ -26,4 +53,31 @@ class Message(Base):
             "content": self.content,
             "created_at": self.created_at.isoformat(),
             "is_read": self.is_read
-        } 
\ No newline at end of file
+        }
+
+# 全文检索：PostgreSQL使用表达式GIN索引，SQLite使用FTS5外部内容表并由触发器同步
+# 已有数据库由alembic迁移创建
+event.listen(
+    Message.__table__,
+    "after_create",
+    DDL(
+        f"CREATE INDEX IF NOT EXISTS ix_messages_content_search ON messages USING gin ({SEARCH_VECTOR_SQL})"
+    ).execute_if(dialect="postgresql"),
+)
+
+for statement in (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(content, content='messages', content_rowid='id')",
+    "CREATE TRIGGER IF NOT EXISTS messages_fts_insert AFTER INSERT ON messages BEGIN "
+    "INSERT INTO messages_fts(rowid, content) VALUES (new.id, new.content); END",
+    "CREATE TRIGGER IF NOT EXISTS messages_fts_delete AFTER DELETE ON messages BEGIN "
+    "INSERT INTO messages_fts(messages_fts, rowid, content) VALUES ('delete', old.id, old.content); END",
+    "CREATE TRIGGER IF NOT EXISTS messages_fts_update AFTER UPDATE OF content ON messages BEGIN "
+    "INSERT INTO messages_fts(messages_fts, rowid, content) VALUES ('delete', old.id, old.content); "
+    "INSERT INTO messages_fts(rowid, content) VALUES (new.id, new.content); END",
+):
+    event.listen(Message.__table__, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+event.listen(
+    Message.__table__,
+    "before_drop",
+    DDL("DROP TABLE IF EXISTS messages_fts").execute_if(dialect="sqlite"),
+)
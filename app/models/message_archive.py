@@ -0,0 +1,29 @@
+from sqlalchemy import BigInteger, Column, Integer, String, DateTime, Index
+from sqlalchemy.sql import func
+
+from app.db.base_class import Base
+
+class MessageArchiveSegment(Base):
+    """
+    归档消息段索引：每行对应归档文件中一个会话的连续消息块
+    归档文件由多个gzip成员拼接而成，按offset/length可直接读取单个会话的消息
+    """
+    __tablename__ = "message_archive_segments"
+
+    id = Column(Integer, primary_key=True, index=True)
+    pair_key = Column(BigInteger, nullable=False)
+    # 相对于MESSAGE_ARCHIVE_DIR的文件路径
+    path = Column(String, nullable=False)
+    offset = Column(BigInteger, nullable=False)
+    length = Column(Integer, nullable=False)
+    message_count = Column(Integer, nullable=False)
+    # 块内最早和最新一条消息的位置(created_at, id)
+    first_created_at = Column(DateTime(timezone=True), nullable=False)
+    first_id = Column(Integer, nullable=False)
+    last_created_at = Column(DateTime(timezone=True), nullable=False)
+    last_id = Column(Integer, nullable=False)
+    archived_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        Index("ix_message_archive_segments_pair_key_last", "pair_key", "last_created_at", "last_id"),
+    )
@@ -0,0 +1,14 @@
+from sqlalchemy import BigInteger, Column, Integer, String
+
+from app.db.base_class import Base
+
+class RateLimitCounter(Base):
+    """
+    限流计数：每个键在每个固定时间窗口内的请求次数，多个worker共享
+    """
+    __tablename__ = "rate_limit_counters"
+
+    key = Column(String, primary_key=True)
+    # 窗口起始时间（Unix秒，按窗口长度对齐）
+    window_start = Column(BigInteger, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
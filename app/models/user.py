@@ -38,6 +38,8 @@ class User(Base):
     school = Column(String, nullable=True)
     is_active = Column(Boolean(), default=True)
     is_superuser = Column(Boolean(), default=False)
+    # 令牌版本：停用、权限或密码变更时递增，使之前签发的携带声明的令牌失效
+    token_version = Column(Integer, nullable=False, default=0, server_default="0")
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
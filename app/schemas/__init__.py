@@ -1,6 +1,8 @@
-from .user import User, UserCreate, UserUpdate, UserDetail
+from .user import User, UserCreate, UserUpdate, UserDetail, UserImportResult, UserAvailabilityResult
 from .knowledge_base import KnowledgeBase, KnowledgeBaseCreate, KnowledgeBaseUpdate, KnowledgeBaseWithPapers, KnowledgeBaseCreateWithPapers
-from .paper import Paper, PaperCreate, PaperUpdate
-from .message import Message, MessageCreate, Conversation
-from .tag import Tag, TagCreate, TagUpdate
-from .token import Token, TokenPayload 
\ No newline at end of file
+from .paper import Paper, PaperBatchUpdate, PaperCreate, PaperUpdate
+from .message import Message, MessageCreate, MessageReadBatch, MessageSearchHit, Conversation
+from .tag import Tag, TagBatchUpdate, TagCreate, TagUpdate
+from .token import Token, TokenPayload 
+from .pagination import Page
+from .batch import BatchDelete, BatchItemResult
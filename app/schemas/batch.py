@@ -0,0 +1,15 @@
+from typing import List, Optional
+from pydantic import BaseModel
+
+
+# 批量删除请求
+class BatchDelete(BaseModel):
+    ids: List[int]
+
+
+# 批量操作中每一项的结果，index为该项在请求中的位置
+class BatchItemResult(BaseModel):
+    index: int
+    status: str  # created、exists、updated、deleted、not_found 或 error
+    id: Optional[int] = None
+    error: Optional[str] = None
@@ -1,5 +1,5 @@
 from typing import List, Optional
-from pydantic import BaseModel
+from pydantic import BaseModel, field_validator
 from datetime import datetime
 
 from app.schemas.paper import Paper, PaperCreate
@@ -44,6 +44,13 @@ class PaperInDBBase(PaperBase):
     knowledge_base_id: int
     created_at: datetime
 
+    # 数据库中作者存储为逗号分隔的字符串
+    @field_validator("authors", mode="before")
+    def split_authors(cls, v):
+        if isinstance(v, str):
+            return [author.strip() for author in v.split(",") if author.strip()]
+        return v
+
     class Config:
         orm_mode = True
 
@@ -73,6 +80,11 @@ class KnowledgeBaseInDBBase(KnowledgeBaseBase):
     stars: int = 0
     forks: int = 0
 
+    # 从数据库对象读取时标签为Tag对象，只返回名称
+    @field_validator("tags", mode="before")
+    def tag_names(cls, v):
+        return [getattr(tag, "name", tag) for tag in v] if v is not None else v
+
     class Config:
         orm_mode = True
 
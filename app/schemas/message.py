@@ -1,6 +1,6 @@
 from typing import List, Optional
 from datetime import datetime
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 # 消息基础模型
 class MessageBase(BaseModel):
@@ -14,6 +14,10 @@ class MessageCreate(MessageBase):
 class MessageUpdate(MessageBase):
     is_read: Optional[bool] = None
 
+# 批量标记已读的输入数据
+class MessageReadBatch(BaseModel):
+    message_ids: List[int] = Field(..., max_length=1000)
+
 # 数据库内消息模型
 class MessageInDBBase(MessageBase):
     id: int
@@ -33,7 +37,7 @@ class Message(MessageInDBBase):
 class UserBasic(BaseModel):
     id: int
     username: str
-    avatar: str
+    avatar: Optional[str] = None
 
     class Config:
         orm_mode = True
@@ -47,4 +51,10 @@ class Conversation(BaseModel):
     other_user: Optional[UserBasic] = None
 
     class Config:
-        orm_mode = True 
\ No newline at end of file
+        orm_mode = True 
+
+# 消息检索结果
+class MessageSearchHit(BaseModel):
+    message: Message
+    snippet: str  # 命中片段，关键词以<mark></mark>标记
+    rank: float  # 相关度，越大越相关
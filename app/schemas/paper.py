@@ -1,6 +1,6 @@
 from typing import List, Optional
 from datetime import datetime
-from pydantic import BaseModel
+from pydantic import BaseModel, field_validator
 
 
 # 论文基础模型
@@ -28,6 +28,11 @@ class PaperUpdate(BaseModel):
     url: Optional[str] = None
 
 
+# 批量更新论文时的一项
+class PaperBatchUpdate(PaperUpdate):
+    id: int
+
+
 # 数据库内论文模型
 class PaperInDBBase(PaperBase):
     id: int
@@ -35,6 +40,13 @@ class PaperInDBBase(PaperBase):
     created_at: datetime
     updated_at: Optional[datetime] = None
 
+    # 数据库中作者存储为逗号分隔的字符串
+    @field_validator("authors", mode="before")
+    def split_authors(cls, v):
+        if isinstance(v, str):
+            return [author.strip() for author in v.split(",") if author.strip()]
+        return v
+
     class Config:
         orm_mode = True
 
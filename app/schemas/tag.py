@@ -17,6 +17,11 @@ class TagUpdate(TagBase):
     pass
 
 
+# 批量更新标签时的一项
+class TagBatchUpdate(TagUpdate):
+    id: int
+
+
 # 数据库内标签模型
 class TagInDBBase(TagBase):
     id: int
@@ -56,6 +56,18 @@ class UserListItem(UserInDBBase):
     following_count: int = 0
     is_following: bool = False
 
+# 批量导入用户时每行的结果
+class UserImportResult(BaseModel):
+    line: int
+    status: str  # created、conflict 或 invalid
+    id: Optional[int] = None
+    error: Optional[str] = None
+
+# 用户名/邮箱是否可用，未查询的项为None
+class UserAvailabilityResult(BaseModel):
+    email: Optional[bool] = None
+    username: Optional[bool] = None
+
 # 用户登录
 class UserLogin(BaseModel):
     email: EmailStr
@@ -0,0 +1,37 @@
+import logging
+from datetime import datetime, timedelta, timezone
+
+from app import crud
+from app.core.config import settings
+from app.db.partitions import ensure_message_partitions
+from app.db.session import SessionLocal
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def archive() -> None:
+    db = SessionLocal()
+    try:
+        names = ensure_message_partitions(
+            db, months_ahead=settings.MESSAGE_PARTITION_MONTHS_AHEAD
+        )
+        if names:
+            logger.info(f"消息分区已就绪：{', '.join(names)}")
+        older_than = datetime.now(timezone.utc) - timedelta(days=settings.MESSAGE_ARCHIVE_AFTER_DAYS)
+        count = crud.message.archive_read_messages(
+            db,
+            older_than=older_than,
+            archive_dir=settings.MESSAGE_ARCHIVE_DIR,
+            batch_size=settings.MESSAGE_ARCHIVE_BATCH_SIZE,
+        )
+        logger.info(f"已归档 {count} 条 {older_than:%Y-%m-%d} 之前的已读消息")
+    finally:
+        db.close()
+
+def main() -> None:
+    logger.info("正在维护消息分区并归档历史消息...")
+    archive()
+    logger.info("消息归档完成。")
+
+if __name__ == "__main__":
+    main()
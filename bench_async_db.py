@@ -0,0 +1,107 @@
+import argparse
+import asyncio
+import logging
+import time
+
+import anyio
+import httpx
+from fastapi import FastAPI
+from sqlalchemy import text
+
+from app import crud
+from app.db.session import AsyncSessionLocal, SessionLocal, async_engine, engine
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+def build_app(db_latency: float) -> FastAPI:
+    """
+    同一查询的同步和异步两个版本，db_latency>0时在查询前执行pg_sleep模拟数据库往返耗时
+    """
+    bench = FastAPI()
+
+    @bench.get("/sync/{user_id}")
+    def read_sync(user_id: int):
+        db = SessionLocal()
+        try:
+            if db_latency:
+                db.execute(text("SELECT pg_sleep(:s)"), {"s": db_latency})
+            user = crud.user.get(db, id=user_id)
+            return {"id": user.id if user else None}
+        finally:
+            db.close()
+
+    @bench.get("/async/{user_id}")
+    async def read_async(user_id: int):
+        async with AsyncSessionLocal() as db:
+            if db_latency:
+                await db.execute(text("SELECT pg_sleep(:s)"), {"s": db_latency})
+            user = await crud.user_async.get(db, id=user_id)
+            return {"id": user.id if user else None}
+
+    return bench
+
+def percentile(values, q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))] * 1000
+
+async def run(bench: FastAPI, path: str, requests: int, concurrency: int, threads: int) -> dict:
+    # 同步端点在线程池中执行，线程数即同步路径的并发上限
+    anyio.to_thread.current_default_thread_limiter().total_tokens = threads
+    transport = httpx.ASGITransport(app=bench)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        semaphore = asyncio.Semaphore(concurrency)
+        latencies = []
+
+        async def one():
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.get(path)
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(requests)))
+        elapsed = time.perf_counter() - start
+    return {
+        "throughput": requests / elapsed,
+        "p50": percentile(latencies, 0.5),
+        "p95": percentile(latencies, 0.95),
+    }
+
+async def compare(bench: FastAPI, args: argparse.Namespace) -> None:
+    # 异步连接绑定在创建它的事件循环上，两种路径在同一个事件循环中依次测量
+    for mode in ("sync", "async"):
+        path = f"/{mode}/{args.user_id}"
+        # 预热：建立连接池中的连接
+        await run(bench, path, args.concurrency, args.concurrency, args.threads)
+        result = await run(bench, path, args.requests, args.concurrency, args.threads)
+        logger.info(
+            f"{mode}: {result['throughput']:.0f} 请求/秒，"
+            f"p50 {result['p50']:.1f}ms / p95 {result['p95']:.1f}ms"
+        )
+    await async_engine.dispose()
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="同步/异步数据库路径对比基准（使用配置的数据库）")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--threads", type=int, default=40, help="线程池大小（Starlette默认40）")
+    parser.add_argument(
+        "--db-latency-ms", type=float, default=0,
+        help="每个请求额外的数据库耗时（pg_sleep，仅PostgreSQL），模拟慢查询或网络往返",
+    )
+    parser.add_argument("--user-id", type=int, default=1)
+    args = parser.parse_args()
+
+    bench = build_app(args.db_latency_ms / 1000)
+    logger.info(
+        f"并发 {args.concurrency}，线程池 {args.threads}，"
+        f"连接池 {engine.pool.size()}+{engine.pool._max_overflow}（同步） / "
+        f"{async_engine.sync_engine.pool.size()}+{async_engine.sync_engine.pool._max_overflow}（异步）"
+    )
+    asyncio.run(compare(bench, args))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+import argparse
+import logging
+import time
+import uuid
+
+from sqlalchemy import delete, event, inspect, select
+
+from app import crud, models, schemas
+from app.api.api_v1.endpoints import auth, knowledge_bases, messages, tags
+from app.core.config import settings
+from app.core.security import get_password_hash
+from app.crud.base import CRUDBase
+from app.db.session import SessionLocal, engine
+from app.models.tag import knowledge_base_tags
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+BENCH_EMAIL = "bench-create@example.com"
+
+def legacy_commit_created(self, db, *objs):
+    """
+    旧的创建方式：提交后refresh重新读取新对象
+    """
+    db.commit()
+    db.refresh(objs[0])
+
+def ensure_fixtures() -> tuple:
+    """
+    基准用户及其一个知识库，返回(user_id, kb_id)
+    """
+    db = SessionLocal()
+    try:
+        user = crud.user.get_by_email(db, email=BENCH_EMAIL)
+        if not user:
+            user = crud.user.create(
+                db,
+                obj_in=schemas.UserCreate(email=BENCH_EMAIL, username="bench-create", password="bench-password"),
+            )
+        kbs, _ = crud.knowledge_base.get_multi_by_owner(db, owner_id=user.id, limit=1)
+        if kbs:
+            return user.id, kbs[0].id
+        kb = crud.knowledge_base.create_with_owner(
+            db,
+            obj_in=schemas.KnowledgeBaseCreate(title="bench", description="bench", user_id=user.id),
+            owner_id=user.id,
+        )
+        return user.id, kb.id
+    finally:
+        db.close()
+
+def build_cases(user_id: int, kb_id: int, prefix: str) -> dict:
+    """
+    每个用例是一次写请求的处理：端点函数加上响应序列化；取到当前用户后调用begin开始计时和计数
+    注册用例直接调用写入用户的函数，使用预先计算的密码哈希，不计入bcrypt的耗时
+    """
+    hashed_password = get_password_hash("bench-password")
+
+    def register(db, i, begin):
+        start = begin()
+        user_in = schemas.UserCreate(
+            email=f"{prefix}-{i}@example.com", username=f"{prefix}-{i}", password="bench-password"
+        )
+        user = auth._create_user(db, user_in, hashed_password)
+        schemas.User.model_validate({attr.key: getattr(user, attr.key) for attr in inspect(user).mapper.column_attrs})
+        return start
+
+    def create_knowledge_base(db, i, begin):
+        current_user = crud.user.get(db, id=user_id)
+        start = begin()
+        kb_in = schemas.KnowledgeBaseCreate(title=f"{prefix}-{i}", description="bench", tags=["bench"], user_id=user_id)
+        result = knowledge_bases.create_knowledge_base(db=db, knowledge_base_in=kb_in, current_user=current_user)
+        schemas.KnowledgeBase.model_validate(result, from_attributes=True)
+        return start
+
+    def add_paper_to_knowledge_base(db, i, begin):
+        current_user = crud.user.get(db, id=user_id)
+        start = begin()
+        paper_in = schemas.PaperCreate(
+            title=f"{prefix}-{i}", authors=["A"], abstract="bench", publish_date="2020", knowledge_base_id=kb_id
+        )
+        result = knowledge_bases.add_paper_to_knowledge_base(
+            db=db, kb_id=kb_id, paper_in=paper_in, current_user=current_user
+        )
+        schemas.Paper.model_validate(result, from_attributes=True)
+        return start
+
+    def create_tag(db, i, begin):
+        current_user = crud.user.get(db, id=user_id)
+        start = begin()
+        result = tags.create_tag(db=db, tag_in=schemas.TagCreate(name=f"{prefix}-{i}"), current_user=current_user)
+        schemas.Tag.model_validate(result, from_attributes=True)
+        return start
+
+    def send_message(db, i, begin):
+        current_user = crud.user.get(db, id=user_id)
+        start = begin()
+        message_in = schemas.MessageCreate(content=f"{prefix}-{i}", receiver_id=user_id)
+        messages.send_message(db=db, message_in=message_in, current_user=current_user)
+        return start
+
+    return {
+        "register": register,
+        "create_knowledge_base": create_knowledge_base,
+        "add_paper_to_knowledge_base": add_paper_to_knowledge_base,
+        "create_tag": create_tag,
+        "send_message": send_message,
+    }
+
+def measure(case, iterations: int, label: str) -> tuple:
+    """
+    返回(每次请求的平均耗时ms, 平均数据库往返次数)，往返包括SQL语句和COMMIT
+    label用于区分各轮写入的名称，避免唯一约束冲突
+    """
+    round_trips = 0
+    counting = False
+
+    def count(*_):
+        nonlocal round_trips
+        if counting:
+            round_trips += 1
+
+    def begin() -> float:
+        nonlocal counting
+        counting = True
+        return time.perf_counter()
+
+    event.listen(engine, "before_cursor_execute", count)
+    event.listen(engine, "commit", count)
+    elapsed = 0.0
+    try:
+        for i in range(iterations):
+            db = SessionLocal()
+            try:
+                start = case(db, f"{label}-{i}", begin)
+                elapsed += time.perf_counter() - start
+            finally:
+                counting = False
+                db.close()
+    finally:
+        event.remove(engine, "before_cursor_execute", count)
+        event.remove(engine, "commit", count)
+    return elapsed / iterations * 1000, round_trips / iterations
+
+def cleanup(prefix: str, user_id: int) -> None:
+    """
+    删除基准写入的数据
+    """
+    db = SessionLocal()
+    try:
+        pattern = f"{prefix}-%"
+        kb_ids = select(models.KnowledgeBase.id).where(models.KnowledgeBase.title.like(pattern))
+        tag_ids = select(models.Tag.id).where(models.Tag.name.like(pattern))
+        db.execute(delete(models.Paper).where(models.Paper.title.like(pattern)))
+        db.execute(delete(knowledge_base_tags).where(knowledge_base_tags.c.knowledge_base_id.in_(kb_ids)))
+        db.execute(delete(models.KnowledgeBase).where(models.KnowledgeBase.id.in_(kb_ids)))
+        db.execute(delete(knowledge_base_tags).where(knowledge_base_tags.c.tag_id.in_(tag_ids)))
+        db.execute(delete(models.Tag).where(models.Tag.id.in_(tag_ids)))
+        db.execute(
+            delete(models.Message).where(models.Message.sender_id == user_id, models.Message.content.like(pattern))
+        )
+        db.execute(delete(models.User).where(models.User.username.like(pattern)))
+        db.commit()
+    finally:
+        db.close()
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="创建接口微基准：每次请求的耗时和数据库往返次数（使用配置的数据库，结束后删除写入的数据）"
+    )
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--legacy", action="store_true", help="同时测量旧的提交后refresh方式作为对比")
+    args = parser.parse_args()
+
+    # 逐条提交，组提交的往返由另一条路径计算
+    settings.MESSAGE_GROUP_COMMIT = False
+    user_id, kb_id = ensure_fixtures()
+    prefix = f"bench-{uuid.uuid4().hex[:8]}"
+    cases = build_cases(user_id, kb_id, prefix)
+    modes = [("INSERT ... RETURNING", CRUDBase._commit_created)]
+    if args.legacy:
+        modes.append(("旧方式", legacy_commit_created))
+    original = CRUDBase._commit_created
+    try:
+        for run, (mode, implementation) in enumerate(modes):
+            CRUDBase._commit_created = implementation
+            for name, case in cases.items():
+                measure(case, min(args.iterations, 20), f"{run}w")
+                ms, round_trips = measure(case, args.iterations, str(run))
+                logger.info(f"{mode} {name}: {ms:.2f}ms/次，{round_trips:.1f} 次往返/次")
+    finally:
+        CRUDBase._commit_created = original
+        cleanup(prefix, user_id)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+import argparse
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import delete, event, insert, or_, select
+
+from app import crud, models, schemas
+from app.core.config import settings
+from app.db.session import SessionLocal, engine
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def create_users(prefix: str, count: int) -> list:
+    """
+    批量写入基准用户（不经过密码哈希），返回用户ID列表
+    """
+    db = SessionLocal()
+    try:
+        ids = list(
+            db.scalars(
+                insert(models.User).returning(models.User.id, sort_by_parameter_order=True),
+                [
+                    {"email": f"{prefix}-{i}@example.com", "username": f"{prefix}-{i}", "hashed_password": "bench"}
+                    for i in range(count)
+                ],
+            )
+        )
+        db.commit()
+        return ids
+    finally:
+        db.close()
+
+def send_direct(sender_id: int, receiver_id: int, content: str) -> None:
+    """
+    当前路径：每条消息一个会话、一个事务
+    """
+    db = SessionLocal()
+    try:
+        crud.message.create_with_sender(
+            db, obj_in=schemas.MessageCreate(content=content, receiver_id=receiver_id), sender_id=sender_id
+        )
+    finally:
+        db.close()
+
+def send_grouped(sender_id: int, receiver_id: int, content: str) -> None:
+    """
+    组提交路径：与窗口期内其他线程的发送合并为一个事务
+    """
+    crud.message.create_with_sender_grouped(
+        obj_in=schemas.MessageCreate(content=content, receiver_id=receiver_id), sender_id=sender_id
+    )
+
+def percentile(values, q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))] * 1000
+
+def run(send, user_ids: list, messages: int, threads: int) -> dict:
+    """
+    threads个线程并发发送共messages条消息（每个用户发给下一个用户），返回吞吐、延迟和提交次数
+    """
+    latencies = []
+    lock = threading.Lock()
+    commits = 0
+
+    def count(*_):
+        nonlocal commits
+        commits += 1
+
+    def one(n: int) -> None:
+        sender_id = user_ids[n % len(user_ids)]
+        receiver_id = user_ids[(n + 1) % len(user_ids)]
+        start = time.perf_counter()
+        send(sender_id, receiver_id, f"bench {n}")
+        elapsed = time.perf_counter() - start
+        with lock:
+            latencies.append(elapsed)
+
+    event.listen(engine, "commit", count)
+    try:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            list(executor.map(one, range(messages)))
+        elapsed = time.perf_counter() - start
+    finally:
+        event.remove(engine, "commit", count)
+    return {
+        "throughput": messages / elapsed,
+        "p50": percentile(latencies, 0.5),
+        "p95": percentile(latencies, 0.95),
+        "commits": commits,
+    }
+
+def cleanup(prefix: str) -> None:
+    """
+    删除基准写入的用户、消息和汇总数据
+    """
+    db = SessionLocal()
+    try:
+        user_ids = select(models.User.id).where(models.User.username.like(f"{prefix}-%"))
+        db.execute(
+            delete(models.Message).where(
+                or_(models.Message.sender_id.in_(user_ids), models.Message.receiver_id.in_(user_ids))
+            )
+        )
+        db.execute(delete(models.Conversation).where(models.Conversation.user_low_id.in_(user_ids)))
+        db.execute(delete(models.Conversation).where(models.Conversation.user_high_id.in_(user_ids)))
+        db.execute(delete(models.UnreadCounter).where(models.UnreadCounter.user_id.in_(user_ids)))
+        db.execute(delete(models.User).where(models.User.username.like(f"{prefix}-%")))
+        db.commit()
+    finally:
+        db.close()
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="组提交基准：并发发送私信时逐条提交与组提交的吞吐、延迟和提交次数（使用配置的数据库，结束后删除写入的数据）"
+    )
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--threads", type=int, default=16, help="并发发送的线程数（不要超过连接池大小）")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--window-ms", type=float, default=settings.MESSAGE_GROUP_COMMIT_WINDOW_MS)
+    parser.add_argument("--max-batch", type=int, default=settings.MESSAGE_GROUP_COMMIT_MAX_BATCH)
+    args = parser.parse_args()
+
+    # 组提交线程在第一次发送时按当前配置创建
+    settings.MESSAGE_GROUP_COMMIT_WINDOW_MS = args.window_ms
+    settings.MESSAGE_GROUP_COMMIT_MAX_BATCH = args.max_batch
+    prefix = f"bench-group-{uuid.uuid4().hex[:8]}"
+    try:
+        user_ids = create_users(prefix, args.users)
+        for name, send in (("逐条提交", send_direct), ("组提交", send_grouped)):
+            # 预热：建立连接池中的连接、启动组提交线程
+            run(send, user_ids, args.threads, args.threads)
+            result = run(send, user_ids, args.messages, args.threads)
+            logger.info(
+                f"{name}: {result['throughput']:.0f} 条/秒，p50 {result['p50']:.1f}ms，"
+                f"p95 {result['p95']:.1f}ms，{result['commits']} 次提交"
+            )
+    finally:
+        cleanup(prefix)
+
+if __name__ == "__main__":
+    main()
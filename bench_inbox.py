@@ -0,0 +1,127 @@
+import argparse
+import logging
+import time
+import uuid
+
+from sqlalchemy import delete, event, insert, or_, select
+
+from app import crud, models, schemas
+from app.db.session import SessionLocal, engine
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def create_users(prefix: str, start: int, count: int) -> list:
+    """
+    批量写入基准用户（不经过密码哈希），返回用户ID列表
+    """
+    db = SessionLocal()
+    try:
+        ids = list(
+            db.scalars(
+                insert(models.User).returning(models.User.id, sort_by_parameter_order=True),
+                [
+                    {
+                        "email": f"{prefix}-{i}@example.com",
+                        "username": f"{prefix}-{i}",
+                        "hashed_password": "bench",
+                    }
+                    for i in range(start, start + count)
+                ],
+            )
+        )
+        db.commit()
+        return ids
+    finally:
+        db.close()
+
+def add_partners(owner_id: int, partner_ids: list, messages_per_partner: int) -> None:
+    """
+    每个对话用户与基准用户往来若干条消息，经由写入路径同时维护会话汇总表和未读计数
+    """
+    db = SessionLocal()
+    try:
+        items = []
+        for partner_id in partner_ids:
+            for i in range(messages_per_partner):
+                if i % 2 == 0:
+                    items.append((schemas.MessageCreate(content=f"bench {i}", receiver_id=owner_id), partner_id))
+                else:
+                    items.append((schemas.MessageCreate(content=f"bench {i}", receiver_id=partner_id), owner_id))
+        for start in range(0, len(items), 1000):
+            crud.message.create_many_with_sender(db, items=items[start:start + 1000])
+    finally:
+        db.close()
+
+def measure(owner_id: int, iterations: int, limit: int) -> tuple:
+    """
+    返回(第一页会话列表的平均耗时ms, 平均SQL语句数)，每次使用新的会话
+    """
+    statements = 0
+
+    def count(*_):
+        nonlocal statements
+        statements += 1
+
+    event.listen(engine, "before_cursor_execute", count)
+    elapsed = 0.0
+    try:
+        for _ in range(iterations):
+            db = SessionLocal()
+            try:
+                start = time.perf_counter()
+                crud.message.get_conversations(db, user_id=owner_id, limit=limit)
+                elapsed += time.perf_counter() - start
+            finally:
+                db.close()
+    finally:
+        event.remove(engine, "before_cursor_execute", count)
+    return elapsed / iterations * 1000, statements / iterations
+
+def cleanup(prefix: str) -> None:
+    """
+    删除基准写入的用户、消息和汇总数据
+    """
+    db = SessionLocal()
+    try:
+        user_ids = select(models.User.id).where(models.User.username.like(f"{prefix}-%"))
+        db.execute(
+            delete(models.Message).where(
+                or_(models.Message.sender_id.in_(user_ids), models.Message.receiver_id.in_(user_ids))
+            )
+        )
+        db.execute(delete(models.Conversation).where(models.Conversation.user_low_id.in_(user_ids)))
+        db.execute(delete(models.Conversation).where(models.Conversation.user_high_id.in_(user_ids)))
+        db.execute(delete(models.UnreadCounter).where(models.UnreadCounter.user_id.in_(user_ids)))
+        db.execute(delete(models.User).where(models.User.username.like(f"{prefix}-%")))
+        db.commit()
+    finally:
+        db.close()
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="会话列表微基准：对话用户数增长时第一页的耗时和SQL语句数（使用配置的数据库，结束后删除写入的数据）"
+    )
+    parser.add_argument("--partners", default="10,100,1000", help="逐步增加到的对话用户数，逗号分隔")
+    parser.add_argument("--messages-per-partner", type=int, default=4)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    prefix = f"bench-inbox-{uuid.uuid4().hex[:8]}"
+    try:
+        (owner_id,) = create_users(prefix, 0, 1)
+        partners = 0
+        for target in sorted(int(value) for value in args.partners.split(",")):
+            if target > partners:
+                partner_ids = create_users(prefix, partners + 1, target - partners)
+                add_partners(owner_id, partner_ids, args.messages_per_partner)
+                partners = target
+            measure(owner_id, min(args.iterations, 20), args.limit)
+            ms, statements = measure(owner_id, args.iterations, args.limit)
+            logger.info(f"{partners} 个对话用户: {ms:.2f}ms/次，{statements:.1f} 条SQL/次")
+    finally:
+        cleanup(prefix)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import time
+
+import httpx
+
+from app import crud, schemas
+from app.core.config import settings
+from app.core.security import password_hasher
+from app.db.session import SessionLocal
+from app.main import app
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+BENCH_EMAIL = "bench-login@example.com"
+BENCH_PASSWORD = "bench-password"
+
+def ensure_user() -> None:
+    db = SessionLocal()
+    try:
+        if not crud.user.get_by_email(db, email=BENCH_EMAIL):
+            crud.user.create(
+                db,
+                obj_in=schemas.UserCreate(
+                    email=BENCH_EMAIL, username="bench-login", password=BENCH_PASSWORD
+                ),
+            )
+    finally:
+        db.close()
+
+def percentile(values, q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))] * 1000
+
+async def run(requests: int, concurrency: int) -> dict:
+    """
+    并发登录requests次，同时持续请求一个同步端点，观察登录对其他请求的影响
+    """
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        semaphore = asyncio.Semaphore(concurrency)
+        login_latencies, probe_latencies = [], []
+        done = asyncio.Event()
+
+        async def login():
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.post(
+                    f"{settings.API_V1_STR}/auth/login",
+                    data={"username": BENCH_EMAIL, "password": BENCH_PASSWORD},
+                )
+                response.raise_for_status()
+                login_latencies.append(time.perf_counter() - start)
+
+        async def probe():
+            while not done.is_set():
+                start = time.perf_counter()
+                await client.get("/")
+                probe_latencies.append(time.perf_counter() - start)
+                await asyncio.sleep(0.01)
+
+        probe_task = asyncio.create_task(probe())
+        start = time.perf_counter()
+        await asyncio.gather(*(login() for _ in range(requests)))
+        elapsed = time.perf_counter() - start
+        done.set()
+        await probe_task
+    return {
+        "throughput": requests / elapsed,
+        "login_p50": percentile(login_latencies, 0.5),
+        "login_p95": percentile(login_latencies, 0.95),
+        "probe_p95": percentile(probe_latencies, 0.95),
+        "probe_mean": statistics.mean(probe_latencies) * 1000,
+    }
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="登录吞吐基准（使用配置的数据库）")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument(
+        "--workers", type=int, nargs="+", default=[0, os.cpu_count() or 1],
+        help="密码哈希进程池大小，0表示在请求线程中执行",
+    )
+    args = parser.parse_args()
+
+    ensure_user()
+    cores = os.cpu_count() or 1
+    logger.info(f"bcrypt成本因子 {settings.PASSWORD_HASH_ROUNDS}，CPU核数 {cores}")
+    for workers in args.workers:
+        password_hasher.configure(workers)
+        # 预热：启动进程池，并把基准用户的哈希更新为当前成本因子
+        asyncio.run(run(min(args.requests, workers or 1), 1))
+        result = asyncio.run(run(args.requests, args.concurrency))
+        logger.info(
+            f"进程池 {workers}: {result['throughput']:.1f} 次登录/秒"
+            f"（每核 {result['throughput'] / cores:.1f}），"
+            f"登录 p50 {result['login_p50']:.0f}ms / p95 {result['login_p95']:.0f}ms，"
+            f"同时请求其他端点 平均 {result['probe_mean']:.1f}ms / p95 {result['probe_p95']:.1f}ms"
+        )
+    password_hasher.shutdown()
+
+if __name__ == "__main__":
+    main()
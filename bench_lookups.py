@@ -0,0 +1,122 @@
+import argparse
+import logging
+import time
+
+from sqlalchemy import create_engine, event, select
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+from app import models
+from app.crud.base import get_by
+from app.db.base_class import Base
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def setup() -> tuple:
+    """
+    内存SQLite数据库，各表一条记录；数据库本身的耗时由同一条SQL直接在驱动上执行的时间扣除
+    返回(engine, 各查找用例的(列, 值))
+    """
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        user = models.User(email="bench@example.com", username="bench", hashed_password="x")
+        tag = models.Tag(name="bench")
+        db.add_all([user, tag])
+        db.flush()
+        kb = models.KnowledgeBase(title="bench", description="bench", user_id=user.id)
+        db.add(kb)
+        db.commit()
+        lookups = {
+            "User.id": (models.User.id, user.id),
+            "User.username": (models.User.username, user.username),
+            "User.email": (models.User.email, user.email),
+            "Tag.name": (models.Tag.name, tag.name),
+            "KnowledgeBase.id": (models.KnowledgeBase.id, kb.id),
+        }
+    return engine, lookups
+
+def build_variants(attribute, value) -> dict:
+    """
+    同一查找的几种写法；主键查找另加Session.get
+    """
+    model = attribute.class_
+    variants = {
+        "Query": lambda db: db.query(model).filter(attribute == value).first(),
+        "select()": lambda db: db.scalars(select(model).where(attribute == value).limit(1)).first(),
+        "lambda_stmt": lambda db: get_by(db, attribute, value),
+    }
+    if attribute.key == "id":
+        variants["Session.get"] = lambda db: db.get(model, value)
+    return variants
+
+def capture_sql(engine, db: Session, variant) -> tuple:
+    """
+    执行一次，记录驱动实际收到的SQL和参数
+    """
+    captured = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        captured.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        variant(db)
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    db.expunge_all()
+    return captured[0]
+
+def measure(db: Session, variant, iterations: int) -> float:
+    """
+    每次调用的平均耗时（微秒）；每次调用后清空会话，各写法都要重新执行SQL并构造对象
+    """
+    elapsed = 0.0
+    for _ in range(iterations):
+        start = time.perf_counter()
+        variant(db)
+        elapsed += time.perf_counter() - start
+        db.expunge_all()
+    return elapsed / iterations * 1e6
+
+def measure_driver(engine, sql: str, parameters, iterations: int) -> float:
+    """
+    同一条SQL直接在DBAPI游标上执行和取结果的平均耗时（微秒）
+    """
+    raw = engine.raw_connection()
+    try:
+        cursor = raw.cursor()
+        start = time.perf_counter()
+        for _ in range(iterations):
+            cursor.execute(sql, parameters)
+            cursor.fetchall()
+        elapsed = time.perf_counter() - start
+        cursor.close()
+    finally:
+        raw.close()
+    return elapsed / iterations * 1e6
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="热点查找微基准：每次调用的Python开销（总耗时减去驱动直接执行同一条SQL的耗时），使用内存SQLite"
+    )
+    parser.add_argument("--iterations", type=int, default=5000)
+    args = parser.parse_args()
+
+    engine, lookups = setup()
+    with Session(engine) as db:
+        for name, (attribute, value) in lookups.items():
+            for variant_name, variant in build_variants(attribute, value).items():
+                sql, parameters = capture_sql(engine, db, variant)
+                # 预热：编译缓存和lambda的缓存键在这里生成
+                measure(db, variant, min(args.iterations, 200))
+                total = measure(db, variant, args.iterations)
+                driver = measure_driver(engine, sql, parameters, args.iterations)
+                logger.info(
+                    f"{name} {variant_name}: {total:.1f}us/次，驱动 {driver:.1f}us，Python开销 {total - driver:.1f}us"
+                )
+    engine.dispose()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+import argparse
+import logging
+import time
+import tracemalloc
+import uuid
+
+from sqlalchemy import delete, event, insert, or_, select, update
+
+from app import crud, models, schemas
+from app.db.session import SessionLocal, engine
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def legacy_mark_as_read(self, db, *, user_id1, user_id2):
+    """
+    旧的标记已读方式：加载所有未读消息，逐条修改后提交（不维护汇总表）
+    """
+    unread_messages = (
+        db.query(models.Message)
+        .filter(
+            models.Message.sender_id == user_id2,
+            models.Message.receiver_id == user_id1,
+            models.Message.is_read == False,
+        )
+        .all()
+    )
+    for message in unread_messages:
+        message.is_read = True
+        db.add(message)
+    db.commit()
+    return len(unread_messages)
+
+def ensure_fixtures(prefix: str, messages: int, senders: int) -> tuple:
+    """
+    一个读者和若干发送者，每个发送者给读者发送messages/senders条未读消息，返回(reader_id, sender_ids)
+    消息经由写入路径写入，同时维护会话汇总表和未读计数
+    """
+    db = SessionLocal()
+    try:
+        user_ids = list(
+            db.scalars(
+                insert(models.User).returning(models.User.id, sort_by_parameter_order=True),
+                [
+                    {"email": f"{prefix}-{i}@example.com", "username": f"{prefix}-{i}", "hashed_password": "bench"}
+                    for i in range(senders + 1)
+                ],
+            )
+        )
+        db.commit()
+        reader_id, sender_ids = user_ids[0], user_ids[1:]
+        items = [
+            (schemas.MessageCreate(content=f"bench {i}", receiver_id=reader_id), sender_ids[i % senders])
+            for i in range(messages)
+        ]
+        for start in range(0, len(items), 1000):
+            crud.message.create_many_with_sender(db, items=items[start:start + 1000])
+        return reader_id, sender_ids
+    finally:
+        db.close()
+
+def reset(reader_id: int, per_sender: int, senders: int) -> None:
+    """
+    将读者收到的消息恢复为未读，并恢复对应的汇总数据
+    """
+    db = SessionLocal()
+    try:
+        db.execute(update(models.Message).where(models.Message.receiver_id == reader_id).values(is_read=False))
+        db.execute(
+            update(models.Conversation)
+            .where(models.Conversation.user_low_id == reader_id)
+            .values(unread_low=per_sender)
+        )
+        db.execute(
+            update(models.Conversation)
+            .where(models.Conversation.user_high_id == reader_id)
+            .values(unread_high=per_sender)
+        )
+        db.execute(
+            update(models.UnreadCounter)
+            .where(models.UnreadCounter.user_id == reader_id)
+            .values(unread_count=per_sender * senders)
+        )
+        db.commit()
+    finally:
+        db.close()
+
+def measure(case) -> tuple:
+    """
+    返回(标记的消息数, 耗时ms, SQL语句数)，每次使用新的会话；executemany按一条计
+    """
+    statements = 0
+
+    def count(*_):
+        nonlocal statements
+        statements += 1
+
+    event.listen(engine, "before_cursor_execute", count)
+    db = SessionLocal()
+    try:
+        start = time.perf_counter()
+        result = case(db)
+        elapsed = time.perf_counter() - start
+    finally:
+        db.close()
+        event.remove(engine, "before_cursor_execute", count)
+    marked = result if isinstance(result, int) else len(result)
+    return marked, elapsed * 1000, statements
+
+def peak_memory(case) -> float:
+    """
+    执行期间Python分配内存的峰值（MB）
+    """
+    db = SessionLocal()
+    tracemalloc.start()
+    try:
+        case(db)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+        db.close()
+    return peak / 1024 / 1024
+
+def cleanup(prefix: str) -> None:
+    """
+    删除基准写入的用户、消息和汇总数据
+    """
+    db = SessionLocal()
+    try:
+        user_ids = select(models.User.id).where(models.User.username.like(f"{prefix}-%"))
+        db.execute(
+            delete(models.Message).where(
+                or_(models.Message.sender_id.in_(user_ids), models.Message.receiver_id.in_(user_ids))
+            )
+        )
+        db.execute(delete(models.Conversation).where(models.Conversation.user_low_id.in_(user_ids)))
+        db.execute(delete(models.Conversation).where(models.Conversation.user_high_id.in_(user_ids)))
+        db.execute(delete(models.UnreadCounter).where(models.UnreadCounter.user_id.in_(user_ids)))
+        db.execute(delete(models.User).where(models.User.username.like(f"{prefix}-%")))
+        db.commit()
+    finally:
+        db.close()
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="标记已读微基准：对大量未读消息标记已读的耗时、SQL语句数和内存峰值（使用配置的数据库，结束后删除写入的数据）"
+    )
+    parser.add_argument("--messages", type=int, default=50000, help="读者收到的未读消息数")
+    parser.add_argument("--senders", type=int, default=5)
+    parser.add_argument("--legacy", action="store_true", help="同时测量旧的加载后逐条修改方式作为对比")
+    args = parser.parse_args()
+
+    prefix = f"bench-read-{uuid.uuid4().hex[:8]}"
+    per_sender = args.messages // args.senders
+    try:
+        reader_id, sender_ids = ensure_fixtures(prefix, per_sender * args.senders, args.senders)
+        cases = {
+            "mark_as_read（单个会话）": lambda db: crud.message.mark_as_read(
+                db, user_id1=reader_id, user_id2=sender_ids[0]
+            ),
+            "mark_all_as_read（全部）": lambda db: crud.message.mark_all_as_read(db, user_id=reader_id),
+        }
+        if args.legacy:
+            cases["旧方式 mark_as_read（单个会话）"] = lambda db: legacy_mark_as_read(
+                crud.message, db, user_id1=reader_id, user_id2=sender_ids[0]
+            )
+        for name, case in cases.items():
+            reset(reader_id, per_sender, args.senders)
+            marked, ms, statements = measure(case)
+            reset(reader_id, per_sender, args.senders)
+            memory = peak_memory(case)
+            logger.info(f"{name}: {marked} 条，{ms:.1f}ms，{statements} 条SQL，内存峰值 {memory:.1f}MB")
+    finally:
+        cleanup(prefix)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+import argparse
+import logging
+import time
+
+from sqlalchemy import event, inspect
+
+from app import crud, schemas
+from app.api.api_v1.endpoints import knowledge_bases, papers, users
+from app.crud.base import CRUDBase
+from app.db.session import SessionLocal, engine
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+BENCH_EMAIL = "bench-update@example.com"
+
+def legacy_update(self, db, *, db_obj, obj_in):
+    """
+    旧的更新方式：逐个属性赋值，提交后refresh重新读取整行
+    """
+    update_data = self.column_values(obj_in, exclude_unset=True)
+    for field in inspect(db_obj).mapper.attrs.keys():
+        if field in update_data:
+            setattr(db_obj, field, update_data[field])
+    db.add(db_obj)
+    db.commit()
+    db.refresh(db_obj)
+    return db_obj
+
+def ensure_fixtures() -> tuple:
+    """
+    基准用户及其一个知识库、一篇论文，返回(user_id, kb_id, paper_id)
+    """
+    db = SessionLocal()
+    try:
+        user = crud.user.get_by_email(db, email=BENCH_EMAIL)
+        if not user:
+            user = crud.user.create(
+                db,
+                obj_in=schemas.UserCreate(email=BENCH_EMAIL, username="bench-update", password="bench-password"),
+            )
+        kbs, _ = crud.knowledge_base.get_multi_by_owner(db, owner_id=user.id, limit=1)
+        if kbs:
+            kb = kbs[0]
+        else:
+            kb = crud.knowledge_base.create_with_owner(
+                db, obj_in=schemas.KnowledgeBaseCreate(
+                    title="bench", description="bench", tags=["bench"], user_id=user.id
+                ),
+                owner_id=user.id,
+            )
+        paper_list, _ = crud.paper.get_multi_by_knowledge_base(db, knowledge_base_id=kb.id, limit=1)
+        if paper_list:
+            paper_id = paper_list[0].id
+        else:
+            (result,) = crud.paper.create_many(
+                db,
+                objs_in=[
+                    schemas.PaperCreate(
+                        title="bench", authors=["A"], abstract="bench", publish_date="2020", knowledge_base_id=kb.id
+                    )
+                ],
+            )
+            paper_id = result["id"]
+        return user.id, kb.id, paper_id
+    finally:
+        db.close()
+
+def build_cases(user_id: int, kb_id: int, paper_id: int) -> dict:
+    """
+    每个用例是一次请求的处理：端点函数加上响应序列化（过期或未加载的属性在这里触发查询）
+    changed为True时每次写入不同的值，否则重复提交当前值；取到当前用户后调用begin开始计时和计数
+    """
+    def update_user_me(db, i, changed, begin):
+        current_user = crud.user.get(db, id=user_id)
+        start = begin()
+        user_in = schemas.UserUpdate(location=f"bench-{i}" if changed else current_user.location)
+        schemas.User.model_validate(users.update_user_me(db=db, user_in=user_in, current_user=current_user))
+        return start
+
+    def update_paper(db, i, changed, begin):
+        current_user = crud.user.get(db, id=user_id)
+        start = begin()
+        paper_in = schemas.PaperUpdate(title=f"bench-{i}" if changed else "bench")
+        result = papers.update_paper(db=db, paper_id=paper_id, paper_in=paper_in, current_user=current_user)
+        schemas.Paper.model_validate(result, from_attributes=True)
+        return start
+
+    def update_knowledge_base(db, i, changed, begin):
+        current_user = crud.user.get(db, id=user_id)
+        start = begin()
+        kb_in = schemas.KnowledgeBaseUpdate(description=f"bench-{i}" if changed else "bench")
+        result = knowledge_bases.update_knowledge_base(
+            db=db, kb_id=kb_id, knowledge_base_in=kb_in, current_user=current_user
+        )
+        schemas.KnowledgeBase.model_validate(result, from_attributes=True)
+        return start
+
+    return {
+        "update_user_me": update_user_me,
+        "update_paper": update_paper,
+        "update_knowledge_base": update_knowledge_base,
+    }
+
+def measure(case, iterations: int, changed: bool) -> tuple:
+    """
+    返回(每次请求的平均耗时ms, 平均语句数)，不计入取当前用户的查询
+    """
+    statements = 0
+    counting = False
+
+    def count(*_):
+        nonlocal statements
+        if counting:
+            statements += 1
+
+    def begin() -> float:
+        nonlocal counting
+        counting = True
+        return time.perf_counter()
+
+    event.listen(engine, "before_cursor_execute", count)
+    elapsed = 0.0
+    try:
+        for i in range(iterations):
+            db = SessionLocal()
+            try:
+                start = case(db, i, changed, begin)
+                elapsed += time.perf_counter() - start
+            finally:
+                counting = False
+                db.close()
+    finally:
+        event.remove(engine, "before_cursor_execute", count)
+    return elapsed / iterations * 1000, statements / iterations
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="更新接口微基准：每次请求的耗时和SQL语句数（使用配置的数据库）")
+    parser.add_argument("--iterations", type=int, default=500)
+    parser.add_argument("--legacy", action="store_true", help="同时测量旧的赋值+提交+refresh更新方式作为对比")
+    args = parser.parse_args()
+
+    cases = build_cases(*ensure_fixtures())
+    modes = [("单语句更新", CRUDBase.update)]
+    if args.legacy:
+        modes.append(("旧方式", legacy_update))
+    original = CRUDBase.update
+    try:
+        for mode, implementation in modes:
+            CRUDBase.update = implementation
+            for name, case in cases.items():
+                for changed in (True, False):
+                    measure(case, min(args.iterations, 20), changed)
+                    ms, statements = measure(case, args.iterations, changed)
+                    logger.info(
+                        f"{mode} {name}（{'有变化' if changed else '无变化'}）: "
+                        f"{ms:.2f}ms/次，{statements:.1f} 条SQL/次"
+                    )
+    finally:
+        CRUDBase.update = original
+
+if __name__ == "__main__":
+    main()
@@ -36,4 +36,22 @@ loglevel = os.getenv("LOG_LEVEL", "info")
 # 确保日志目录存在
 log_dir = "logs"
 if not os.path.exists(log_dir):
-    os.makedirs(log_dir) 
\ No newline at end of file
+    os.makedirs(log_dir) 
+
+def on_starting(server):
+    # 每个worker的同步、异步引擎各有一个数据库连接池，总数需小于PostgreSQL的max_connections
+    pool_size = int(os.getenv("DB_POOL_SIZE", "5"))
+    max_overflow = int(os.getenv("DB_POOL_MAX_OVERFLOW", "10"))
+    server.log.info(
+        f"数据库连接上限: {workers} workers × 2 × ({pool_size} + {max_overflow}) = "
+        f"{workers * 2 * (pool_size + max_overflow)}"
+    )
+
+    # 多worker实时消息推送：PUBSUB_BACKEND=broker 时由master进程启动本地消息中转服务
+    if os.getenv("PUBSUB_BACKEND") != "broker":
+        return
+    from app.core.pubsub import run_broker
+
+    broker = multiprocessing.Process(target=run_broker, name="pubsub-broker", daemon=True)
+    broker.start()
+    server.log.info(f"消息中转服务进程已启动 (pid: {broker.pid})")
@@ -0,0 +1,25 @@
+import logging
+
+from app import crud
+from app.db.session import SessionLocal
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def reconcile() -> None:
+    db = SessionLocal()
+    try:
+        count = crud.message.rebuild_conversations(db)
+        logger.info(f"会话汇总表已重建，共 {count} 个会话")
+        count = crud.message.rebuild_unread_counters(db)
+        logger.info(f"未读计数已重建，共 {count} 个用户有未读消息")
+    finally:
+        db.close()
+
+def main() -> None:
+    logger.info("正在根据消息表校正汇总数据...")
+    reconcile()
+    logger.info("汇总数据校正完成。")
+
+if __name__ == "__main__":
+    main()
@@ -569,9 +569,9 @@ def seed_db() -> None:
         logger.info(f"创建消息: {messages_count}条")
         
         # 标记一些消息为已读
-        read_count = crud.message.mark_as_read(db, user_id1=created_users[0].id, user_id2=created_users[1].id)
-        read_count += crud.message.mark_as_read(db, user_id1=created_users[2].id, user_id2=created_users[3].id)
-        read_count += crud.message.mark_as_read(db, user_id1=created_users[4].id, user_id2=created_users[5].id)
+        read_count = len(crud.message.mark_as_read(db, user_id1=created_users[0].id, user_id2=created_users[1].id))
+        read_count += len(crud.message.mark_as_read(db, user_id1=created_users[2].id, user_id2=created_users[3].id))
+        read_count += len(crud.message.mark_as_read(db, user_id1=created_users[4].id, user_id2=created_users[5].id))
         logger.info(f"标记已读消息: {read_count}条")
     
     finally:
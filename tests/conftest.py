@@ -0,0 +1,48 @@
+import os
+
+# 测试在当前进程内计算密码哈希，不启动进程池
+os.environ.setdefault("PASSWORD_HASH_WORKERS", "0")
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import models
+from app.db.base import Base
+
+@pytest.fixture
+def engine(tmp_path):
+    """
+    测试数据库：默认每个测试一个SQLite文件；
+    设置TEST_DATABASE_URL时改用该PostgreSQL数据库，测试前后重建所有表（不要指向有数据的库）
+    """
+    url = os.getenv("TEST_DATABASE_URL")
+    if url:
+        engine = create_engine(url)
+        Base.metadata.drop_all(engine)
+    else:
+        engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+    yield engine
+    if url:
+        Base.metadata.drop_all(engine)
+    engine.dispose()
+
+@pytest.fixture
+def db(engine):
+    session = sessionmaker(bind=engine, autoflush=False)()
+    yield session
+    session.close()
+
+@pytest.fixture
+def users(db):
+    """
+    三个已提交的用户：alice、bob、carol
+    """
+    users = [
+        models.User(email=f"{name}@example.com", username=name, hashed_password="x")
+        for name in ("alice", "bob", "carol")
+    ]
+    db.add_all(users)
+    db.commit()
+    return users
@@ -0,0 +1,19 @@
+"""
+批量写入接口的逐行结果：同一批次中重复的id在更新和删除时报告相同的错误
+"""
+from app import crud, models
+
+def test_repeated_ids_are_reported_as_errors(db):
+    tags = [models.Tag(name=name) for name in ("a", "b")]
+    db.add_all(tags)
+    db.commit()
+    a, b = (tag.id for tag in tags)
+    missing = b + 100
+
+    updated = crud.tag.update_many(db, objs_in=[(a, {"name": "c"}), (a, {"name": "d"})])
+    deleted = crud.tag.delete_many(db, ids=[a, b, a, missing])
+
+    assert [result["status"] for result in updated] == ["updated", "error"]
+    assert [result["status"] for result in deleted] == ["deleted", "deleted", "error", "not_found"]
+    assert deleted[2]["error"] == updated[1]["error"] == "同一批次中重复的id"
+    assert db.query(models.Tag).count() == 0
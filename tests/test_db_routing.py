@@ -0,0 +1,129 @@
+"""
+读写分离：两个本地SQLite数据库分别作为主库和只读副本（副本不复制主库的写入，相当于延迟无穷大），
+读请求能否读到刚写入的数据即可判断路由到了哪个库
+"""
+import time
+
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import insert, select
+from sqlalchemy.exc import InvalidRequestError
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import Session
+
+from app import models
+from app.api import deps
+from app.core.cache import primary_sticky_users
+from app.core.security import create_access_token
+from app.db import routing
+from app.db.base import Base
+from app.db.replicas import ReplicaSet
+from app.db.session import async_database_uri
+
+@pytest.fixture
+def replica_set(engine, tmp_path, monkeypatch):
+    """
+    engine为主库，另建一个SQLite文件作为副本
+    """
+    replica_set = ReplicaSet([f"sqlite:///{tmp_path / 'replica.db'}"], max_lag=5)
+    (replica,) = replica_set.replicas
+    Base.metadata.create_all(replica.engine)
+    replica_set.check()
+    primary_async = create_async_engine(
+        async_database_uri(engine.url.render_as_string(hide_password=False))
+    )
+    monkeypatch.setattr(routing, "engine", engine)
+    monkeypatch.setattr(routing, "async_engine", primary_async)
+    monkeypatch.setattr(routing, "replicas", replica_set)
+    monkeypatch.setattr(deps, "replicas", replica_set)
+    primary_sticky_users.clear()
+    yield replica_set
+    primary_sticky_users.clear()
+    replica.engine.dispose()
+
+@pytest.fixture
+def client(replica_set):
+    app = FastAPI()
+
+    @app.post("/tags")
+    def write(db: Session = Depends(deps.get_db)):
+        db.execute(insert(models.Tag).values(name="written"))
+        db.commit()
+        return {}
+
+    @app.get("/tags")
+    def read(db: Session = Depends(deps.get_db)):
+        return {"found": db.scalar(select(models.Tag.id).where(models.Tag.name == "written")) is not None}
+
+    @app.get("/async-tags")
+    async def read_async(db: AsyncSession = Depends(deps.get_async_db)):
+        tag_id = await db.scalar(select(models.Tag.id).where(models.Tag.name == "written"))
+        return {"found": tag_id is not None}
+
+    with TestClient(app) as client:
+        yield client
+
+def pool_of(db: Session):
+    """
+    会话实际使用的连接池（只读引擎与原引擎共享连接池）
+    """
+    return db.get_bind().pool
+
+def bearer(user_id: int) -> dict:
+    return {"Authorization": f"Bearer {create_access_token(user_id)}"}
+
+def test_sessions_route_by_purpose(engine, replica_set):
+    (replica,) = replica_set.replicas
+
+    assert pool_of(routing.make_session()) is engine.pool
+    assert pool_of(routing.make_session(read_only=True)) is engine.pool
+    assert pool_of(routing.make_session(read_only=True, use_replica=True)) is replica.engine.pool
+
+def test_lagging_or_unreachable_replica_falls_back_to_primary(engine, replica_set):
+    (replica,) = replica_set.replicas
+
+    replica.lag = replica_set.max_lag + 1
+    assert pool_of(routing.make_session(read_only=True, use_replica=True)) is engine.pool
+    replica.lag = None
+    assert pool_of(routing.make_session(read_only=True, use_replica=True)) is engine.pool
+
+def test_read_only_session_rejects_writes(replica_set):
+    db = routing.make_session(read_only=True, use_replica=True)
+    db.add(models.Tag(name="x"))
+    with pytest.raises(InvalidRequestError):
+        db.flush()
+    db.close()
+
+def test_reads_without_a_prior_write_use_the_replica(client):
+    client.post("/tags")
+    client.cookies.clear()
+
+    assert client.get("/tags").json() == {"found": False}
+
+def test_cookie_keeps_reads_on_primary(client):
+    client.post("/tags")
+
+    assert client.get("/tags").json() == {"found": True}
+    assert client.get("/async-tags").json() == {"found": True}
+
+def test_bearer_client_without_cookies_reads_its_own_write(client):
+    response = client.post("/tags", headers=bearer(1))
+    client.cookies.clear()
+
+    assert response.headers[deps.PRIMARY_STICKY_HEADER]
+    assert client.get("/tags", headers=bearer(1)).json() == {"found": True}
+    assert client.get("/async-tags", headers=bearer(1)).json() == {"found": True}
+    # 其他用户不受影响，仍读副本
+    assert client.get("/tags", headers=bearer(2)).json() == {"found": False}
+
+def test_echoed_header_keeps_reads_on_primary(client):
+    # 例如请求落到另一个worker上，本worker没有该用户的写入记录
+    response = client.post("/tags")
+    client.cookies.clear()
+    sticky_until = response.headers[deps.PRIMARY_STICKY_HEADER]
+
+    assert client.get("/tags", headers={deps.PRIMARY_STICKY_HEADER: sticky_until}).json() == {"found": True}
+    expired = str(int(time.time()) - 1)
+    assert client.get("/tags", headers={deps.PRIMARY_STICKY_HEADER: expired}).json() == {"found": False}
+    assert client.get("/tags", headers={deps.PRIMARY_STICKY_HEADER: "invalid"}).json() == {"found": False}
@@ -0,0 +1,93 @@
+"""
+会话历史翻页越过在线数据后从归档文件读取；异步版本在线程池中读取归档文件，不阻塞事件循环
+"""
+import asyncio
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app import crud, models, schemas
+from app.core.config import settings
+from app.crud import crud_message
+from app.db.session import async_database_uri
+
+MESSAGE_COUNT = 30
+
+@pytest.fixture
+def conversation(db, users, tmp_path, monkeypatch):
+    """
+    两个用户之间的已读会话，除最新一条外全部归档，返回(用户ID, 用户ID, 按最新在前排列的消息ID)
+    """
+    monkeypatch.setattr(settings, "MESSAGE_ARCHIVE_DIR", str(tmp_path / "archive"))
+    alice, bob, _ = users
+    items = [
+        (schemas.MessageCreate(content=f"hi {i}", receiver_id=bob.id), alice.id)
+        for i in range(MESSAGE_COUNT)
+    ]
+    ids = [message.id for message in crud.message.create_many_with_sender(db, items=items)]
+    db.execute(update(models.Message).values(is_read=True))
+    db.commit()
+    archived = crud.message.archive_read_messages(
+        db,
+        older_than=datetime.utcnow() + timedelta(days=1),
+        archive_dir=settings.MESSAGE_ARCHIVE_DIR,
+        batch_size=7,
+    )
+    assert archived == MESSAGE_COUNT - 1
+    return alice.id, bob.id, ids[::-1]
+
+def walk(get_page) -> list:
+    ids, cursor = [], None
+    while True:
+        page, cursor = get_page(cursor)
+        ids += [message.id for message in page]
+        if cursor is None:
+            return ids
+
+def test_history_continues_into_archive(db, conversation):
+    alice_id, bob_id, expected = conversation
+
+    ids = walk(
+        lambda cursor: crud.message.get_conversation(
+            db, user_id1=alice_id, user_id2=bob_id, cursor=cursor, limit=4
+        )
+    )
+
+    assert ids == expected
+
+def test_async_history_reads_archive_off_the_event_loop(engine, conversation, monkeypatch):
+    alice_id, bob_id, expected = conversation
+    reader_threads = []
+    read_segment = crud_message.read_segment
+
+    def recording_read_segment(*args):
+        reader_threads.append(threading.get_ident())
+        return read_segment(*args)
+
+    monkeypatch.setattr(crud_message, "read_segment", recording_read_segment)
+
+    async def run():
+        async_engine = create_async_engine(
+            async_database_uri(engine.url.render_as_string(hide_password=False))
+        )
+        try:
+            async with AsyncSession(async_engine, expire_on_commit=False) as db:
+                ids, cursor = [], None
+                while True:
+                    page, cursor = await crud.message_async.get_conversation(
+                        db, user_id1=alice_id, user_id2=bob_id, cursor=cursor, limit=4
+                    )
+                    ids += [message.id for message in page]
+                    if cursor is None:
+                        return ids, threading.get_ident()
+        finally:
+            await async_engine.dispose()
+
+    ids, loop_thread = asyncio.run(run())
+
+    assert ids == expected
+    assert reader_threads
+    assert loop_thread not in reader_threads
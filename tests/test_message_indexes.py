@@ -0,0 +1,108 @@
+"""
+消息表复合索引：对CRUD实际执行的语句取查询计划，断言计划中使用了对应的索引
+- 会话历史（各页）使用 ix_messages_pair_key_created_at
+- 用户的未读消息（receiver_id = ? AND is_read = false，全部标记已读时扫描）使用 ix_messages_receiver_id_is_read
+"""
+import pytest
+from sqlalchemy import event, insert, text
+
+from app import crud, models
+from app.models.message import make_pair_key
+
+USER_COUNT = 40
+MESSAGE_COUNT = 4000
+
+@pytest.fixture
+def user_ids(engine, db):
+    users = [
+        models.User(email=f"u{i}@example.com", username=f"u{i}", hashed_password="x")
+        for i in range(USER_COUNT)
+    ]
+    db.add_all(users)
+    db.flush()
+    ids = [user.id for user in users]
+    rows = []
+    for n in range(MESSAGE_COUNT):
+        sender_id, receiver_id = ids[n % USER_COUNT], ids[(n * 7 + 3) % USER_COUNT]
+        rows.append(
+            {
+                "sender_id": sender_id,
+                "receiver_id": receiver_id,
+                "pair_key": make_pair_key(sender_id, receiver_id),
+                "content": f"message {n}",
+                # 大部分历史消息已读
+                "is_read": n % 20 != 0,
+            }
+        )
+    db.execute(insert(models.Message), rows)
+    db.commit()
+    # 让PostgreSQL的优化器基于真实的数据分布选择计划
+    with engine.begin() as connection:
+        connection.execute(text("ANALYZE"))
+    return ids
+
+def executed_statements(engine, call) -> list:
+    """
+    执行call，返回期间发送给驱动的(SQL, 参数)列表
+    """
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        call()
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    return statements
+
+def query_plan(engine, statement: str, parameters) -> str:
+    """
+    语句的查询计划文本（不执行语句）
+    """
+    prefix = "EXPLAIN QUERY PLAN " if engine.dialect.name == "sqlite" else "EXPLAIN "
+    with engine.connect() as connection:
+        rows = connection.exec_driver_sql(prefix + statement, parameters).all()
+        connection.rollback()
+    return "\n".join(" ".join(str(value) for value in row) for row in rows)
+
+def plan_for(engine, statements: list, startswith: str) -> str:
+    matching = [(sql, params) for sql, params in statements if sql.lstrip().startswith(startswith)]
+    assert matching, f"未执行以 {startswith} 开头的语句"
+    return query_plan(engine, *matching[0])
+
+def test_conversation_history_uses_pair_key_index(engine, db, user_ids):
+    statements = executed_statements(
+        engine,
+        lambda: crud.message.get_conversation(db, user_id1=user_ids[0], user_id2=user_ids[3], limit=5),
+    )
+    plan = plan_for(engine, statements, "SELECT messages.")
+    assert "ix_messages_pair_key_created_at" in plan, plan
+
+def test_conversation_next_page_uses_pair_key_index(engine, db, user_ids):
+    _, cursor = crud.message.get_conversation(db, user_id1=user_ids[0], user_id2=user_ids[3], limit=5)
+    assert cursor is not None
+    statements = executed_statements(
+        engine,
+        lambda: crud.message.get_conversation(
+            db, user_id1=user_ids[0], user_id2=user_ids[3], cursor=cursor, limit=5
+        ),
+    )
+    plan = plan_for(engine, statements, "SELECT messages.")
+    assert "ix_messages_pair_key_created_at" in plan, plan
+
+def test_unread_messages_use_receiver_index(engine, db, user_ids):
+    statements = executed_statements(
+        engine, lambda: crud.message.mark_all_as_read(db, user_id=user_ids[1])
+    )
+    plan = plan_for(engine, statements, "UPDATE messages")
+    assert "ix_messages_receiver_id_is_read" in plan, plan
+
+def test_mark_conversation_read_uses_index(engine, db, user_ids):
+    statements = executed_statements(
+        engine, lambda: crud.message.mark_as_read(db, user_id1=user_ids[3], user_id2=user_ids[0])
+    )
+    plan = plan_for(engine, statements, "UPDATE messages")
+    # 会话内的未读消息：会话键索引和接收者索引都能避免扫描整张表
+    assert "ix_messages_pair_key_created_at" in plan or "ix_messages_receiver_id_is_read" in plan, plan
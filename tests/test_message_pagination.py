@@ -0,0 +1,89 @@
+"""
+会话历史的游标分页
+"""
+from datetime import datetime, timezone
+
+from sqlalchemy import func, insert, select
+
+from app import crud, models
+from app.models.message import make_pair_key
+
+CREATED_AT = datetime(2024, 1, 1, 12, 0, 0, tzinfo=timezone.utc)
+
+def add_messages(db, sender_id: int, receiver_id: int, count: int, created_at=None) -> list:
+    """
+    用一条多行INSERT写入count条消息，返回按写入顺序的消息ID
+    未指定created_at时使用数据库的默认值，同一条语句写入的消息时间戳相同
+    """
+    before = db.scalar(select(func.max(models.Message.id))) or 0
+    rows = [
+        {
+            "sender_id": sender_id,
+            "receiver_id": receiver_id,
+            "pair_key": make_pair_key(sender_id, receiver_id),
+            "content": f"message {i}",
+            "is_read": False,
+        }
+        for i in range(count)
+    ]
+    if created_at is not None:
+        for row in rows:
+            row["created_at"] = created_at
+    db.execute(insert(models.Message).values(rows))
+    db.commit()
+    return list(
+        db.scalars(select(models.Message.id).where(models.Message.id > before).order_by(models.Message.id))
+    )
+
+def walk(db, user_id1: int, user_id2: int, limit: int, **kwargs) -> list:
+    """
+    沿next_cursor翻到最后一页，返回每页的消息ID
+    """
+    pages = []
+    messages, cursor = crud.message.get_conversation(
+        db, user_id1=user_id1, user_id2=user_id2, limit=limit, **kwargs
+    )
+    pages.append([message.id for message in messages])
+    while cursor is not None:
+        assert len(pages) <= 100, "游标没有前进"
+        messages, cursor = crud.message.get_conversation(
+            db, user_id1=user_id1, user_id2=user_id2, cursor=cursor, limit=limit
+        )
+        pages.append([message.id for message in messages])
+    return pages
+
+def test_pages_newest_first_with_equal_timestamps(db, users):
+    alice, bob = users[0].id, users[1].id
+    ids = add_messages(db, alice, bob, 7)
+    messages, _ = crud.message.get_conversation(db, user_id1=alice, user_id2=bob, limit=10)
+    assert len({message.created_at for message in messages}) == 1
+
+    pages = walk(db, bob, alice, limit=3)
+
+    assert pages == [ids[::-1][0:3], ids[::-1][3:6], ids[::-1][6:]]
+
+def test_pages_forward_with_equal_timestamps(db, users):
+    alice, bob = users[0].id, users[1].id
+    ids = add_messages(db, alice, bob, 7)
+
+    pages = walk(db, bob, alice, limit=3, after_id=ids[0])
+
+    # 每页内部最新的在前，各页沿时间正向推进
+    assert pages == [ids[3:0:-1], ids[6:3:-1]]
+
+def test_pages_with_equal_explicit_timestamps(db, users):
+    alice, bob = users[0].id, users[1].id
+    ids = add_messages(db, alice, bob, 7, created_at=CREATED_AT)
+
+    pages = walk(db, bob, alice, limit=3)
+
+    assert pages == [ids[::-1][0:3], ids[::-1][3:6], ids[::-1][6:]]
+
+def test_ties_across_timestamp_boundary(db, users):
+    alice, bob = users[0].id, users[1].id
+    older = add_messages(db, bob, alice, 4, created_at=CREATED_AT.replace(second=0))
+    newer = add_messages(db, alice, bob, 4, created_at=CREATED_AT.replace(second=1))
+
+    pages = walk(db, alice, bob, limit=3)
+
+    assert [message_id for page in pages for message_id in page] == newer[::-1] + older[::-1]
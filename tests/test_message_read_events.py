@@ -0,0 +1,107 @@
+"""
+标记已读的接口向发送者和读者的其他设备推送message.read事件
+"""
+import pytest
+
+from app import crud, schemas
+from app.api.api_v1.endpoints import messages
+
+@pytest.fixture
+def published(monkeypatch):
+    events = []
+    monkeypatch.setattr(messages.hub, "publish", lambda user_id, event: events.append((user_id, event)))
+    return events
+
+def send(db, sender, receiver, count: int) -> list:
+    items = [(schemas.MessageCreate(content=f"hi {i}", receiver_id=receiver.id), sender.id) for i in range(count)]
+    return [message.id for message in crud.message.create_many_with_sender(db, items=items)]
+
+def read_ids(events: list, user_id: int) -> list:
+    return sorted(
+        message_id
+        for target, event in events
+        if target == user_id and event["type"] == "message.read"
+        for message_id in event["message_ids"]
+    )
+
+def test_read_all_notifies_each_sender(db, users, published):
+    reader, alice, bob = users
+    from_alice = send(db, alice, reader, 3)
+    from_bob = send(db, bob, reader, 2)
+
+    count = messages.mark_everything_as_read(db=db, current_user=reader)
+
+    assert count == 5
+    assert read_ids(published, alice.id) == from_alice
+    assert read_ids(published, bob.id) == from_bob
+    assert read_ids(published, reader.id) == sorted(from_alice + from_bob)
+    assert all(event["reader_id"] == reader.id for _, event in published)
+
+def test_batch_read_notifies_only_marked_messages(db, users, published):
+    reader, alice, bob = users
+    from_alice = send(db, alice, reader, 3)
+    to_alice = send(db, reader, alice, 1)
+
+    count = messages.mark_messages_read(
+        db=db,
+        batch_in=schemas.MessageReadBatch(message_ids=from_alice[:2] + to_alice),
+        current_user=reader,
+    )
+
+    assert count == 2
+    assert read_ids(published, alice.id) == from_alice[:2]
+    assert read_ids(published, reader.id) == from_alice[:2]
+
+def test_conversation_read_all_notifies_partner(db, users, published):
+    reader, alice, bob = users
+    from_alice = send(db, alice, reader, 2)
+    send(db, bob, reader, 2)
+
+    count = messages.mark_all_as_read(db=db, user_id=alice.id, current_user=reader)
+
+    assert count == 2
+    assert read_ids(published, alice.id) == from_alice
+    assert read_ids(published, bob.id) == []
+
+def test_nothing_to_read_publishes_nothing(db, users, published):
+    reader, alice, _ = users
+    send(db, alice, reader, 1)
+    messages.mark_everything_as_read(db=db, current_user=reader)
+    published.clear()
+
+    assert messages.mark_everything_as_read(db=db, current_user=reader) == 0
+    assert published == []
+
+def test_large_read_is_split_into_bounded_events(db, users, published, monkeypatch):
+    reader, alice, _ = users
+    monkeypatch.setattr(messages, "READ_EVENT_MAX_IDS", 2)
+    from_alice = send(db, alice, reader, 5)
+
+    messages.mark_everything_as_read(db=db, current_user=reader)
+
+    alice_events = [event for target, event in published if target == alice.id]
+    assert [len(event["message_ids"]) for event in alice_events] == [2, 2, 1]
+    assert read_ids(published, alice.id) == from_alice
+
+def test_single_read_event_carries_message_ids(db, users, published):
+    reader, alice, _ = users
+    (message_id,) = send(db, alice, reader, 1)
+
+    messages.mark_message_read(db=db, message_id=message_id, current_user=reader)
+
+    (target, event), *_ = published
+    assert target == alice.id
+    assert event["message"]["id"] == message_id
+    assert event["message_ids"] == [message_id]
+    assert read_ids(published, reader.id) == [message_id]
+
+def test_repeated_single_read_publishes_once(db, users, published):
+    reader, alice, _ = users
+    (message_id,) = send(db, alice, reader, 1)
+
+    messages.mark_message_read(db=db, message_id=message_id, current_user=reader)
+    published.clear()
+    message = messages.mark_message_read(db=db, message_id=message_id, current_user=reader)
+
+    assert message.is_read
+    assert published == []
@@ -0,0 +1,36 @@
+"""
+消息全文检索的游标分页：相同相关度的结果跨页时不重复、不遗漏
+"""
+from app import crud, schemas
+
+def send(db, sender, receiver, contents: list) -> list:
+    items = [(schemas.MessageCreate(content=content, receiver_id=receiver.id), sender.id) for content in contents]
+    return [message.id for message in crud.message.create_many_with_sender(db, items=items)]
+
+def walk(db, user_id: int, q: str, limit: int) -> list:
+    """
+    沿next_cursor翻到最后一页，返回每页的(消息ID, 相关度)
+    """
+    pages, cursor = [], None
+    while True:
+        hits, cursor = crud.message.search(db, user_id=user_id, q=q, cursor=cursor, limit=limit)
+        pages.append([(message.id, rank) for message, _, rank in hits])
+        assert len(pages) <= 100, "游标没有前进"
+        if cursor is None:
+            return pages
+
+def test_pages_through_equal_rank_hits(db, users):
+    alice, bob, carol = users
+    tied = send(db, alice, bob, ["hello world"] * 7)
+    other = send(db, bob, alice, ["hello hello hello", "hello there, a longer message about the world"])
+    send(db, carol, bob, ["hello world"] * 2)
+    send(db, alice, bob, ["nothing to see"])
+
+    pages = walk(db, alice.id, "hello", limit=3)
+    hits = [hit for page in pages for hit in page]
+
+    assert all(len(page) <= 3 for page in pages)
+    assert sorted(message_id for message_id, _ in hits) == sorted(tied + other)
+    # 结果中确有跨页的相同相关度
+    assert len({rank for message_id, rank in hits if message_id in tied}) == 1
+    assert hits == sorted(hits, key=lambda hit: (hit[1], hit[0]), reverse=True)
@@ -0,0 +1,30 @@
+"""
+连接池状态指标：engine.dispose()重建连接池后，指标反映新的连接池
+"""
+from sqlalchemy import create_engine
+
+from app.core.metrics import registry
+from app.db.pool import engine_options, instrument
+
+def gauge(name: str) -> float:
+    # 同名指标只注册一次，重复注册返回已有的指标
+    return registry.gauge(name, "").value
+
+def test_gauges_follow_the_pool_after_dispose(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'pool.db'}", **engine_options(prefix="db_test_pool"))
+    instrument(engine)
+    old_pool = engine.pool
+
+    connection = engine.connect()
+    assert gauge("db_test_pool_checked_out") == 1
+    connection.close()
+    engine.dispose()
+    assert engine.pool is not old_pool
+
+    connections = [engine.connect(), engine.connect()]
+    assert gauge("db_test_pool_checked_out") == 2
+    assert gauge("db_test_pool_checked_in") == 0
+    for connection in connections:
+        connection.close()
+    assert gauge("db_test_pool_checked_in") == 2
+    engine.dispose()
@@ -0,0 +1,68 @@
+"""
+消息中转服务：不读取数据的连接在缓冲超过上限后被断开，其他连接照常收到全部事件
+"""
+import asyncio
+import socket
+
+from app.core.pubsub import serve_broker
+
+LINE = b"x" * 32 * 1024 + b"\n"
+LINE_COUNT = 400
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+async def read_until_closed(reader: asyncio.StreamReader) -> int:
+    received = 0
+    try:
+        while True:
+            data = await reader.read(65536)
+            if not data:
+                return received
+            received += len(data)
+    except ConnectionResetError:
+        return received
+
+def test_slow_connection_is_dropped():
+    async def run():
+        port = free_port()
+        broker = asyncio.create_task(serve_broker("127.0.0.1", port, max_buffer=256 * 1024))
+        for _ in range(100):
+            try:
+                slow_reader, slow_writer = await asyncio.open_connection("127.0.0.1", port)
+                break
+            except OSError:
+                await asyncio.sleep(0.01)
+        # 不读取数据的连接：内核缓冲写满后中转服务的发送缓冲开始增长
+        slow_writer.transport.pause_reading()
+        fast_reader, fast_writer = await asyncio.open_connection("127.0.0.1", port)
+        await asyncio.sleep(0.05)
+
+        async def publish():
+            for _ in range(LINE_COUNT):
+                fast_writer.write(LINE)
+                await fast_writer.drain()
+
+        async def receive():
+            lines = 0
+            while lines < LINE_COUNT:
+                assert await fast_reader.readline() == LINE
+                lines += 1
+            return lines
+
+        _, lines = await asyncio.wait_for(asyncio.gather(publish(), receive()), timeout=30)
+        slow_writer.transport.resume_reading()
+        slow_received = await asyncio.wait_for(read_until_closed(slow_reader), timeout=30)
+
+        fast_writer.close()
+        slow_writer.close()
+        broker.cancel()
+        return lines, slow_received
+
+    lines, slow_received = asyncio.run(run())
+
+    assert lines == LINE_COUNT
+    # 慢连接被断开，没有收到全部数据
+    assert slow_received < LINE_COUNT * len(LINE)
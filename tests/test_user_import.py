@@ -0,0 +1,58 @@
+"""
+批量导入用户的请求体解析：CSV引号内的换行属于字段内容，记录可以跨越请求体的分块边界
+"""
+import asyncio
+
+from app.api.api_v1.endpoints import users
+
+class ChunkedRequest:
+    """
+    按固定大小分块返回请求体，模拟流式上传
+    """
+    def __init__(self, body: str, chunk_size: int):
+        self.body = body.encode("utf-8")
+        self.chunk_size = chunk_size
+
+    async def stream(self):
+        for start in range(0, len(self.body), self.chunk_size):
+            yield self.body[start:start + self.chunk_size]
+
+def parse(body: str, format: str, chunk_size: int = 5) -> list:
+    async def collect():
+        return [row async for row in users._parse_rows(ChunkedRequest(body, chunk_size), format)]
+
+    return asyncio.run(collect())
+
+def test_csv_quoted_newlines_stay_in_one_field():
+    body = (
+        "username,email,location\r\n"
+        'alice,alice@example.com,"Room 1\r\nBuilding ""A"""\r\n'
+        "\r\n"
+        'bob,bob@example.com,"line one\nline two"\n'
+        "carol,carol@example.com,\n"
+    )
+
+    rows = parse(body, "csv")
+
+    assert rows == [
+        (2, {"username": "alice", "email": "alice@example.com", "location": 'Room 1\r\nBuilding "A"'}, None),
+        (5, {"username": "bob", "email": "bob@example.com", "location": "line one\nline two"}, None),
+        (7, {"username": "carol", "email": "carol@example.com"}, None),
+    ]
+
+def test_csv_column_mismatch_is_reported_per_record():
+    rows = parse('username,email\nalice\n"bob\nsmith",bob@example.com\n', "csv")
+
+    assert rows == [
+        (2, None, "列数与表头不一致"),
+        (3, {"username": "bob\nsmith", "email": "bob@example.com"}, None),
+    ]
+
+def test_jsonl_is_split_by_line():
+    rows = parse('{"username": "alice"}\n\nnot json\n[1]', "jsonl")
+
+    assert rows == [
+        (1, {"username": "alice"}, None),
+        (3, None, "无效的JSON"),
+        (4, None, "每行应为一个JSON对象"),
+    ]